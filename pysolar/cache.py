@@ -0,0 +1,89 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""A small bounded cache for expensive, location-independent results
+
+"""
+import collections
+import threading
+
+CacheInfo = collections.namedtuple("CacheInfo", ("hits", "misses", "maxsize", "currsize", "eviction"))
+
+evictions = ("lru", "fifo")
+
+class Cache :
+    "bounded mapping from hashable keys to computed values. When full, the least" \
+    " recently used entry (eviction = 'lru') or the oldest entry (eviction = 'fifo')" \
+    " is discarded. Safe to share between threads."
+
+    def __init__(self, maxsize = 1024, eviction = "lru") :
+        if maxsize < 1 :
+            raise ValueError("cache maxsize must be at least 1, not %r" % maxsize)
+        #end if
+        if eviction not in evictions :
+            raise ValueError("unknown cache eviction policy %r, expected one of %s" % (eviction, ", ".join(evictions)))
+        #end if
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    #end __init__
+
+    def get(self, key, compute) :
+        "returns the value cached for key, calling compute() to create it if absent."
+        with self._lock :
+            if key in self._entries :
+                self.hits += 1
+                if self.eviction == "lru" :
+                    self._entries.move_to_end(key)
+                #end if
+                return \
+                    self._entries[key]
+            #end if
+            self.misses += 1
+        #end with
+        value = compute() # outside the lock, so one slow miss does not block other threads
+        with self._lock :
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize :
+                self._entries.popitem(last = False)
+            #end while
+        #end with
+        return \
+            value
+    #end get
+
+    def clear(self) :
+        "discards all entries and resets the statistics."
+        with self._lock :
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        #end with
+    #end clear
+
+    def info(self) :
+        with self._lock :
+            return \
+                CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries), self.eviction)
+        #end with
+    #end info
+
+#end Cache
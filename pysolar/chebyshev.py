@@ -0,0 +1,196 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Chebyshev polynomial fits to the solar ephemeris
+
+The location-independent part of the solar position algorithm (the sun's
+apparent right ascension and declination, its distance, the nutation term in
+sidereal time and the equation of time) varies smoothly with time. A
+ChebyshevEphemeris holds these as Chebyshev series over consecutive segments of
+days_per_segment days, fitted once to the full algorithm, so that evaluating
+them at any instant takes a few dozen multiply-adds instead of the VSOP87 and
+nutation series.
+
+The series are in terms of TT (Julian ephemeris days), in which all of these
+quantities are smooth. The mean sidereal time, which increases by nearly a
+whole turn a day, is a simple polynomial in UT and is still computed exactly.
+get_ephemeris() returns a vectorized.SolarEphemeris with the same attributes
+that the topocentric calculations use, so it can stand in for one computed in
+full anywhere.
+
+The fitted coefficients for each segment form one record of a structured NumPy
+array, which save() writes to a .npy file and load() maps back into memory
+without reading it in. With the defaults, the fit agrees with the full algorithm
+to within rounding error (about 1e-9 degrees), and each year takes about 25
+kilobytes.
+
+"""
+import numpy as np
+from . import constants
+from . import time
+from . import vectorized
+
+fitted_attributes = \
+    (
+        "right_ascension", # degrees, unwrapped within each segment
+        "declination",
+        "sun_earth_distance",
+        "equation_of_equinoxes", # degrees, apparent minus mean sidereal time
+        "equation_of_time",
+    )
+
+default_days_per_segment = 8
+default_degree = 12
+
+def get_segment_dtype(degree) :
+    "the dtype of one segment of a ChebyshevEphemeris with series of the given degree."
+    return \
+        np.dtype \
+          (
+                [
+                    ("start_jde", float),
+                    ("end_jde", float),
+                    ("precision", np.int8), # index into constants.precisions
+                ]
+            +
+                list((name, float, (degree + 1,)) for name in fitted_attributes)
+          )
+#end get_segment_dtype
+
+def _fit_segments(start_jde, days_per_segment, nr_segments, degree, precision) :
+    # returns coefficients of the fitted series for each of fitted_attributes, as
+    # (nr_segments, degree + 1) arrays, by interpolating at the Chebyshev nodes.
+    nr_nodes = degree + 1
+    angles = np.pi * (np.arange(nr_nodes) + 0.5) / nr_nodes
+    nodes = (np.cos(angles) + 1) / 2 * days_per_segment
+    jde = start_jde + np.arange(nr_segments)[:, np.newaxis] * days_per_segment + nodes
+    # jd only enters into the mean sidereal time, which is subtracted out again
+    ephemeris = vectorized.SolarEphemeris.from_julian_days(jde, jde, precision)
+    values = \
+        {
+            "right_ascension" : np.unwrap(ephemeris.right_ascension, period = 360, axis = -1),
+            "declination" : ephemeris.declination,
+            "sun_earth_distance" : ephemeris.sun_earth_distance,
+            "equation_of_equinoxes" :
+                (ephemeris.apparent_sidereal_time - vectorized.get_mean_sidereal_time(jde) + 180) % 360 - 180,
+            "equation_of_time" : ephemeris.equation_of_time,
+        }
+    basis = np.cos(np.outer(angles, np.arange(nr_nodes))) * 2 / nr_nodes
+    basis[:, 0] /= 2
+    return \
+        dict((name, values[name] @ basis) for name in fitted_attributes)
+#end _fit_segments
+
+def _evaluate(coefficients, x) :
+    # sums the Chebyshev series with (T, degree + 1) coefficients at the (T,) points x
+    # in [-1, 1] by Clenshaw's recurrence.
+    b1 = b2 = np.zeros_like(x)
+    for j in range(coefficients.shape[-1] - 1, 0, -1) :
+        b1, b2 = coefficients[:, j] + 2 * x * b1 - b2, b1
+    #end for
+    return \
+        coefficients[:, 0] + x * b1 - b2
+#end _evaluate
+
+class ChebyshevEphemeris :
+    "a solar ephemeris fitted by Chebyshev series; see the module description. Build" \
+    " one with ChebyshevEphemeris.build() or ChebyshevEphemeris.load()."
+
+    def __init__(self, segments) :
+        self.segments = segments # structured array with get_segment_dtype()
+        self.start_jde = float(segments["start_jde"][0])
+        self.end_jde = float(segments["end_jde"][-1])
+        self.days_per_segment = float(segments["end_jde"][0] - segments["start_jde"][0])
+        self.precision = constants.precisions[segments["precision"][0]]
+    #end __init__
+
+    @classmethod
+    def build(cls, start_datetime, end_datetime, days_per_segment = default_days_per_segment, degree = default_degree, precision = "full") :
+        "fits the ephemeris over whole TT days covering start_datetime to end_datetime," \
+        " computed with the given precision (not \"fast\", which is no slower than" \
+        " evaluating the fit)."
+        constants.check_precision(precision, ("full", "reduced"))
+        start_jde, end_jde = (time.get_julian_days(when)[1] for when in (start_datetime, end_datetime))
+        start_jde = np.floor(start_jde - 0.5) + 0.5 # midnight
+        nr_segments = max(1, int(np.ceil((end_jde - start_jde) / days_per_segment)))
+        segments = np.empty(nr_segments, get_segment_dtype(degree))
+        segments["start_jde"] = start_jde + np.arange(nr_segments) * days_per_segment
+        segments["end_jde"] = segments["start_jde"] + days_per_segment
+        segments["precision"] = constants.precisions.index(precision)
+        segments_per_block = max(1, vectorized.default_chunk_size // (degree + 1))
+        for first in range(0, nr_segments, segments_per_block) :
+            block = slice(first, first + segments_per_block)
+            fitted = _fit_segments(segments["start_jde"][first], days_per_segment, len(segments[block]), degree, precision)
+            for name in fitted_attributes :
+                segments[name][block] = fitted[name]
+            #end for
+        #end for
+        return \
+            cls(segments)
+    #end build
+
+    def get_ephemeris(self, when) :
+        "returns a vectorized.SolarEphemeris for when (anything accepted by" \
+        " time.get_instants()), with the attributes used by its topocentric() and" \
+        " topocentric_matrix() methods and equation_of_time."
+        instants = time.get_instants(when)
+        jd = np.asarray(instants.jd, dtype = float)
+        jde = np.asarray(instants.jde, dtype = float)
+        offset = np.ravel(jde - self.start_jde) / self.days_per_segment
+        if np.any(offset < 0) or np.any(offset > len(self.segments)) :
+            raise ValueError("time outside the span of the ephemeris, Julian ephemeris days %.6f to %.6f" % (self.start_jde, self.end_jde))
+        #end if
+        index = np.minimum(np.floor(offset).astype(np.int64), len(self.segments) - 1)
+        x = 2 * (offset - index) - 1
+        segments = self.segments[index]
+        values = dict((name, np.reshape(_evaluate(segments[name], x), jd.shape)) for name in fitted_attributes)
+        result = vectorized.SolarEphemeris.from_attributes \
+          (
+            self.precision,
+            jd = jd,
+            jde = jde,
+            apparent_sidereal_time = (vectorized.get_mean_sidereal_time(jd) + values["equation_of_equinoxes"]) % 360,
+            right_ascension = values["right_ascension"] % 360,
+            declination = values["declination"],
+            equatorial_horizontal_parallax = 8.794 / (3600 / values["sun_earth_distance"]),
+            sun_earth_distance = values["sun_earth_distance"],
+          )
+        result.equation_of_time = values["equation_of_time"]
+        return \
+            result
+    #end get_ephemeris
+
+    def get_position(self, latitude_deg, longitude_deg, when, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure) :
+        "equivalent to vectorized.get_position(), using this ephemeris."
+        return \
+            self.get_ephemeris(when).topocentric(latitude_deg, longitude_deg, elevation, temperature, pressure)
+    #end get_position
+
+    def save(self, filename) :
+        "writes the ephemeris to filename (a NumPy .npy file), for load()."
+        np.save(filename, self.segments)
+    #end save
+
+    @classmethod
+    def load(cls, filename, mmap = True) :
+        "reads an ephemeris written by save(). If mmap, the file is mapped into memory" \
+        " rather than read in, so only the segments used are ever loaded."
+        return \
+            cls(np.load(filename, mmap_mode = ("r" if mmap else None)))
+    #end load
+
+#end ChebyshevEphemeris
@@ -38,6 +38,30 @@ See also ftp://ftp.imcce.fr/pub/ephem/planets/vsop87/VSOP87D.ear
 
 """
 
+import collections
+import numpy as np
+
+# coefficients (a, b, c, d) of the polynomials a + b * x + c * x ** 2 + (x ** 3) / d
+# giving the fundamental arguments of nutation, in degrees, from the Julian ephemeris century
+aberration_polynomials = \
+    (
+        ('ArgumentOfLatitudeOfMoon', (93.27191, 483202.017538, -0.0036825, 327270.0)),
+        ('LongitudeOfAscendingNode', (125.04452, -1934.136261, 0.0020708, 450000.0)),
+        ('MeanElongationOfMoon', (297.85036, 445267.111480, -0.0019142, 189474.0)),
+        ('MeanAnomalyOfMoon', (134.96298, 477198.867398, 0.0086972, 56250.0)),
+        ('MeanAnomalyOfSun', (357.52772, 35999.050340, -0.0001603, -300000.0)),
+    )
+
+# order of the columns of aberration_sin_terms
+aberration_argument_order = \
+    (
+        'MeanElongationOfMoon',
+        'MeanAnomalyOfSun',
+        'MeanAnomalyOfMoon',
+        'ArgumentOfLatitudeOfMoon',
+        'LongitudeOfAscendingNode',
+    )
+
 aberration_coeffs = None
 
 def get_aberration_coeffs():
@@ -51,14 +75,7 @@ def get_aberration_coeffs():
         aberration_coeffs = dict \
           (
             (name, (lambda a, b, c, d : lambda x : a + b * x + c * x ** 2 + (x ** 3) / d)(*coeffs))
-            for name, coeffs in
-                (
-                    ('ArgumentOfLatitudeOfMoon', (93.27191, 483202.017538, -0.0036825, 327270.0)),
-                    ('LongitudeOfAscendingNode', (125.04452, -1934.136261, 0.0020708, 450000.0)),
-                    ('MeanElongationOfMoon', (297.85036, 445267.111480, -0.0019142, 189474.0)),
-                    ('MeanAnomalyOfMoon', (134.96298, 477198.867398, 0.0086972, 56250.0)),
-                    ('MeanAnomalyOfSun', (357.52772, 35999.050340, -0.0001603, -300000.0)),
-                )
+            for name, coeffs in aberration_polynomials
           )
     #end if
     return \
@@ -443,3 +460,143 @@ sun_earth_distance_coeffs = \
             [4,2.56,6283.08],
         ],
     ]
+
+PackedNutationCoeffs = collections.namedtuple \
+  (
+    "PackedNutationCoeffs",
+    (
+        "arguments", # (63, 4) degrees: row i applied to (1, jce, jce ** 2, jce ** 3) gives the i-th sine argument
+        "longitude", # (2, 63) degrees: constant and per-century amplitudes of the sine terms
+        "obliquity", # (2, 63) degrees: constant and per-century amplitudes of the cosine terms
+    )
+  )
+
+# precision tiers for solar.get_position() and friends: the complete tables below,
+# truncated tables (see the thresholds below), and the low-accuracy day-of-year
+# approximations of solar.get_altitude_fast(), which use no tables at all
+precisions = ("full", "reduced", "fast")
+
+# at "reduced" precision, VSOP87 terms are kept only if amplitude * 0.1 ** power
+# (the largest contribution over 1900-2100, in 1e-8 radians or AU) is at least this
+reduced_vsop87_threshold = 100
+# and nutation rows only if the sum of their constant amplitudes (0.0001 arcseconds) is at least this
+reduced_nutation_threshold = 1000
+
+def check_precision(precision, allowed = precisions):
+    if precision not in allowed :
+        raise ValueError("unknown precision %r, expected one of %s" % (precision, ", ".join(allowed)))
+    #end if
+#end check_precision
+
+packed_nutation_coeffs = {} # precision => PackedNutationCoeffs
+
+def get_packed_nutation_coeffs(precision = "full"):
+    """This function packs nutation_coefficients and aberration_sin_terms into
+    contiguous arrays, with the polynomials for the fundamental arguments already
+    multiplied into the integer multipliers of aberration_sin_terms, so that all
+    the sine/cosine arguments for a given time come out of a single dot product.
+    The amplitudes are scaled from 0.0001 arcseconds to degrees. precision is
+    "full" for all 63 rows or "reduced" for the largest ones only.
+
+    """
+    check_precision(precision, ("full", "reduced"))
+    if precision not in packed_nutation_coeffs :
+        polynomials = dict(aberration_polynomials)
+        powers = np.array \
+          (
+            [
+                (a, b, c, 1 / d)
+                for a, b, c, d in (polynomials[name] for name in aberration_argument_order)
+            ]
+          )
+        abcd = np.array(nutation_coefficients, dtype = float)
+        keep = np.ones(len(abcd), dtype = bool)
+        if precision == "reduced" :
+            keep = abs(abcd[:, 0]) + abs(abcd[:, 2]) >= reduced_nutation_threshold
+        #end if
+        abcd = abcd[keep] / 36000000.0
+        packed_nutation_coeffs[precision] = PackedNutationCoeffs \
+          (
+            arguments = np.ascontiguousarray(np.array(aberration_sin_terms, dtype = float)[keep] @ powers),
+            longitude = np.ascontiguousarray(abcd[:, 0:2].T),
+            obliquity = np.ascontiguousarray(abcd[:, 2:4].T),
+          )
+    #end if
+    return \
+        packed_nutation_coeffs[precision]
+#end get_packed_nutation_coeffs
+
+PackedCoeffs = collections.namedtuple \
+  (
+    "PackedCoeffs",
+    (
+        "phase", # (K,) radians, one entry per periodic term of every series
+        "frequency", # (K,) radians per Julian millennium
+        "weights", # (K, S * P) amplitude of each term, in the column of its (series, power of jme)
+        "shape", # (S, P): number of series, and highest power of jme + 1
+    )
+  )
+
+def pack_coeffs(*tables):
+    """This function packs one or more VSOP87-style tables, each a list (one entry
+    per power of the Julian ephemeris millennium) of lists of [amplitude, phase,
+    frequency] terms, into flat arrays. The cosines of all the terms of all the
+    tables can then be taken in one call, and a single matrix product with the
+    weights sums them into the coefficient of each power of each series.
+
+    """
+    terms = []
+    columns = []
+    nr_powers = max(len(table) for table in tables)
+    for series, table in enumerate(tables) :
+        for power, line in enumerate(table) :
+            terms.extend(line)
+            columns.extend([series * nr_powers + power] * len(line))
+        #end for
+    #end for
+    terms = np.array(terms, dtype = float)
+    weights = np.zeros((len(terms), len(tables) * nr_powers))
+    weights[np.arange(len(terms)), columns] = terms[:, 0]
+    return \
+        PackedCoeffs \
+          (
+            phase = np.ascontiguousarray(terms[:, 1]),
+            frequency = np.ascontiguousarray(terms[:, 2]),
+            weights = weights,
+            shape = (len(tables), nr_powers),
+          )
+#end pack_coeffs
+
+def truncate_coeffs(coeffs, threshold):
+    """This function returns a copy of a VSOP87-style table keeping only the terms
+    whose amplitude * 0.1 ** power is at least threshold.
+
+    """
+    return \
+        [
+            [term for term in line if term[0] * 0.1 ** power >= threshold]
+            for power, line in enumerate(coeffs)
+        ]
+#end truncate_coeffs
+
+packed_vsop87_coeffs = {} # precision => PackedCoeffs
+
+def get_packed_vsop87_coeffs(precision = "full"):
+    """This function returns heliocentric_longitude_coeffs,
+    heliocentric_latitude_coeffs and sun_earth_distance_coeffs packed together
+    by pack_coeffs(), in that order, so that all three series can be evaluated
+    in one go. precision is "full" for the complete tables or "reduced" for the
+    tables cut down by truncate_coeffs() at reduced_vsop87_threshold.
+
+    """
+    check_precision(precision, ("full", "reduced"))
+    if precision not in packed_vsop87_coeffs :
+        tables = (heliocentric_longitude_coeffs, heliocentric_latitude_coeffs, sun_earth_distance_coeffs)
+        if precision == "reduced" :
+            tables = tuple(truncate_coeffs(table, reduced_vsop87_threshold) for table in tables)
+        #end if
+        packed_vsop87_coeffs[precision] = pack_coeffs(*tables)
+    #end if
+    return \
+        packed_vsop87_coeffs[precision]
+#end get_packed_vsop87_coeffs
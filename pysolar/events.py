@@ -0,0 +1,260 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Times of sunrise, sunset, solar noon and twilight
+
+This follows Reda and Andreas (2005) appendix A.2. The sun's geocentric right
+ascension and declination are computed with the full algorithm once for 0h UT
+of each day, and interpolated quadratically between the neighbouring days. The
+time of transit (solar noon) and the times at which the sun's centre is at
+each of event_altitudes are first estimated from the values for the day, then
+corrected by a few Newton iterations on the interpolated values (the appendix
+makes just one), safeguarded by bisection so that they also converge on days
+when the sun only just reaches the altitude.
+
+The altitudes are geocentric, without refraction: -0.8333 degrees for sunrise
+and sunset allows for the sun's radius and the usual refraction at the
+horizon. Each day runs from local midnight, taken from utc_offset (hours ahead
+of UTC) or, if that is None, from local mean time at the site's longitude; the
+events reported are those around the transit within that day. Where the sun
+does not reach an altitude on a day (polar day or night), the time for it is
+NaN, or None from get_events().
+
+"""
+import collections
+import datetime
+import numpy as np
+from . import time
+from . import vectorized
+
+SolarEvents = collections.namedtuple \
+  (
+    "SolarEvents",
+    (
+        "transit",
+        "sunrise", "sunset",
+        "civil_dawn", "civil_dusk",
+        "nautical_dawn", "nautical_dusk",
+        "astronomical_dawn", "astronomical_dusk",
+    )
+  )
+
+# geocentric altitude of the sun's centre for each pair of events after the transit
+event_altitudes = (-0.8333, -6.0, -12.0, -18.0)
+
+default_iterations = 6
+
+class DailyEphemeris :
+    "the sun's geocentric right ascension and declination, and the apparent sidereal" \
+    " time, at 0h UT of each of a range of days, with margin days more at each end for" \
+    " interpolation."
+
+    margin = 3 # enough for events up to a day and a half either side of the date
+
+    def __init__(self, first_date, nr_days, precision = "full") :
+        self.first_date = np.datetime64(first_date, "D")
+        dates = self.first_date + np.arange(-self.margin, nr_days + self.margin)
+        self.midnights = time.get_timestamps(dates)
+        instants = time.Instants.from_timestamps(self.midnights)
+        ephemeris = vectorized.SolarEphemeris.from_julian_days(instants.jd, instants.jde, precision)
+        self.right_ascension = ephemeris.right_ascension
+        self.declination = ephemeris.declination
+        self.apparent_sidereal_time = ephemeris.apparent_sidereal_time
+    #end __init__
+
+    def interpolate(self, day, fraction) :
+        "returns the right ascension, declination and sidereal time at fraction of a day" \
+        " after 0h UT on day days after first_date, interpolating about the nearest 0h."
+        nearest = np.rint(np.where(np.isnan(fraction), 0, fraction)) # no event stays NaN
+        index = day + nearest.astype(np.int64) + self.margin
+        n = fraction - nearest
+        def quadratic(values, wrap) :
+            # Reda and Andreas equation A.30
+            a = values[index] - values[index - 1]
+            b = values[index + 1] - values[index]
+            if wrap :
+                a = (a + 180) % 360 - 180
+                b = (b + 180) % 360 - 180
+            #end if
+            return \
+                values[index] + n * (a + b + (b - a) * n) / 2
+        #end quadratic
+        return \
+            (
+                quadratic(self.right_ascension, True),
+                quadratic(self.declination, False),
+                self.apparent_sidereal_time[index] + 360.985647 * n,
+            )
+    #end interpolate
+
+#end DailyEphemeris
+
+def _solve(ephemeris, latitude_deg, longitude_deg, day, day_start, altitudes, iterations) :
+    # returns fractions of a day after 0h UT of each day (a list of arrays broadcast
+    # from the arguments: the transit, then dawn and dusk for each of altitudes), and
+    # the geocentric altitude at transit. day_start is the start of the day in the same
+    # terms; the transit is found within it.
+    latitude_rad = np.radians(latitude_deg)
+    sin_latitude = np.sin(latitude_rad)
+    cos_latitude = np.cos(latitude_rad)
+
+    def hour_angle(fraction) :
+        right_ascension, declination, sidereal_time = ephemeris.interpolate(day, fraction)
+        return \
+            (sidereal_time + longitude_deg - right_ascension + 180) % 360 - 180, np.radians(declination)
+    #end hour_angle
+
+    def altitude_rate(fraction) :
+        # geocentric altitude and its rate of change, in degrees and degrees per day
+        local_hour_angle, declination_rad = hour_angle(fraction)
+        local_hour_angle_rad = np.radians(local_hour_angle)
+        altitude_rad = np.arcsin \
+          (
+                sin_latitude * np.sin(declination_rad)
+            +
+                cos_latitude * np.cos(declination_rad) * np.cos(local_hour_angle_rad)
+          )
+        return \
+            (
+                np.degrees(altitude_rad),
+                -360 * cos_latitude * np.cos(declination_rad) * np.sin(local_hour_angle_rad) / np.cos(altitude_rad),
+            )
+    #end altitude_rate
+
+    index = day + ephemeris.margin
+    transit = (ephemeris.right_ascension[index] - longitude_deg - ephemeris.apparent_sidereal_time[index]) / 360
+    transit = day_start + (transit - day_start) % 1
+    for i in range(iterations) :
+        transit = transit - hour_angle(transit)[0] / 360
+    #end for
+    declination_rad = np.radians(ephemeris.declination[index])
+    transit_altitude = altitude_rate(transit)[0]
+    events = [transit]
+    with np.errstate(invalid = "ignore", divide = "ignore") :
+        for altitude in altitudes :
+            cos_half_day = (np.sin(np.radians(altitude)) - sin_latitude * np.sin(declination_rad)) / (cos_latitude * np.cos(declination_rad))
+            half_day = np.degrees(np.arccos(np.clip(cos_half_day, -1, 1))) / 360
+            for sign in (-1, 1) :
+                # the sun crosses the altitude between the transit and the antitransit half
+                # a day away if it is above at one and below at the other; refine the estimate
+                # by Newton's method (Reda and Andreas equations A.34 and A.35), falling back
+                # to bisection of that interval where a step would leave it
+                near, far = transit, transit + sign * 0.5
+                happens = (transit_altitude > altitude) & (altitude_rate(far)[0] < altitude)
+                estimate = transit + sign * half_day
+                for i in range(iterations) :
+                    event_altitude, rate = altitude_rate(estimate)
+                    above = event_altitude > altitude
+                    near = np.where(above, estimate, near)
+                    far = np.where(above, far, estimate)
+                    estimate = estimate - (event_altitude - altitude) / rate
+                    outside = ~((estimate - near) * (estimate - far) <= 0) # also catches NaN
+                    estimate = np.where(outside, (near + far) / 2, estimate)
+                #end for
+                events.append(np.where(happens, estimate, np.nan))
+            #end for
+        #end for
+    #end with
+    return \
+        events, transit_altitude
+#end _solve
+
+def _get_event_timestamps(latitude_deg, longitude_deg, dates, utc_offset, altitudes, iterations, precision) :
+    # returns the timestamps of the events that _solve() finds, and the geocentric
+    # altitude at each transit.
+    dates = np.atleast_1d(np.asarray(dates, dtype = "datetime64[D]"))
+    if dates.ndim != 1 :
+        raise ValueError("dates must be a vector")
+    #end if
+    first_date = dates.min()
+    ephemeris = DailyEphemeris(first_date, int((dates.max() - first_date).astype(np.int64)) + 1, precision)
+    site = lambda x : np.reshape(x, (-1, 1)) if np.ndim(x) != 0 else x
+    latitude_deg, longitude_deg = (site(np.asarray(x, dtype = float)) for x in (latitude_deg, longitude_deg))
+    if utc_offset is None :
+        utc_offset = longitude_deg / 15 # local mean time
+    else :
+        utc_offset = site(np.asarray(utc_offset, dtype = float))
+    #end if
+    day = (dates - first_date).astype(np.int64)
+    events, transit_altitude = _solve(ephemeris, latitude_deg, longitude_deg, day, -utc_offset / 24, altitudes, iterations)
+    midnights = ephemeris.midnights[day + ephemeris.margin]
+    return \
+        list(midnights + event * time.seconds_per_day for event in events), transit_altitude
+#end _get_event_timestamps
+
+def get_event_timestamps(latitude_deg, longitude_deg, dates, utc_offset = None, iterations = default_iterations, precision = "full") :
+    "computes the events on each of the local dates (numpy.datetime64 values, or anything" \
+    " convertible to them, in increasing order) for each site, where the site arguments" \
+    " (and utc_offset, in hours) are scalars or vectors of length N. Returns a SolarEvents" \
+    " of POSIX timestamps, as (N, D) arrays for vectors of sites and D dates, with NaN" \
+    " where an event does not happen."
+    return \
+        SolarEvents(*_get_event_timestamps(latitude_deg, longitude_deg, dates, utc_offset, event_altitudes, iterations, precision)[0])
+#end get_event_timestamps
+
+SunriseSunset = collections.namedtuple("SunriseSunset", ("sunrise", "sunset", "polar_day", "polar_night"))
+
+def get_sunrise_sunset_array(latitude_deg, longitude_deg, start_date, end_date, utc_offset = None, unit = "s", precision = "full") :
+    "computes sunrise and sunset for each site on each local date from start_date up to" \
+    " but not including end_date (numpy.datetime64 values or datetime.date objects), where" \
+    " the site arguments (and utc_offset, in hours) are scalars or vectors of length N." \
+    " Returns a SunriseSunset of (N, D) arrays for vectors of sites and D dates: sunrise" \
+    " and sunset as numpy.datetime64 in the given unit (UTC), NaT where the sun does not" \
+    " rise or set, and boolean polar_day and polar_night flags for days when it does" \
+    " neither and stays above or below the horizon."
+    dates = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D"))
+    if len(dates) == 0 :
+        raise ValueError("end_date must be after start_date")
+    #end if
+    (transit, sunrise, sunset), transit_altitude = _get_event_timestamps(latitude_deg, longitude_deg, dates, utc_offset, event_altitudes[:1], default_iterations, precision)
+    neither = np.isnan(sunrise) & np.isnan(sunset)
+    above = transit_altitude > event_altitudes[0]
+    return \
+        SunriseSunset \
+          (
+            sunrise = time.get_datetime64(sunrise, unit),
+            sunset = time.get_datetime64(sunset, unit),
+            polar_day = neither & above,
+            polar_night = neither & ~above,
+          )
+#end get_sunrise_sunset_array
+
+def get_events(latitude_deg, longitude_deg, when, iterations = default_iterations, precision = "full") :
+    "returns a SolarEvents of timezone-aware datetime.datetime objects (in the timezone" \
+    " of when, or UTC if it is naive) for the local date of when at the given site, with" \
+    " None for any events that do not happen that day."
+    utc_offset = when.utcoffset()
+    utc_offset = utc_offset.total_seconds() / 3600 if utc_offset != None else 0
+    tz = when.tzinfo if when.tzinfo != None else datetime.timezone.utc
+    events = get_event_timestamps(latitude_deg, longitude_deg, [when.date()], utc_offset, iterations, precision)
+    return \
+        SolarEvents \
+          (
+            *(
+                datetime.datetime.fromtimestamp(float(event[0]), tz) if not np.isnan(event[0]) else None
+                for event in events
+            )
+          )
+#end get_events
+
+def get_sunrise_sunset(latitude_deg, longitude_deg, when) :
+    "accurate alternative to util.get_sunrise_sunset(); returns the sunrise and sunset" \
+    " on the local date of when, either of which may be None in polar regions."
+    events = get_events(latitude_deg, longitude_deg, when)
+    return \
+        events.sunrise, events.sunset
+#end get_sunrise_sunset
@@ -0,0 +1,252 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Precomputed solar position tables for fixed sites
+
+A SiteTable holds the direction of the sun from each of a set of sites at a
+coarse cadence (by default every 10 minutes) over a span of time, computed with
+the full algorithm. Positions at any instant within the span are then found by
+cubic Hermite interpolation between the two neighbouring entries, which costs a
+few dozen arithmetic operations instead of the whole algorithm.
+
+The entries are evenly spaced in UT (Julian day), in which the sun's apparent
+motion is smooth, rather than in UTC, which jumps relative to it at every leap
+second. delta_t also changes in steps at the start of each month, which the full
+algorithm follows and the table smooths over, so within a step of a month
+boundary the two can differ by up to a few times 1e-7 degrees.
+
+What is interpolated is the unrefracted direction of the sun as a unit vector
+(east, north, up), which varies smoothly even where the azimuth does not (near
+the zenith), and the atmospheric refraction correction is then applied exactly
+as vectorized.get_position() does. The tangents at each entry come from
+fourth-order central differences of its neighbours. Building a table also
+compares the interpolation against the full algorithm at every midpoint between
+entries, where its error is largest, and records as max_error the larger of the
+worst angle between the two directions (which bounds the error in azimuth times
+the cosine of the altitude) and the worst difference in (refracted) altitude.
+Errors at other instants stay within a few percent of it; at the default
+10-minute cadence it is about 2e-7 degrees.
+
+"""
+import collections
+import numpy as np
+from . import constants
+from . import time
+from . import vectorized
+
+LookupPosition = collections.namedtuple("LookupPosition", ("altitude", "azimuth", "declination", "equation_of_time"))
+
+block_size = 2 ** 20 # number of site-times computed at once while building
+
+def _get_directions(ephemeris, latitude_deg, longitude_deg, elevation, temperature, pressure) :
+    # returns (N, M, 3) unit vectors towards the unrefracted sun for N sites and the
+    # M times of ephemeris, computed with the full algorithm, and the altitudes.
+    position = ephemeris.topocentric_matrix(latitude_deg, longitude_deg, elevation, temperature, pressure)
+    elevation_rad = np.radians(position.altitude - position.refraction_correction)
+    azimuth_rad = np.radians(180 - position.azimuth) # clockwise from north
+    directions = np.stack \
+      (
+        (
+            np.cos(elevation_rad) * np.sin(azimuth_rad),
+            np.cos(elevation_rad) * np.cos(azimuth_rad),
+            np.sin(elevation_rad),
+        ),
+        axis = -1
+      )
+    return \
+        directions, position.altitude
+#end _get_directions
+
+def _interpolate(nodes, index, fraction) :
+    # cubic Hermite interpolation in nodes along axis 0 (padded with 2 extra entries at
+    # each end) between entries index and index + 1 of the unpadded table.
+    fraction = np.reshape(fraction, fraction.shape + (1,) * (nodes.ndim - 1))
+    p = [nodes[index + k] for k in range(6)] # entries index - 2 to index + 3
+    tangent0 = (p[0] - 8 * p[1] + 8 * p[3] - p[4]) / 12
+    tangent1 = (p[1] - 8 * p[2] + 8 * p[4] - p[5]) / 12
+    f2 = fraction * fraction
+    f3 = f2 * fraction
+    return \
+        (
+            (2 * f3 - 3 * f2 + 1) * p[2]
+        +
+            (f3 - 2 * f2 + fraction) * tangent0
+        +
+            (-2 * f3 + 3 * f2) * p[3]
+        +
+            (f3 - f2) * tangent1
+        )
+#end _interpolate
+
+class SiteTable :
+    "precomputed solar positions for fixed sites; see the module description." \
+    " Build one with SiteTable.build() or SiteTable.load()."
+
+    site_attributes = ("latitude", "longitude", "elevation", "temperature", "pressure")
+
+    def __init__(self, start_jd, step_days, sites, directions, declination, equation_of_time, max_error, precision) :
+        self.start_jd = start_jd # UT Julian day of the first entry
+        self.step_days = step_days # between entries
+        for name, values in zip(self.site_attributes, sites) :
+            setattr(self, name, values)
+        #end for
+        self.directions = directions # (N, M + 4, 3), with 2 extra entries at each end
+        self.declination = declination # (M + 4,), geocentric
+        self.equation_of_time = equation_of_time # (M + 4,), minutes
+        self.max_error = max_error
+        self.precision = precision
+    #end __init__
+
+    @classmethod
+    def build(cls, latitude_deg, longitude_deg, start_datetime, end_datetime, step_minutes = 10, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full", tolerance = None) :
+        "computes a table for the sites (scalars or vectors of length N) over the span" \
+        " from start_datetime to end_datetime, with entries every step_minutes. If tolerance" \
+        " is not None, raises ValueError if max_error (in degrees) exceeds it."
+        start_jd, end_jd = (time.get_julian_days(when)[0] for when in (start_datetime, end_datetime))
+        step_days = step_minutes / (24 * 60)
+        count = int(np.ceil((end_jd - start_jd) / step_days - 1e-9)) + 1 # entries up to and including the end
+        if count < 2 :
+            raise ValueError("span must cover at least one step")
+        #end if
+        sites = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype = float)) for x in (latitude_deg, longitude_deg, elevation, temperature, pressure)))
+        nr_sites = len(sites[0])
+        instants = time.Instants.from_julian_days(start_jd + np.arange(-2, count + 2) * step_days)
+        ephemeris = vectorized.SolarEphemeris.from_julian_days(instants.jd, instants.jde, precision)
+        directions = np.empty((nr_sites, count + 4, 3))
+        sites_per_block = max(1, block_size // (count + 4))
+        for first in range(0, nr_sites, sites_per_block) :
+            block = slice(first, first + sites_per_block)
+            directions[block] = _get_directions(ephemeris, *(x[block] for x in sites))[0]
+        #end for
+        result = cls(start_jd, step_days, sites, directions, ephemeris.declination, ephemeris.equation_of_time, None, precision)
+        # check against the full algorithm halfway between entries
+        midpoints = time.Instants.from_julian_days(start_jd + (np.arange(count - 1) + 0.5) * step_days)
+        midpoint_ephemeris = vectorized.SolarEphemeris.from_julian_days(midpoints.jd, midpoints.jde, precision)
+        index = np.arange(count - 1)
+        max_error = 0.0
+        for first in range(0, nr_sites, sites_per_block) :
+            block = slice(first, first + sites_per_block)
+            expected, expected_altitude = _get_directions(midpoint_ephemeris, *(x[block] for x in sites))
+            interpolated = _interpolate(np.moveaxis(directions[block], 1, 0), index, np.full(count - 1, 0.5))
+            interpolated = np.moveaxis(interpolated, 0, 1)
+            interpolated /= np.linalg.norm(interpolated, axis = -1, keepdims = True)
+            cos_error = np.sum(interpolated * expected, axis = -1)
+            sin_error = np.linalg.norm(np.cross(interpolated, expected), axis = -1)
+            altitude = result.get_altitude(midpoints, block)
+            max_error = max \
+              (
+                max_error,
+                np.degrees(np.arctan2(sin_error, cos_error)).max(),
+                np.abs(altitude - expected_altitude).max(),
+              )
+        #end for
+        result.max_error = float(max_error)
+        if tolerance != None and result.max_error > tolerance :
+            raise ValueError("interpolation error %.3g degrees exceeds tolerance %.3g; use a smaller step" % (result.max_error, tolerance))
+        #end if
+        return \
+            result
+    #end build
+
+    @property
+    def end_jd(self) :
+        "the UT Julian day of the last entry; queries must lie between start_jd and end_jd."
+        return \
+            self.start_jd + (self.directions.shape[1] - 5) * self.step_days
+    #end end_jd
+
+    def _locate(self, jd) :
+        # returns the entry index and fraction of a step beyond it for each Julian day
+        offset = (jd - self.start_jd) / self.step_days
+        count = self.directions.shape[1] - 4
+        slack = 1e-6 # allow for rounding at the ends, a fraction of a millisecond
+        if np.any(offset < -slack) or np.any(offset > count - 1 + slack) :
+            raise ValueError("time outside the span of the table, Julian days %.6f to %.6f" % (self.start_jd, self.end_jd))
+        #end if
+        index = np.clip(np.floor(offset).astype(np.int64), 0, count - 2)
+        return \
+            index, offset - index
+    #end _locate
+
+    def get_position(self, when, sites = slice(None)) :
+        "returns a LookupPosition of (N, T) arrays for the T instants when (anything" \
+        " accepted by time.get_instants()) and the sites selected by sites (an index" \
+        " or slice into the sites the table was built for, by default all of them)." \
+        " declination (geocentric) and equation_of_time (minutes) are (T,) arrays."
+        index, fraction = self._locate(np.ravel(time.get_instants(when).jd))
+        directions = _interpolate(np.moveaxis(self.directions[sites], -2, 0), index, fraction)
+        directions = np.moveaxis(directions, 0, -2)
+        east, north, up = (directions[..., i] for i in range(3))
+        elevation_angle = np.degrees(np.arctan2(up, np.hypot(east, north)))
+        temperature, pressure = \
+            (np.reshape(x[sites], np.shape(x[sites]) + (1,)) for x in (self.temperature, self.pressure))
+        altitude = elevation_angle + vectorized.get_refraction_correction(pressure, temperature, elevation_angle)
+        azimuth = -1 * ((np.degrees(np.arctan2(east, north)) - 180) % 360) # same range as vectorized.get_azimuth()
+        return \
+            LookupPosition \
+              (
+                altitude = altitude,
+                azimuth = azimuth,
+                declination = _interpolate(self.declination, index, fraction),
+                equation_of_time = _interpolate(self.equation_of_time, index, fraction),
+              )
+    #end get_position
+
+    def get_altitude(self, when, sites = slice(None)) :
+        return self.get_position(when, sites).altitude
+    #end get_altitude
+
+    def get_azimuth(self, when, sites = slice(None)) :
+        return self.get_position(when, sites).azimuth
+    #end get_azimuth
+
+    def save(self, filename) :
+        "writes the table to filename (a NumPy .npz file), for SiteTable.load()."
+        np.savez \
+          (
+            filename,
+            start_jd = np.array(self.start_jd),
+            step_days = np.array(self.step_days),
+            directions = self.directions,
+            declination = self.declination,
+            equation_of_time = self.equation_of_time,
+            max_error = np.array(self.max_error),
+            precision = np.array(self.precision),
+            **dict((name, getattr(self, name)) for name in self.site_attributes)
+          )
+    #end save
+
+    @classmethod
+    def load(cls, filename) :
+        "reads a table written by save()."
+        with np.load(filename) as data :
+            return \
+                cls \
+                  (
+                    start_jd = float(data["start_jd"]),
+                    step_days = float(data["step_days"]),
+                    sites = tuple(data[name] for name in cls.site_attributes),
+                    directions = data["directions"],
+                    declination = data["declination"],
+                    equation_of_time = data["equation_of_time"],
+                    max_error = float(data["max_error"]),
+                    precision = str(data["precision"]),
+                  )
+        #end with
+    #end load
+
+#end SiteTable
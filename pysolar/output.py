@@ -0,0 +1,146 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Memory-mapped output files for large simulations
+
+write_span() streams the results of vectorized.simulate_span_chunks() into a
+file instead of holding them in memory. The file is in the standard NumPy .npy
+format (a short text header giving the dtype and shape, followed by the raw
+array in C order), holding the same structured array, with the fields in
+vectorized.simulation_fields, that vectorized.simulate_span_array() returns.
+open_span() (or numpy.load(filename, mmap_mode = "r")) maps it back into
+memory without copying or reading it all in.
+
+Alongside it, a small JSON file (filename + ".progress") records the span and
+how many steps have been written. Each chunk is flushed to disk before the
+count is updated, so an interrupted run can be resumed by calling write_span()
+again with the same arguments.
+
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from . import constants
+from . import vectorized
+
+def get_progress_filename(filename) :
+    return \
+        filename + ".progress"
+#end get_progress_filename
+
+def _write_progress(filename, progress) :
+    # replaces the progress file atomically, so it is never seen half written
+    progress_filename = get_progress_filename(filename)
+    with open(progress_filename + ".tmp", "w") as out :
+        json.dump(progress, out)
+    #end with
+    os.replace(progress_filename + ".tmp", progress_filename)
+#end _write_progress
+
+def _read_progress(filename) :
+    progress_filename = get_progress_filename(filename)
+    if not os.path.exists(filename) or not os.path.exists(progress_filename) :
+        return None
+    #end if
+    with open(progress_filename, "r") as data :
+        return json.load(data)
+    #end with
+#end _read_progress
+
+def _get_sites_digest(*arrays) :
+    # returns a hex digest of the values, shapes and types of the site arguments, for
+    # recognizing a resumed run with the same sites
+    digest = hashlib.sha256()
+    for values in arrays :
+        values = np.ascontiguousarray(values)
+        digest.update(repr((values.shape, values.dtype.str)).encode())
+        digest.update(values.tobytes())
+    #end for
+    return \
+        digest.hexdigest()
+#end _get_sites_digest
+
+def open_span(filename, mode = "r") :
+    "maps a file written by write_span() (or parallel.simulate_sites()) into memory as" \
+    " a numpy.memmap, without reading it in. mode is as for numpy.load(mmap_mode)."
+    return \
+        np.load(filename, mmap_mode = mode)
+#end open_span
+
+def create_span(filename, shape, dtype) :
+    "creates (or replaces) the .npy file filename to hold an array of the given shape" \
+    " and dtype, initially zero, and returns it as a writable numpy.memmap."
+    return \
+        np.lib.format.open_memmap(filename, mode = "w+", dtype = dtype, shape = shape)
+#end create_span
+
+def is_complete(filename) :
+    "returns True if write_span() has finished writing filename."
+    progress = _read_progress(filename)
+    return \
+        progress != None and progress["steps_done"] == progress["steps"]
+#end is_complete
+
+def write_span(filename, latitude_deg, longitude_deg, horizon, start_datetime, end_datetime, step_minutes, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full", chunk_size = vectorized.default_chunk_size, resume = True):
+    """computes vectorized.simulate_span_array() for the given site(s) and span in
+    chunks of chunk_size steps, writing each chunk straight into the .npy file
+    filename, and returns the finished file opened with open_span(). Memory use
+    depends only on chunk_size and the number of sites, not on the length of the span.
+
+    If resume and filename holds an unfinished run, it is continued from the last
+    chunk written, provided the run was for the same span (start, step and number of
+    steps), shape, dtype and precision, and for the same sites: a digest of the values
+    of latitude_deg, longitude_deg, horizon, elevation, temperature and pressure is
+    recorded and compared. Otherwise the file is created afresh."""
+    start, step, count = vectorized.get_time_range_steps(start_datetime, end_datetime, step_minutes)
+    horizon = np.asarray(horizon)
+    sites_shape = np.broadcast_shapes(*(np.shape(x) for x in (latitude_deg, longitude_deg, elevation, temperature, pressure)))
+    shape = sites_shape + (count,)
+    dtype = vectorized.get_simulation_dtype(horizon.dtype)
+    span = \
+        {
+            "start" : str(start),
+            "step" : str(step),
+            "steps" : count,
+            "shape" : list(shape),
+            "dtype" : dtype.descr,
+            "precision" : precision,
+            "sites" : _get_sites_digest(latitude_deg, longitude_deg, horizon, elevation, temperature, pressure),
+        }
+    progress = _read_progress(filename) if resume else None
+    if progress != None and all(json.loads(json.dumps(span[k])) == progress[k] for k in span) :
+        result = open_span(filename, mode = "r+")
+        first_step = progress["steps_done"]
+    else :
+        result = create_span(filename, shape, dtype)
+        first_step = 0
+        progress = dict(span, steps_done = 0)
+        _write_progress(filename, progress)
+    #end if
+    for times in vectorized.get_time_range_chunks(start_datetime, end_datetime, step_minutes, chunk_size, first_step) :
+        ephemeris = vectorized.SolarEphemeris(times, precision)
+        last_step = first_step + len(times)
+        result[..., first_step:last_step] = vectorized.simulate_ephemeris(latitude_deg, longitude_deg, horizon, times, ephemeris, elevation, temperature, pressure)
+        result.flush()
+        progress["steps_done"] = first_step = last_step
+        _write_progress(filename, progress)
+    #end for
+    del result # closes the mapping
+    return \
+        open_span(filename)
+#end write_span
@@ -0,0 +1,251 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Parallel simulation of many sites over one time span
+
+simulate_sites() runs vectorized.simulate_span_array() for N sites across a
+pool of worker processes. The location-independent ephemeris for the span is
+computed once, in the calling process, and shared with the workers through
+shared memory, as is the (N, steps) result array they write into. The work is
+split into blocks of sites by chunks of time; each block is written to its own
+place in the result, so the output does not depend on the order in which the
+workers finish.
+
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import numpy as np
+from . import constants
+from . import output
+from . import vectorized
+
+block_size = 2 ** 20 # default number of site-steps computed by one task
+
+class SharedArray :
+    "a NumPy array in a multiprocessing.shared_memory block, which other processes can" \
+    " attach to by passing SharedArray(*spec)."
+
+    def __init__(self, shape, dtype, name = None) :
+        dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        if name == None :
+            size = max(int(np.prod(self.shape)) * dtype.itemsize, 1)
+            self.memory = shared_memory.SharedMemory(create = True, size = size)
+            self.owner = True
+        else :
+            self.memory = shared_memory.SharedMemory(name = name)
+            self.owner = False
+        #end if
+        self.array = np.ndarray(self.shape, dtype = dtype, buffer = self.memory.buf)
+    #end __init__
+
+    @property
+    def spec(self) :
+        return \
+            (self.shape, self.dtype, self.memory.name)
+    #end spec
+
+    def close(self) :
+        "detaches from the shared memory, freeing it if this process created it."
+        self.array = None
+        self.memory.close()
+        if self.owner :
+            self.memory.unlink()
+        #end if
+    #end close
+
+#end SharedArray
+
+def _get_tasks(nr_sites, nr_steps, sites_per_task, steps_per_task) :
+    # yields (site slice, step slice) pairs covering the whole result, in order
+    for first_step in range(0, nr_steps, steps_per_task) :
+        for first_site in range(0, nr_sites, sites_per_task) :
+            yield \
+                (
+                    slice(first_site, min(first_site + sites_per_task, nr_sites)),
+                    slice(first_step, min(first_step + steps_per_task, nr_steps)),
+                )
+        #end for
+    #end for
+#end _get_tasks
+
+_worker = None # state of the current worker process, set by _init_worker()
+
+def _init_worker(sites, horizon, precision, times_spec, ephemeris_spec, result_spec) :
+    global _worker
+    times = SharedArray(*times_spec)
+    ephemeris = SharedArray(*ephemeris_spec)
+    shared = [times, ephemeris]
+    if isinstance(result_spec, str) : # name of a .npy file
+        result = output.open_span(result_spec, mode = "r+")
+    else :
+        result = SharedArray(*result_spec)
+        shared.append(result)
+        result = result.array
+    #end if
+    _worker = \
+        {
+            "sites" : sites,
+            "horizon" : horizon,
+            "shared" : shared,
+            "times" : times.array,
+            "ephemeris" : vectorized.SolarEphemeris.from_attributes
+              (
+                precision,
+                **dict(zip(vectorized.SolarEphemeris.topocentric_attributes, ephemeris.array))
+              ),
+            "result" : result,
+        }
+#end _init_worker
+
+def _close_worker() :
+    global _worker
+    for item in _worker["shared"] :
+        item.close()
+    #end for
+    _worker = None
+#end _close_worker
+
+def _run_task(task) :
+    site_slice, step_slice = task
+    latitude_deg, longitude_deg, elevation, temperature, pressure = \
+        (x[site_slice] if np.ndim(x) != 0 else x for x in _worker["sites"])
+    horizon = _worker["horizon"]
+    if horizon.ndim != 1 :
+        horizon = horizon[site_slice]
+    #end if
+    _worker["result"][site_slice, step_slice] = vectorized.simulate_ephemeris \
+      (
+        latitude_deg,
+        longitude_deg,
+        horizon,
+        _worker["times"][step_slice],
+        _worker["ephemeris"].select(step_slice),
+        elevation,
+        temperature,
+        pressure,
+      )
+    if isinstance(_worker["result"], np.memmap) :
+        _worker["result"].flush()
+    #end if
+    return \
+        task
+#end _run_task
+
+def simulate_sites(latitude_deg, longitude_deg, horizon, start_datetime, end_datetime, step_minutes, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full", processes = None, steps_per_task = vectorized.default_chunk_size, sites_per_task = None, progress = None, filename = None):
+    """computes the same (N, steps) structured array as vectorized.simulate_span_array()
+    for N sites, using a pool of processes (default os.cpu_count()) that share the
+    ephemeris and write their results directly into shared memory.
+
+    The site arguments are scalars or vectors of length N (latitude_deg must be a
+    vector), and horizon is one profile for all sites or an (N, 360) array. Each task
+    computes sites_per_task sites (by default, enough to make about block_size
+    site-steps) over steps_per_task steps. If progress is not None, it is called in
+    this process as progress(done, total) each time a task completes. With
+    processes = 1, the tasks run in this process, without a pool.
+
+    If filename is None, the result is copied out of shared memory into an ordinary
+    array before the shared memory is released, so for a moment both are held and
+    peak memory use is twice the size of the result (N * steps records of
+    vectorized.get_simulation_dtype()). For large runs, pass a filename: the workers
+    then write the result into that .npy file (see the output module) instead of
+    shared memory, and it is returned opened from it with output.open_span(), without
+    any copy, so it need not fit in memory at all."""
+    latitude_deg = np.asarray(latitude_deg, dtype = float)
+    if latitude_deg.ndim != 1 :
+        raise ValueError("latitude_deg must be a vector of sites")
+    #end if
+    nr_sites = len(latitude_deg)
+    sites = tuple \
+      (
+        np.broadcast_to(x, (nr_sites,)) if np.ndim(x) != 0 else x
+        for x in (latitude_deg, longitude_deg, elevation, temperature, pressure)
+      )
+    horizon = np.asarray(horizon)
+    if horizon.ndim == 2 and horizon.shape[0] != nr_sites :
+        raise ValueError("horizon has %d rows for %d sites" % (horizon.shape[0], nr_sites))
+    #end if
+    if processes == None :
+        processes = os.cpu_count() or 1
+    #end if
+    if steps_per_task < 1 or processes < 1 or sites_per_task != None and sites_per_task < 1 :
+        raise ValueError("processes, steps_per_task and sites_per_task must be at least 1")
+    #end if
+    if sites_per_task == None :
+        sites_per_task = max(1, block_size // steps_per_task)
+    #end if
+    times = vectorized.get_time_range(start_datetime, end_datetime, step_minutes)
+    ephemeris = vectorized.SolarEphemeris(times, precision)
+    attributes = vectorized.SolarEphemeris.topocentric_attributes
+    shared = []
+    try :
+        shared_times = SharedArray(times.shape, times.dtype)
+        shared.append(shared_times)
+        shared_times.array[:] = times
+        shared_ephemeris = SharedArray((len(attributes),) + times.shape, float)
+        shared.append(shared_ephemeris)
+        for i, name in enumerate(attributes) :
+            shared_ephemeris.array[i] = getattr(ephemeris, name)
+        #end for
+        shape = (nr_sites,) + times.shape
+        dtype = vectorized.get_simulation_dtype(horizon.dtype)
+        if filename != None :
+            output.create_span(filename, shape, dtype) # which the workers reopen
+            result_spec = filename
+        else :
+            shared_result = SharedArray(shape, dtype)
+            shared.append(shared_result)
+            result_spec = shared_result.spec
+        #end if
+        initargs = (sites, horizon, precision, shared_times.spec, shared_ephemeris.spec, result_spec)
+        tasks = list(_get_tasks(nr_sites, len(times), sites_per_task, steps_per_task))
+        if processes == 1 :
+            _init_worker(*initargs)
+            try :
+                completed = map(_run_task, tasks)
+                for done, task in enumerate(completed, 1) :
+                    if progress != None :
+                        progress(done, len(tasks))
+                    #end if
+                #end for
+            finally :
+                _close_worker()
+            #end try
+        else :
+            with multiprocessing.Pool(processes, initializer = _init_worker, initargs = initargs) as pool :
+                for done, task in enumerate(pool.imap_unordered(_run_task, tasks), 1) :
+                    if progress != None :
+                        progress(done, len(tasks))
+                    #end if
+                #end for
+            #end with
+        #end if
+        if filename != None :
+            result = output.open_span(filename)
+        else :
+            result = shared_result.array.copy()
+        #end if
+    finally :
+        for item in shared :
+            item.close()
+        #end for
+    #end try
+    return \
+        result
+#end simulate_sites
@@ -15,7 +15,9 @@
 #    You should have received a copy of the GNU General Public License along
 #    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
 
+import collections
 import math
+import numpy as np
 from .constants import standard_pressure
 
 # single-scattering albedo used to calculate aerosol scattering transmittance;
@@ -69,8 +71,13 @@ def get_aerosol_scattering_transmittance(band, ma, tau_a):
     # returns Tas
     return math.exp(-ma * albedo[band] * tau_a)
 
-def get_backscattered_diffuse_broadband_irradiance(band, turbidity_alpha=1.3, turbidity_beta=0.6):
-    return get_backscattered_diffuse_broadband_irradiance_by_band("high-frequency", turbidity_alpha, turbidity_beta) + get_backscattered_diffuse_broadband_irradiance_by_band("low-frequency", turbidity_alpha, turbidity_beta)
+def get_backscattered_diffuse_broadband_irradiance(altitude_deg, pressure_millibars=standard_pressure_millibars, ozone_atm_cm=0.35, nitrogen_atm_cm=0.0002, precipitable_water_cm=5.0, turbidity_alpha=1.3, turbidity_beta=0.6):
+    total = 0
+    for band in ("high-frequency", "low-frequency"):
+        Ebi = get_beam_irradiance_by_band(band, altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
+        Edpi = get_diffuse_irradiance_by_band(band, altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
+        total += get_backscattered_diffuse_irradiance_by_band(band, Ebi, Edpi, turbidity_alpha, turbidity_beta)
+    return total
 
 def get_backscattered_diffuse_irradiance_by_band(band, Ebi, Edpi, turbidity_alpha=1.3, turbidity_beta=0.6):
     rhos = get_sky_albedo(band, turbidity_alpha, turbidity_beta)
@@ -89,34 +96,37 @@ def get_beam_irradiance_by_band(band, altitude_deg, pressure_millibars=standard_
     Ebni = get_direct_normal_irradiance_by_band(band, altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
     return Ebni * math.cos(math.radians(Z))
 
-def get_diffuse_broadband_irradiance(air_mass=1.66, turbidity_alpha=1.3, turbidity_beta=0.6):
-    return get_diffuse_irradiance_by_band("high-frequency", air_mass, turbidity_alpha, turbidity_beta) + get_diffuse_irradiance_by_band("low-frequency", air_mass, turbidity_alpha, turbidity_beta)
+def get_diffuse_broadband_irradiance(altitude_deg, pressure_millibars=standard_pressure_millibars, ozone_atm_cm=0.35, nitrogen_atm_cm=0.0002, precipitable_water_cm=5.0, turbidity_alpha=1.3, turbidity_beta=0.6):
+    return get_diffuse_irradiance_by_band("high-frequency", altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta) + get_diffuse_irradiance_by_band("low-frequency", altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
 
 
-def get_diffuse_irradiance_by_band(band, air_mass=1.66, turbidity_alpha=1.3, turbidity_beta=0.6):
+def get_diffuse_irradiance_by_band(band, altitude_deg, pressure_millibars=standard_pressure_millibars, ozone_atm_cm=0.35, nitrogen_atm_cm=0.0002, precipitable_water_cm=5.0, turbidity_alpha=1.3, turbidity_beta=0.6):
+    # sky diffuse irradiance on a horizontal surface, before backscattering, from [Gueymard, 2008]
     Z = 90 - altitude_deg
-    effective_wavelength = get_effective_aerosol_wavelength(band, turbidity_alpha)
-    tau_a = get_aerosol_optical_depth(
-        turbidity_beta, effective_wavelength, turbidity_alpha)
     ma = get_optical_mass_aerosol(altitude_deg)
     mo = get_optical_mass_ozone(altitude_deg)
-    mR = get_optical_mass_rayleigh(altitude_deg, pressure_millibars)
+    mR = get_optical_mass_rayleigh(altitude_deg, standard_pressure_millibars)
+    mRprime = get_optical_mass_rayleigh(altitude_deg, pressure_millibars)
+    effective_wavelength = get_effective_aerosol_wavelength(band, ma, turbidity_alpha, turbidity_beta)
+    tau_a = get_aerosol_optical_depth(
+        turbidity_beta, effective_wavelength, turbidity_alpha)
 
-    To = get_ozone_transmittance(band, mo)
-    Tg = get_gas_transmittance(band, mR)
-    Tn = get_nitrogen_transmittance(band, 1.66)
-    Tw = get_water_vapor_transmittance(band, 1.66)
-    TR = get_rayleigh_transmittance(band, mR)
+    To = get_ozone_transmittance(band, mo, ozone_atm_cm)
+    Tg = get_gas_transmittance(band, mRprime)
+    # nitrogen and water vapour transmittances at the effective air mass of 1.66 for diffuse light
+    Tn = get_nitrogen_transmittance(band, 1.66, nitrogen_atm_cm)
+    Tw = get_water_vapor_transmittance(band, 1.66, precipitable_water_cm)
+    TR = get_rayleigh_transmittance(band, mRprime)
     Ta = get_aerosol_transmittance(band, ma, tau_a)
     Tas = get_aerosol_scattering_transmittance(band, ma, tau_a)
 
-    BR = get_rayleigh_extinction_forward_scattering_fraction(band, air_mass)
+    BR = get_rayleigh_extinction_forward_scattering_fraction(band, mR)
     Ba = get_aerosol_forward_scatterance_factor(altitude_deg)
     F = get_aerosol_scattering_correction_factor(band, ma, tau_a)
 
     Edpi = To * Tg * Tn * Tw * \
         (BR * (1 - TR) * Ta ** 0.25 + Ba * F * TR * (1 - Tas ** 0.25)) * \
-        E0n[band]
+        E0n[band] * math.cos(math.radians(Z))
     return Edpi
 
 
@@ -131,8 +141,7 @@ def get_broadband_direct_normal_irradiance(altitude_deg, pressure_millibars=stan
 def get_direct_normal_irradiance_by_band(band, altitude_deg, pressure_millibars=standard_pressure_millibars, ozone_atm_cm=0.35, nitrogen_atm_cm=0.0002, precipitable_water_cm=5.0, turbidity_alpha=1.3, turbidity_beta=0.6):
     ma = get_optical_mass_aerosol(altitude_deg)
     mo = get_optical_mass_ozone(altitude_deg)
-    mR = get_optical_mass_rayleigh(altitude_deg, pressure_millibars)
-    mRprime = mR * pressure_millibars / standard_pressure_millibars
+    mRprime = get_optical_mass_rayleigh(altitude_deg, pressure_millibars)
     mw = get_optical_mass_water(altitude_deg)
 
     effective_wavelength = get_effective_aerosol_wavelength(
@@ -181,8 +190,8 @@ def get_global_broadband_irradiance(altitude_deg, pressure_millibars=standard_pr
     Eb_high = get_beam_irradiance_by_band("high-frequency", altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
     Eb_low  = get_beam_irradiance_by_band("low-frequency",  altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
 
-    Edp_high = get_diffuse_irradiance_by_band("high-frequency", air_mass, turbidity_alpha, turbidity_beta)
-    Edp_low  = get_diffuse_irradiance_by_band("low-frequency",  air_mass, turbidity_alpha, turbidity_beta)
+    Edp_high = get_diffuse_irradiance_by_band("high-frequency", altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
+    Edp_low  = get_diffuse_irradiance_by_band("low-frequency",  altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
 
     Edd_high = get_backscattered_diffuse_irradiance_by_band("high-frequency", Eb_high, Edp_high, turbidity_alpha, turbidity_beta)
     Edd_low  = get_backscattered_diffuse_irradiance_by_band("low-frequency", Eb_low, Edp_low, turbidity_alpha, turbidity_beta)
@@ -207,29 +216,26 @@ def get_nitrogen_transmittance(band, mw, nitrogen_atm_cm):
         return 1.0
 
 
-# from Appendix B of [Gueymard, 2003]
+# from Appendix B of [Gueymard, 2003]: m = 1 / (cos Z + a Z ** b / (c - Z) ** d), Z in degrees
 def get_optical_mass_rayleigh(altitude_deg, pressure_millibars):
+    # includes the pressure correction, so this is mR' in [Gueymard, 2008]
     Z = 90 - altitude_deg
-    Z_rad = math.radians(Z)
-    return (pressure_millibars / standard_pressure_millibars) / ((math.cos(Z_rad) + 0.48353 * Z_rad ** 0.095846) / (96.741 - Z_rad) ** 1.754)
+    return (pressure_millibars / standard_pressure_millibars) / (math.cos(math.radians(Z)) + 0.48353 * Z ** 0.095846 / (96.741 - Z) ** 1.754)
 
 
 def get_optical_mass_ozone(altitude_deg):  # from Appendix B of [Gueymard, 2003]
     Z = 90 - altitude_deg
-    Z_rad = math.radians(Z)
-    return 1 / ((math.cos(Z_rad) + 1.0651 * Z_rad ** 0.6379) / (101.8 - Z_rad) ** 2.2694)
+    return 1 / (math.cos(math.radians(Z)) + 1.0651 * Z ** 0.6379 / (101.8 - Z) ** 2.2694)
 
 
 def get_optical_mass_water(altitude_deg):  # from Appendix B of [Gueymard, 2003]
     Z = 90 - altitude_deg
-    Z_rad = math.radians(Z)
-    return 1 / ((math.cos(Z_rad) + 0.10648 * Z_rad ** 0.11423) / (93.781 - Z_rad) ** 1.9203)
+    return 1 / (math.cos(math.radians(Z)) + 0.10648 * Z ** 0.11423 / (93.781 - Z) ** 1.9203)
 
 
 def get_optical_mass_aerosol(altitude_deg):  # from Appendix B of [Gueymard, 2003]
     Z = 90 - altitude_deg
-    Z_rad = math.radians(Z)
-    return 1 / ((math.cos(Z_rad) + 0.16851 * Z_rad ** 0.18198) / (95.318 - Z_rad) ** 1.9542)
+    return 1 / (math.cos(math.radians(Z)) + 0.16851 * Z ** 0.18198 / (95.318 - Z) ** 1.9542)
 
 
 def get_ozone_transmittance(band, mo, uo):
@@ -298,3 +304,327 @@ def get_water_vapor_transmittance_coefficients(band, w):
         c4 = w * (0.70992 - 0.23155 * w + 0.096514 * w ** 2) / \
             (1 + 0.44907 * w + 0.75425 * w ** 2)
         return [float('NaN'), c1, c2, c3, c4]
+
+# Array versions of the above, for whole series of altitudes at once. Each
+# evaluates both bands together, with the values for the bands in the order of
+# bands along a new leading axis; the optical masses, which do not depend on the
+# band, are computed once and shared between them. Where the two bands use
+# formulas of different shapes, they are written as one rational function, with
+# zero coefficients for the terms a band lacks.
+#
+# The coefficients that depend only on the state of the atmosphere are held in
+# an AtmosphereState, so that they need only be computed again when it changes.
+
+bands = ("high-frequency", "low-frequency")
+band_albedo = np.array([albedo[band] for band in bands])
+band_E0n = np.array([E0n[band] for band in bands])
+
+# coefficients (c0, c1, c2, c3) of (1 + c0 m + c1 m^2) / (1 + c2 m + c3 m^2) for each band
+rayleigh_transmittance_coeffs = np.array \
+  (
+    [
+        [1.8169, 0.033454, 2.063, 0.31978],
+        [-0.010394, 0.0, 0.0, -0.00011042],
+    ]
+  ).T
+gas_transmittance_coeffs = np.array \
+  (
+    [
+        [0.95885, 0.012871, 0.96321, 0.015455],
+        [0.27284, -0.00063699, 0.30306, 0.0],
+    ]
+  ).T
+nitrogen_transmittance_coeffs = np.array \
+  (
+    [
+        [
+            (0.17499 + 41.654 * un - 2146.4 * un ** 2) / (1 + 22295.0 * un ** 2),
+            un * (-1.2134 + 59.324 * un) / (1 + 8847.8 * un ** 2),
+            (0.17499 + 61.658 * un + 9196.4 * un ** 2) / (1 + 74109.0 * un ** 2),
+            0.0,
+        ],
+        [0.0, 0.0, 0.0, 0.0],
+    ]
+  ).T
+
+# coefficients (c0, c1, c2) of c0 + c1 mR + c2 mR^2 for each band in
+# get_rayleigh_extinction_forward_scattering_fraction()
+rayleigh_forward_scattering_coeffs = np.array \
+  (
+    [
+        [0.5 * 0.89013, -0.5 * 0.049558, 0.5 * 0.000045721],
+        [0.5, 0.0, 0.0],
+    ]
+  ).T
+band_ground_albedo = np.array([get_ground_albedo(band) for band in bands])
+diffuse_air_mass = 1.66 # for the nitrogen and water vapour transmittances of diffuse light
+
+OpticalMasses = collections.namedtuple("OpticalMasses", ("rayleigh", "ozone", "water", "aerosol"))
+ClearSkyIrradiance = collections.namedtuple \
+  (
+    "ClearSkyIrradiance",
+    (
+        "direct_normal", # DNI
+        "beam", # on a horizontal surface
+        "diffuse", # from the sky, before backscattering
+        "backscattered", # between the ground and the sky
+        "diffuse_horizontal", # DHI, diffuse plus backscattered
+        "global_horizontal", # GHI, beam plus diffuse_horizontal
+    )
+  )
+
+def _per_band(high, low) :
+    # stacks the values for the two bands along a new leading axis.
+    return \
+        np.stack(np.broadcast_arrays(high, low))
+#end _per_band
+
+def _align(values, ndim) :
+    # inserts axes of length 1 after the leading band axis of values so that what
+    # follows it broadcasts against arrays of ndim dimensions.
+    values = np.asarray(values)
+    return \
+        values.reshape((values.shape[0],) + (1,) * max(ndim - (values.ndim - 1), 0) + values.shape[1:])
+#end _align
+
+def _rational(coeffs, m) :
+    # evaluates (1 + c0 m + c1 m^2) / (1 + c2 m + c3 m^2) for both bands, where coeffs
+    # is a sequence of the four coefficients, each with the band along its leading axis.
+    c0, c1, c2, c3 = (_align(c, np.ndim(m)) for c in coeffs)
+    return \
+        (1 + c0 * m + c1 * m ** 2) / (1 + c2 * m + c3 * m ** 2)
+#end _rational
+
+def get_optical_masses(altitude_deg, pressure_millibars = standard_pressure_millibars) :
+    "array version of get_optical_mass_rayleigh(), get_optical_mass_ozone()," \
+    " get_optical_mass_water() and get_optical_mass_aerosol(), sharing the zenith" \
+    " angle between them. Returns an OpticalMasses of arrays."
+    Z = 90 - np.asarray(altitude_deg, dtype = float)
+    cos_Z = np.cos(np.radians(Z))
+    return \
+        OpticalMasses \
+          (
+            rayleigh = (pressure_millibars / standard_pressure_millibars) / (cos_Z + 0.48353 * Z ** 0.095846 / (96.741 - Z) ** 1.754),
+            ozone = 1 / (cos_Z + 1.0651 * Z ** 0.6379 / (101.8 - Z) ** 2.2694),
+            water = 1 / (cos_Z + 0.10648 * Z ** 0.11423 / (93.781 - Z) ** 1.9203),
+            aerosol = 1 / (cos_Z + 0.16851 * Z ** 0.18198 / (95.318 - Z) ** 1.9542),
+          )
+#end get_optical_masses
+
+def get_ozone_transmittance_coeffs(uo) :
+    "the coefficients for both bands of get_ozone_transmittance(), in the form used by" \
+    " rayleigh_transmittance_coeffs."
+    uo = np.asarray(uo, dtype = float)
+    f1 = uo * (10.979 - 8.5421 * uo) / (1 + 2.0115 * uo + 40.189 * uo ** 2)
+    f2 = uo * (-0.027589 - 0.005138 * uo) / (1 - 2.4857 * uo + 13.942 * uo ** 2)
+    f3 = uo * (10.995 - 5.5001 * uo) / (1 + 1.6784 * uo + 42.406 * uo ** 2)
+    return \
+        list(_per_band(f, 0.0) for f in (f1, f2, f3, 0.0))
+#end get_ozone_transmittance_coeffs
+
+def get_water_vapor_transmittance_coeffs(w) :
+    "array version of get_water_vapor_transmittance_coefficients() for both bands, in" \
+    " the form used by rayleigh_transmittance_coeffs."
+    w = np.asarray(w, dtype = float)
+    h1, h2 = get_water_vapor_transmittance_coefficients("high-frequency", w)[1:]
+    c1, c2, c3, c4 = get_water_vapor_transmittance_coefficients("low-frequency", w)[1:]
+    return \
+        [_per_band(h1, c1), _per_band(0.0, c2), _per_band(h2, c3), _per_band(0.0, c4)]
+#end get_water_vapor_transmittance_coeffs
+
+def get_effective_aerosol_wavelength_coeffs(turbidity_alpha) :
+    "the coefficients (p0, p1, p2, q1, q2) of (p0 + p1 ua + p2 ua^2) / (1 + q1 ua + q2 ua^2)" \
+    " for both bands of get_effective_aerosol_wavelength()."
+    a = np.asarray(turbidity_alpha, dtype = float)
+    d0 = 0.57664 - 0.024743 * a
+    d1 = (0.093942 - 0.2269 * a + 0.12848 * a ** 2) / (1 + 0.6418 * a)
+    d2 = (-0.093819 + 0.36668 * a - 0.12775 * a ** 2) / (1 - 0.11651 * a)
+    d3 = a * (0.15232 - 0.087214 * a + 0.012664 * a ** 2) / (1 - 0.90454 * a + 0.26167 * a ** 2)
+    e0 = (1.183 - 0.022989 * a + 0.020829 * a ** 2) / (1 + 0.11133 * a)
+    e1 = (-0.50003 - 0.18329 * a + 0.23835 * a ** 2) / (1 + 1.6756 * a)
+    e2 = (-0.50001 + 1.1414 * a + 0.0083589 * a ** 2) / (1 + 11.168 * a)
+    e3 = (-0.70003 - 0.73587 * a + 0.51509 * a ** 2) / (1 + 4.7665 * a)
+    return \
+        [_per_band(d0, e0), _per_band(d1, e1), _per_band(d2, e2), _per_band(0.0, e3), _per_band(d3, 0.0)]
+#end get_effective_aerosol_wavelength_coeffs
+
+def get_sky_albedo_array(turbidity_alpha, turbidity_beta) :
+    "array version of get_sky_albedo() for both bands."
+    return \
+        _per_band \
+          (
+            get_sky_albedo("high-frequency", np.asarray(turbidity_alpha, dtype = float), turbidity_beta),
+            get_sky_albedo("low-frequency", np.asarray(turbidity_alpha, dtype = float), turbidity_beta),
+          )
+#end get_sky_albedo_array
+
+class AtmosphereState :
+    "the state of the atmosphere for REST2, with all the coefficients that depend only on" \
+    " it computed up front. Each argument may be a scalar or an array, for example a" \
+    " series of hourly values, which must then broadcast against the altitudes it is" \
+    " used with. Build a new one when the atmosphere changes."
+
+    def __init__(self, pressure_millibars = standard_pressure_millibars, ozone_atm_cm = 0.35, nitrogen_atm_cm = 0.0002, precipitable_water_cm = 5.0, turbidity_alpha = 1.3, turbidity_beta = 0.6) :
+        self.pressure_millibars = pressure_millibars
+        self.ozone_atm_cm = ozone_atm_cm
+        self.nitrogen_atm_cm = nitrogen_atm_cm # unused, like get_nitrogen_transmittance(), which uses un
+        self.precipitable_water_cm = precipitable_water_cm
+        self.turbidity_alpha = turbidity_alpha
+        self.turbidity_beta = turbidity_beta
+        self.ozone_coeffs = get_ozone_transmittance_coeffs(ozone_atm_cm)
+        self.water_vapor_coeffs = get_water_vapor_transmittance_coeffs(precipitable_water_cm)
+        self.effective_wavelength_coeffs = get_effective_aerosol_wavelength_coeffs(turbidity_alpha)
+        self.sky_albedo = get_sky_albedo_array(turbidity_alpha, turbidity_beta)
+        self.band_alpha = _per_band(turbidity_alpha, turbidity_alpha)
+        self.band_beta = _per_band(turbidity_beta, turbidity_beta)
+        self.nitrogen_diffuse = np.minimum(1, _rational(nitrogen_transmittance_coeffs, diffuse_air_mass))
+        self.water_vapor_diffuse = _rational(self.water_vapor_coeffs, diffuse_air_mass)
+    #end __init__
+
+    def get_optical_masses(self, altitude_deg) :
+        "the optical masses at altitude_deg for the pressure of this atmosphere."
+        return \
+            get_optical_masses(altitude_deg, self.pressure_millibars)
+    #end get_optical_masses
+
+    def get_effective_aerosol_wavelength(self, ma) :
+        "array version of get_effective_aerosol_wavelength() for both bands."
+        p0, p1, p2, q1, q2 = (_align(c, np.ndim(ma)) for c in self.effective_wavelength_coeffs)
+        ua = np.log(1 + ma * _align(self.band_beta, np.ndim(ma)))
+        return \
+            (p0 + p1 * ua + p2 * ua ** 2) / (1 + q1 * ua + q2 * ua ** 2)
+    #end get_effective_aerosol_wavelength
+
+    def get_aerosol_optical_depth(self, ma) :
+        "array version of get_aerosol_optical_depth() for both bands."
+        ndim = np.ndim(ma)
+        return \
+            _align(self.band_beta, ndim) * self.get_effective_aerosol_wavelength(ma) ** -_align(self.band_alpha, ndim)
+    #end get_aerosol_optical_depth
+
+    def get_aerosol_scattering_correction_factor(self, ma, tau_a) :
+        "array version of get_aerosol_scattering_correction_factor() for both bands."
+        g0 = (3.715 + 0.368 * ma + 0.036294 * ma ** 2) / (1 + 0.0009391 * ma ** 2)
+        g1 = (-0.164 - 0.72567 * ma + 0.20701 * ma ** 2) / (1 + 0.001901 * ma ** 2)
+        g2 = (-0.052288 + 0.31902 * ma + 0.17871 * ma ** 2) / (1 + 0.0069592 * ma ** 2)
+        h0 = (3.4352 + 0.65267 * ma + 0.00034328 * ma ** 2) / (1 + 0.034388 * ma ** 1.5)
+        h1 = (1.231 - 1.63853 * ma + 0.20667 * ma ** 2) / (1 + 0.1451 * ma ** 1.5)
+        h2 = (0.8889 - 0.55063 * ma + 0.50152 * ma ** 2) / (1 + 0.14865 * ma ** 1.5)
+        return \
+            (_per_band(g0, h0) + _per_band(g1, h1) * tau_a) / (1 + _per_band(g2, h2) * tau_a)
+    #end get_aerosol_scattering_correction_factor
+
+    def _get_direct_transmittances(self, masses) :
+        # returns the aerosol optical depth and the transmittances of the direct beam
+        ma, mo, mRprime, mw = masses.aerosol, masses.ozone, masses.rayleigh, masses.water
+        tau_a = self.get_aerosol_optical_depth(ma)
+        TR = _rational(rayleigh_transmittance_coeffs, mRprime)
+        Tg = _rational(gas_transmittance_coeffs, mRprime)
+        To = _rational(self.ozone_coeffs, mo)
+        Tn = np.minimum(1, _rational(nitrogen_transmittance_coeffs, mw))
+        Tw = _rational(self.water_vapor_coeffs, mw)
+        Ta = np.exp(-ma * tau_a)
+        return \
+            tau_a, TR, Tg, To, Tn, Tw, Ta
+    #end _get_direct_transmittances
+
+    def get_direct_normal_irradiance(self, altitude_deg, masses = None) :
+        "array version of get_direct_normal_irradiance_by_band(), returning the irradiance" \
+        " in both bands along a leading axis. masses is the result of get_optical_masses()" \
+        " for the same altitudes, if already known."
+        if masses == None :
+            masses = self.get_optical_masses(altitude_deg)
+        #end if
+        tau_a, TR, Tg, To, Tn, Tw, Ta = self._get_direct_transmittances(masses)
+        return \
+            _align(band_E0n, np.ndim(tau_a) - 1) * TR * Tg * To * Tn * Tw * Ta
+    #end get_direct_normal_irradiance
+
+    def get_irradiance(self, altitude_deg, sun_earth_distance = 1.0) :
+        "computes all the components of clear-sky irradiance in both bands at once, from" \
+        " the same optical masses and transmittances, returning a ClearSkyIrradiance of" \
+        " arrays with the band along a leading axis. sun_earth_distance (in AU) scales" \
+        " the extraterrestrial irradiance; the components are zero where altitude_deg is" \
+        " not above the horizon."
+        altitude_deg = np.asarray(altitude_deg, dtype = float)
+        up = altitude_deg > 0
+        altitude_deg = np.where(up, altitude_deg, 90.0) # keep the formulas within their range
+        cos_Z = np.sin(np.radians(altitude_deg))
+        masses = self.get_optical_masses(altitude_deg)
+        ma = masses.aerosol
+        tau_a, TR, Tg, To, Tn, Tw, Ta = self._get_direct_transmittances(masses)
+        ndim = np.ndim(tau_a) - 1
+        E0n = _align(band_E0n, ndim) / np.asarray(sun_earth_distance) ** 2
+        direct_normal = E0n * TR * Tg * To * Tn * Tw * Ta
+        mR = masses.rayleigh * standard_pressure_millibars / self.pressure_millibars
+        BR = sum(_align(c, np.ndim(mR)) * mR ** i for i, c in enumerate(rayleigh_forward_scattering_coeffs))
+        Ba = 1 - np.exp(-0.6931 - 1.8326 * cos_Z)
+        F = self.get_aerosol_scattering_correction_factor(ma, tau_a)
+        Tas = np.exp(-ma * _align(band_albedo, ndim) * tau_a)
+        diffuse = \
+            (
+                To * Tg * _align(self.nitrogen_diffuse, ndim) * _align(self.water_vapor_diffuse, ndim)
+            *
+                (BR * (1 - TR) * Ta ** 0.25 + Ba * F * TR * (1 - Tas ** 0.25))
+            *
+                E0n * cos_Z
+            )
+        beam = direct_normal * cos_Z
+        reflectance = _align(band_ground_albedo, ndim) * _align(self.sky_albedo, ndim)
+        backscattered = reflectance * (beam + diffuse) / (1 - reflectance)
+        diffuse_horizontal = diffuse + backscattered
+        return \
+            ClearSkyIrradiance \
+              (
+                *(
+                    np.where(up, component, 0.0)
+                    for component in
+                        (direct_normal, beam, diffuse, backscattered, diffuse_horizontal, beam + diffuse_horizontal)
+                )
+              )
+    #end get_irradiance
+
+#end AtmosphereState
+
+def get_direct_normal_irradiance_array(altitude_deg, pressure_millibars = standard_pressure_millibars, ozone_atm_cm = 0.35, nitrogen_atm_cm = 0.0002, precipitable_water_cm = 5.0, turbidity_alpha = 1.3, turbidity_beta = 0.6) :
+    "array version of get_direct_normal_irradiance_by_band(), returning the irradiance" \
+    " in both bands along a leading axis. The atmospheric arguments may be scalars or" \
+    " arrays that broadcast against altitude_deg; to reuse them, see AtmosphereState."
+    return \
+        AtmosphereState(pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta).get_direct_normal_irradiance(altitude_deg)
+#end get_direct_normal_irradiance_array
+
+def get_beam_irradiance_array(altitude_deg, pressure_millibars = standard_pressure_millibars, ozone_atm_cm = 0.35, nitrogen_atm_cm = 0.0002, precipitable_water_cm = 5.0, turbidity_alpha = 1.3, turbidity_beta = 0.6) :
+    "array version of get_beam_irradiance_by_band(), returning the irradiance on a" \
+    " horizontal surface in both bands along a leading axis."
+    return \
+        (
+            get_direct_normal_irradiance_array(altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta)
+        *
+            np.sin(np.radians(altitude_deg))
+        )
+#end get_beam_irradiance_array
+
+def get_broadband_direct_normal_irradiance_array(altitude_deg, pressure_millibars = standard_pressure_millibars, ozone_atm_cm = 0.35, nitrogen_atm_cm = 0.0002, precipitable_water_cm = 5.0, turbidity_alpha = 1.3, turbidity_beta = 0.6) :
+    "array version of get_broadband_direct_normal_irradiance()."
+    return \
+        get_direct_normal_irradiance_array(altitude_deg, pressure_millibars, ozone_atm_cm, nitrogen_atm_cm, precipitable_water_cm, turbidity_alpha, turbidity_beta).sum(axis = 0)
+#end get_broadband_direct_normal_irradiance_array
+
+def get_clear_sky_irradiance(altitude_deg, atmosphere = None, sun_earth_distance = 1.0) :
+    "returns a ClearSkyIrradiance of arrays, with the two bands along a leading axis, for" \
+    " the given series of solar altitudes (for example, from vectorized.get_position())," \
+    " in the given AtmosphereState (by default, one with default arguments)." \
+    " sum_bands() adds up the bands."
+    if atmosphere == None :
+        atmosphere = AtmosphereState()
+    #end if
+    return \
+        atmosphere.get_irradiance(altitude_deg, sun_earth_distance)
+#end get_clear_sky_irradiance
+
+def sum_bands(irradiance) :
+    "returns the broadband irradiance for a ClearSkyIrradiance of arrays by band."
+    return \
+        type(irradiance)(*(component.sum(axis = 0) for component in irradiance))
+#end sum_bands
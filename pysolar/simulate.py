@@ -45,8 +45,8 @@ def simulate_span(latitude_deg, longitude_deg, horizon, start_datetime, end_date
     '''
     alt_zero = 380
     for time in datetime_range(start_datetime, end_datetime, step_minutes) :
-        alt = solar.get_altitude(latitude_deg, longitude_deg, time, elevation, temperature, pressure)
-        azi = solar.get_azimuth(latitude_deg, longitude_deg, time, elevation)
+        position = solar.get_position(latitude_deg, longitude_deg, time, elevation, temperature, pressure)
+        alt, azi = position.altitude, position.azimuth
         shade = horizon[round(azi)]
         if shade < alt_zero - round(alt_zero * math.sin(math.radians(alt))) :
             rad = 0
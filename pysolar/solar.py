@@ -22,10 +22,172 @@ This module contains the most important functions for calculation of the positio
 """
 import math
 import datetime
+import collections
+import numpy as np
+from . import cache
 from . import constants
 from . import time
 from . import radiation
 
+SolarPosition = collections.namedtuple \
+  (
+    "SolarPosition",
+    (
+        "altitude", # degrees above the horizon, including refraction
+        "azimuth", # degrees, same convention as get_azimuth()
+        "zenith", # degrees, 90 - altitude
+        "declination", # topocentric, degrees
+        "right_ascension", # topocentric, degrees
+        "hour_angle", # topocentric local hour angle, degrees
+        "sun_earth_distance", # astronomical units
+        "refraction_correction", # degrees, already included in altitude and zenith
+    )
+  )
+
+class SolarEphemeris :
+    "the location-independent part of the solar position algorithm for one instant." \
+    " Building one of these does all the expensive work (the VSOP87 series and nutation);" \
+    " topocentric() then completes the calculation cheaply for any number of locations." \
+    " precision is one of constants.precisions; see get_position() for their accuracy." \
+    " At 'fast' precision, the attributes that the approximation does not compute are None."
+
+    def __init__(self, when, precision = "full") :
+        self._compute(*time.get_julian_days(when), precision = precision)
+    #end __init__
+
+    @classmethod
+    def from_julian_days(cls, jd, jde, precision = "full") :
+        "builds the ephemeris for the instant with the given UT and TT Julian days."
+        result = cls.__new__(cls)
+        result._compute(jd, jde, precision)
+        return \
+            result
+    #end from_julian_days
+
+    def _compute(self, jd, jde, precision) :
+        constants.check_precision(precision)
+        self.precision = precision
+        self.jd = jd
+        self.jde = jde
+        self.jce = time.get_julian_ephemeris_century(self.jde)
+        self.jme = time.get_julian_ephemeris_millennium(self.jce)
+        if precision == "fast" :
+            self._compute_fast()
+            return
+        #end if
+        longitude_series, latitude_series, distance_series = get_vsop87_series(self.jme, precision)
+        self.geocentric_latitude = -1 * math.degrees(latitude_series / 1e8)
+        self.geocentric_longitude = (math.degrees(longitude_series / 1e8) % 360 + 180) % 360
+        self.sun_earth_distance = distance_series / 1e8
+        self.aberration_correction = get_aberration_correction(self.sun_earth_distance)
+        self.equatorial_horizontal_parallax = get_equatorial_horizontal_parallax(self.sun_earth_distance)
+        self.nutation = get_nutation(self.jce, precision)
+        self.apparent_sidereal_time = get_apparent_sidereal_time(self.jd, self.jme, self.nutation)
+        self.true_ecliptic_obliquity = get_true_ecliptic_obliquity(self.jme, self.nutation)
+        self.apparent_sun_longitude = get_apparent_sun_longitude(self.geocentric_longitude, self.nutation, self.aberration_correction)
+        self.right_ascension = get_geocentric_sun_right_ascension(self.apparent_sun_longitude, self.true_ecliptic_obliquity, self.geocentric_latitude)
+        self.declination = get_geocentric_sun_declination(self.apparent_sun_longitude, self.true_ecliptic_obliquity, self.geocentric_latitude)
+    #end _compute
+
+    def _compute_fast(self) :
+        # same day-of-year approximations as get_altitude_fast(), arranged so that
+        # topocentric() yields the approximate hour angle for any longitude
+        date = datetime.date.fromordinal(math.floor(self.jd - time.julian_day_offset))
+        day = date.timetuple().tm_yday
+        minutes = (self.jd - time.julian_day_offset) % 1 * 24 * 60
+        greenwich_hour_angle = 15 * ((minutes + equation_of_time(day)) / 60 - 12)
+        self.geocentric_latitude = self.geocentric_longitude = None
+        self.aberration_correction = self.nutation = None
+        self.true_ecliptic_obliquity = self.apparent_sun_longitude = None
+        self.sun_earth_distance = 1 - 0.01672 * math.cos(math.radians(0.9856 * (day - 4)))
+        self.equatorial_horizontal_parallax = get_equatorial_horizontal_parallax(self.sun_earth_distance)
+        self.apparent_sidereal_time = get_mean_sidereal_time(self.jd)
+        self.right_ascension = (self.apparent_sidereal_time - greenwich_hour_angle) % 360
+        self.declination = get_declination(day)
+    #end _compute_fast
+
+    def topocentric(self, latitude_deg, longitude_deg, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure) :
+        "returns the SolarPosition seen from the given location at this instant."
+        # location-dependent calculations
+        projected_radial_distance = get_projected_radial_distance(elevation, latitude_deg)
+        projected_axial_distance = get_projected_axial_distance(elevation, latitude_deg)
+
+        # calculations dependent on location and time
+        local_hour_angle = get_local_hour_angle(self.apparent_sidereal_time, longitude_deg, self.right_ascension)
+        parallax_sun_right_ascension = get_parallax_sun_right_ascension(projected_radial_distance, self.equatorial_horizontal_parallax, local_hour_angle, self.declination)
+        topocentric_local_hour_angle = get_topocentric_local_hour_angle(local_hour_angle, parallax_sun_right_ascension)
+        topocentric_sun_declination = get_topocentric_sun_declination(self.declination, projected_axial_distance, self.equatorial_horizontal_parallax, parallax_sun_right_ascension, local_hour_angle)
+        topocentric_elevation_angle = get_topocentric_elevation_angle(latitude_deg, topocentric_sun_declination, topocentric_local_hour_angle)
+        refraction_correction = get_refraction_correction(pressure, temperature, topocentric_elevation_angle)
+        altitude = topocentric_elevation_angle + refraction_correction
+        return \
+            SolarPosition \
+              (
+                altitude = altitude,
+                azimuth = 180 - get_topocentric_azimuth_angle(topocentric_local_hour_angle, latitude_deg, topocentric_sun_declination),
+                zenith = 90 - altitude,
+                declination = topocentric_sun_declination,
+                right_ascension = self.right_ascension + parallax_sun_right_ascension,
+                hour_angle = topocentric_local_hour_angle,
+                sun_earth_distance = self.sun_earth_distance,
+                refraction_correction = refraction_correction,
+              )
+    #end topocentric
+
+#end SolarEphemeris
+
+ephemeris_cache = None # set up by enable_ephemeris_cache()
+
+def enable_ephemeris_cache(maxsize = 1024, eviction = "lru"):
+    """turns on caching of SolarEphemeris objects, keyed by Julian day, so that repeated
+    calls for the same instant (for example, "now" at many sites) reuse the VSOP87 and
+    nutation results. maxsize bounds the number of instants kept; eviction is "lru" to
+    discard the least recently used instant or "fifo" to discard the oldest one.
+    Calling this again replaces any existing cache."""
+    global ephemeris_cache
+    ephemeris_cache = cache.Cache(maxsize, eviction)
+
+def disable_ephemeris_cache():
+    global ephemeris_cache
+    ephemeris_cache = None
+
+def clear_ephemeris_cache():
+    "discards all cached instants and resets the hit/miss statistics."
+    if ephemeris_cache != None :
+        ephemeris_cache.clear()
+    #end if
+
+def get_ephemeris_cache_info():
+    "returns a cache.CacheInfo with hit/miss statistics, or None if caching is off."
+    if ephemeris_cache != None :
+        return ephemeris_cache.info()
+    #end if
+    return None
+
+def get_ephemeris(when, precision = "full"):
+    "returns the SolarEphemeris for the given datetime (or single instant in any form" \
+    " accepted by time.get_instants()), from the cache if it is enabled."
+    if ephemeris_cache == None :
+        return SolarEphemeris(when, precision)
+    #end if
+    jd, jde = time.get_julian_days(when)
+    return ephemeris_cache.get((jd, jde, precision), lambda : SolarEphemeris.from_julian_days(jd, jde, precision))
+
+class Nutation(collections.namedtuple("Nutation", ("longitude", "obliquity"))) :
+    "nutation in longitude and obliquity, in degrees. Also indexable by field name," \
+    " like the dict that get_nutation() used to return."
+
+    __slots__ = ()
+
+    def __getitem__(self, key) :
+        if isinstance(key, str) :
+            return getattr(self, key)
+        #end if
+        return super().__getitem__(key)
+    #end __getitem__
+
+#end Nutation
+
 def solar_test():
     latitude_deg = 42.364908
     longitude_deg = -71.112828
@@ -33,8 +195,8 @@ def solar_test():
     thirty_minutes = datetime.timedelta(hours = 0.5)
     for i in range(48):
         timestamp = d.ctime()
-        altitude_deg = get_altitude(latitude_deg, longitude_deg, d)
-        azimuth_deg = get_azimuth(latitude_deg, longitude_deg, d)
+        position = get_position(latitude_deg, longitude_deg, d)
+        altitude_deg, azimuth_deg = position.altitude, position.azimuth
         power = radiation.get_radiation_direct(d, altitude_deg)
         if (altitude_deg > 0):
             print(timestamp, "UTC", altitude_deg, azimuth_deg, power)
@@ -50,35 +212,7 @@ def get_aberration_correction(sun_earth_distance):     # sun-earth distance is i
 
 def get_altitude(latitude_deg, longitude_deg, when, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure):
     '''See also the faster, but less accurate, get_altitude_fast()'''
-    # location-dependent calculations
-    projected_radial_distance = get_projected_radial_distance(elevation, latitude_deg)
-    projected_axial_distance = get_projected_axial_distance(elevation, latitude_deg)
-
-    # time-dependent calculations
-    jd = time.get_julian_solar_day(when)
-    jde = time.get_julian_ephemeris_day(when)
-    jce = time.get_julian_ephemeris_century(jde)
-    jme = time.get_julian_ephemeris_millennium(jce)
-    geocentric_latitude = get_geocentric_latitude(jme)
-    geocentric_longitude = get_geocentric_longitude(jme)
-    sun_earth_distance = get_sun_earth_distance(jme)
-    aberration_correction = get_aberration_correction(sun_earth_distance)
-    equatorial_horizontal_parallax = get_equatorial_horizontal_parallax(sun_earth_distance)
-    nutation = get_nutation(jce)
-    apparent_sidereal_time = get_apparent_sidereal_time(jd, jme, nutation)
-    true_ecliptic_obliquity = get_true_ecliptic_obliquity(jme, nutation)
-
-    # calculations dependent on location and time
-    apparent_sun_longitude = get_apparent_sun_longitude(geocentric_longitude, nutation, aberration_correction)
-    geocentric_sun_right_ascension = get_geocentric_sun_right_ascension(apparent_sun_longitude, true_ecliptic_obliquity, geocentric_latitude)
-    geocentric_sun_declination = get_geocentric_sun_declination(apparent_sun_longitude, true_ecliptic_obliquity, geocentric_latitude)
-    local_hour_angle = get_local_hour_angle(apparent_sidereal_time, longitude_deg, geocentric_sun_right_ascension)
-    parallax_sun_right_ascension = get_parallax_sun_right_ascension(projected_radial_distance, equatorial_horizontal_parallax, local_hour_angle, geocentric_sun_declination)
-    topocentric_local_hour_angle = get_topocentric_local_hour_angle(local_hour_angle, parallax_sun_right_ascension)
-    topocentric_sun_declination = get_topocentric_sun_declination(geocentric_sun_declination, projected_axial_distance, equatorial_horizontal_parallax, parallax_sun_right_ascension, local_hour_angle)
-    topocentric_elevation_angle = get_topocentric_elevation_angle(latitude_deg, topocentric_sun_declination, topocentric_local_hour_angle)
-    refraction_correction = get_refraction_correction(pressure, temperature, topocentric_elevation_angle)
-    return topocentric_elevation_angle + refraction_correction
+    return get_position(latitude_deg, longitude_deg, when, elevation, temperature, pressure).altitude
 
 def get_altitude_fast(latitude_deg, longitude_deg, when):
 # expect 19 degrees for solar.get_altitude(42.364908,-71.112828,datetime.datetime(2007, 2, 18, 20, 13, 1, 130320))
@@ -97,34 +231,7 @@ def get_apparent_sun_longitude(geocentric_longitude, nutation, ab_correction):
     return geocentric_longitude + nutation['longitude'] + ab_correction
 
 def get_azimuth(latitude_deg, longitude_deg, when, elevation = 0):
-
-    # location-dependent calculations
-    projected_radial_distance = get_projected_radial_distance(elevation, latitude_deg)
-    projected_axial_distance = get_projected_axial_distance(elevation, latitude_deg)
-
-    # time-dependent calculations
-    jd = time.get_julian_solar_day(when)
-    jde = time.get_julian_ephemeris_day(when)
-    jce = time.get_julian_ephemeris_century(jde)
-    jme = time.get_julian_ephemeris_millennium(jce)
-    geocentric_latitude = get_geocentric_latitude(jme)
-    geocentric_longitude = get_geocentric_longitude(jme)
-    sun_earth_distance = get_sun_earth_distance(jme)
-    aberration_correction = get_aberration_correction(sun_earth_distance)
-    equatorial_horizontal_parallax = get_equatorial_horizontal_parallax(sun_earth_distance)
-    nutation = get_nutation(jce)
-    apparent_sidereal_time = get_apparent_sidereal_time(jd, jme, nutation)
-    true_ecliptic_obliquity = get_true_ecliptic_obliquity(jme, nutation)
-
-    # calculations dependent on location and time
-    apparent_sun_longitude = get_apparent_sun_longitude(geocentric_longitude, nutation, aberration_correction)
-    geocentric_sun_right_ascension = get_geocentric_sun_right_ascension(apparent_sun_longitude, true_ecliptic_obliquity, geocentric_latitude)
-    geocentric_sun_declination = get_geocentric_sun_declination(apparent_sun_longitude, true_ecliptic_obliquity, geocentric_latitude)
-    local_hour_angle = get_local_hour_angle(apparent_sidereal_time, longitude_deg, geocentric_sun_right_ascension)
-    parallax_sun_right_ascension = get_parallax_sun_right_ascension(projected_radial_distance, equatorial_horizontal_parallax, local_hour_angle, geocentric_sun_declination)
-    topocentric_local_hour_angle = get_topocentric_local_hour_angle(local_hour_angle, parallax_sun_right_ascension)
-    topocentric_sun_declination = get_topocentric_sun_declination(geocentric_sun_declination, projected_axial_distance, equatorial_horizontal_parallax, parallax_sun_right_ascension, local_hour_angle)
-    return 180 - get_topocentric_azimuth_angle(topocentric_local_hour_angle, latitude_deg, topocentric_sun_declination)
+    return get_position(latitude_deg, longitude_deg, when, elevation).azimuth
 
 def get_azimuth_fast(latitude_deg, longitude_deg, when):
 # expect -50 degrees for solar.get_azimuth(42.364908,-71.112828,datetime.datetime(2007, 2, 18, 20, 18, 0, 0))
@@ -141,22 +248,39 @@ def get_azimuth_fast(latitude_deg, longitude_deg, when):
     else:
         return (180 - math.degrees(azimuth_rad))
 
+def _as_scalar_if_0d(a):
+    # so that the scalar API keeps returning plain floats
+    return float(a) if np.ndim(a) == 0 else a
+
+packed_tables = {} # id of coefficient table => (table, packed version)
+
 def get_coeff(jme, coeffs):
     "computes a polynomial with time-varying coefficients from the given constant" \
-    " coefficients array and the current Julian millennium."
-    result = 0.0
-    x = 1.0
-    for line in coeffs :
-        c = 0.0
-        for l in line :
-            c += l[0] * math.cos(l[1] + l[2] * jme)
-        #end for
-        result += c * x
-        x *= jme
+    " coefficients array and the current Julian millennium, which may be a number or a" \
+    " NumPy array. The table is packed on first use; see get_packed_coeffs()."
+    if id(coeffs) not in packed_tables :
+        packed_tables[id(coeffs)] = (coeffs, constants.pack_coeffs(coeffs)) # keep table alive so id stays unique
+    #end if
+    return \
+        _as_scalar_if_0d(get_packed_coeffs(jme, packed_tables[id(coeffs)][1])[..., 0])
+#end get_coeff
+
+def get_packed_coeffs(jme, packed):
+    "evaluates every series in a constants.PackedCoeffs at the given Julian millennium," \
+    " which may be a number or a NumPy array, using one vectorized cosine for all the" \
+    " terms, one matrix product to sum them, and Horner's rule over the powers of jme." \
+    " Returns an array with one more trailing axis than jme, indexed by series."
+    jme = np.asarray(jme, dtype = float)
+    nr_series, nr_powers = packed.shape
+    sums = np.cos(packed.phase + packed.frequency * jme[..., np.newaxis]) @ packed.weights
+    sums = sums.reshape(jme.shape + packed.shape)
+    result = sums[..., nr_powers - 1]
+    for power in range(nr_powers - 2, -1, -1) :
+        result = result * jme[..., np.newaxis] + sums[..., power]
     #end for
     return \
         result
-#end get_coeff
+#end get_packed_coeffs
 
 def get_declination(day):
     '''The declination of the sun is the angle between
@@ -230,36 +354,21 @@ def get_mean_sidereal_time(jd):
     sidereal_time =  280.46061837 + (360.98564736629 * (jd - 2451545.0)) + 0.000387933 * jc * jc * (1 - jc / 38710000)
     return sidereal_time % 360
 
-def get_nutation(jce):
-    abcd = constants.nutation_coefficients
-    nutation_long = []
-    nutation_oblique = []
-    p = constants.get_aberration_coeffs()
-    x = list \
-      (
-        p[k](jce)
-        for k in
-            ( # order is important
-                'MeanElongationOfMoon',
-                'MeanAnomalyOfSun',
-                'MeanAnomalyOfMoon',
-                'ArgumentOfLatitudeOfMoon',
-                'LongitudeOfAscendingNode',
-            )
-      )
-    y = constants.aberration_sin_terms
-    for i in range(len(abcd)):
-        sigmaxy = 0.0
-        for j in range(len(x)):
-            sigmaxy += x[j] * y[i][j]
-        #end for
-        nutation_long.append((abcd[i][0] + (abcd[i][1] * jce)) * math.sin(math.radians(sigmaxy)))
-        nutation_oblique.append((abcd[i][2] + (abcd[i][3] * jce)) * math.cos(math.radians(sigmaxy)))
-
-    # 36000000 scales from 0.0001 arcseconds to degrees
-    nutation = {'longitude' : sum(nutation_long)/36000000.0, 'obliquity' : sum(nutation_oblique)/36000000.0}
-
-    return nutation
+def get_nutation(jce, precision = "full"):
+    """returns the Nutation in longitude and obliquity, in degrees, for the given Julian
+    ephemeris century, which may be a number or a NumPy array. All 63 periodic terms
+    (or, at "reduced" precision, the largest few) are evaluated at once from
+    constants.get_packed_nutation_coeffs()."""
+    packed = constants.get_packed_nutation_coeffs(precision)
+    jce = np.asarray(jce, dtype = float)
+    jce_powers = np.stack((np.ones_like(jce), jce, jce * jce, jce * jce * jce), axis = -1)
+    sigmaxy = np.radians(jce_powers @ packed.arguments.T)
+    sin_terms = np.sin(sigmaxy)
+    cos_terms = np.cos(sigmaxy)
+    longitude = sin_terms @ packed.longitude[0] + jce * (sin_terms @ packed.longitude[1])
+    obliquity = cos_terms @ packed.obliquity[0] + jce * (cos_terms @ packed.obliquity[1])
+    return \
+        Nutation(_as_scalar_if_0d(longitude), _as_scalar_if_0d(obliquity))
 #end get_nutation
 
 def get_parallax_sun_right_ascension(projected_radial_distance, equatorial_horizontal_parallax, local_hour_angle, geocentric_sun_declination):
@@ -272,6 +381,26 @@ def get_parallax_sun_right_ascension(projected_radial_distance, equatorial_horiz
     parallax = math.atan2(a, b)
     return math.degrees(parallax)
 
+def get_position(latitude_deg, longitude_deg, when, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full"):
+    """computes the full solar position algorithm once for the given location and time,
+    returning a SolarPosition with the altitude, azimuth and the main intermediate values.
+    get_altitude() and get_azimuth() are thin wrappers around this function, so callers
+    needing more than one of these values should call it directly. To evaluate the same
+    time at many locations, build a SolarEphemeris once and call its topocentric() method.
+
+    precision trades accuracy for speed. Maximum differences from "full" over the
+    6259 times and places in test/usno_data_6259.txt (azimuth excluding the sun
+    within 10 degrees of the zenith or nadir, where azimuth is ill-conditioned):
+      * "full": the complete VSOP87 and nutation tables in constants.py.
+      * "reduced": truncated tables (see constants.reduced_vsop87_threshold);
+        altitude 0.0004 degrees, azimuth 0.0015 degrees (0.009 degrees including
+        the sun near the zenith).
+      * "fast": the day-of-year approximations of get_altitude_fast(); altitude
+        1.9 degrees, azimuth 6.6 degrees (16.2 degrees including the sun near the
+        zenith). right_ascension is only as good as the hour angle."""
+    return get_ephemeris(when, precision).topocentric(latitude_deg, longitude_deg, elevation, temperature, pressure)
+#end get_position
+
 def get_projected_radial_distance(elevation, latitude):
     flattened_latitude_rad = math.radians(get_flattened_latitude(latitude))
     latitude_rad = math.radians(latitude)
@@ -364,3 +493,13 @@ def get_true_ecliptic_obliquity(jme, nutation):
     - (51.38 * u ** 4) -(249.67 * u ** 5) - (39.05 * u ** 6) + (7.12 * u ** 7) \
     + (27.87 * u ** 8) + (5.79 * u ** 9) + (2.45 * u ** 10)
     return (mean_obliquity / 3600.0) + nutation['obliquity']
+
+def get_vsop87_series(jme, precision = "full"):
+    "returns the heliocentric longitude and latitude series (in 1e-8 radians) and the" \
+    " sun-earth distance series (in 1e-8 astronomical units) for the given Julian" \
+    " millennium, which may be a number or a NumPy array, from a single evaluation of" \
+    " constants.get_packed_vsop87_coeffs()."
+    result = get_packed_coeffs(jme, constants.get_packed_vsop87_coeffs(precision))
+    return \
+        tuple(_as_scalar_if_0d(result[..., i]) for i in range(3))
+#end get_vsop87_series
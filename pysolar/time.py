@@ -20,7 +20,7 @@
 import warnings
 import math
 import datetime
-import time
+import numpy as np
 from .constants import \
     seconds_per_day
 
@@ -84,45 +84,152 @@ leap_seconds_adjustments = \
       (+1, 0), # 2016
     ]
 
-def get_leap_seconds(when) :
-    "returns adjustment to be added to UTC at the specified datetime to produce TAI."
+def get_month_index(when) :
+    "returns the number of whole months from January 1970 to the month (in UTC)" \
+    " containing the specified datetime, the index used by the leap-second and" \
+    " delta_t lookups."
     when = when.utctimetuple()
-    adj = 10 # as decreed from 1972
-    year = leap_seconds_base_year
-    while True :
-        if year > when.tm_year :
-            break
-        if year - leap_seconds_base_year >= len(leap_seconds_adjustments) :
-            if (
-                    when.tm_year - leap_seconds_base_year > len(leap_seconds_adjustments)
-                or
-                        when.tm_year - leap_seconds_base_year == len(leap_seconds_adjustments)
-                    and
-                        when.tm_mon > 6
-            ) :
-                warnings.warn \
-                  (
-                        "I don't know about leap seconds after %d"
-                    %
-                        (leap_seconds_base_year + len(leap_seconds_adjustments) - 1)
-                  )
+    return \
+        (when.tm_year - 1970) * 12 + when.tm_mon - 1
+#end get_month_index
+
+def get_month_indices(timestamps) :
+    "array version of get_month_index(), for an array of POSIX timestamps."
+    return \
+        (
+            np.floor(timestamps).astype(np.int64)
+                .astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+        )
+#end get_month_indices
+
+# cumulative TAI - UTC for each half year, so that entry i applies from the start of
+# month index leap_seconds_base_month + 6 * i until the next entry. The built-in
+# table is accumulated from leap_seconds_adjustments (10 seconds as decreed from
+# 1972); load_leap_seconds() can replace it with one read from a file.
+leap_seconds_cumulative = None
+leap_seconds_base_month = None
+_leap_seconds_warned = False
+
+def _set_leap_seconds(base_month, cumulative) :
+    global leap_seconds_cumulative, leap_seconds_base_month, _leap_seconds_warned
+    leap_seconds_cumulative = np.asarray(cumulative, dtype = np.int64)
+    leap_seconds_base_month = base_month
+    _leap_seconds_warned = False
+#end _set_leap_seconds
+
+def _leap_seconds_warning() :
+    # only once per process (or per loaded table), since the lookups sit in tight loops
+    global _leap_seconds_warned
+    if not _leap_seconds_warned :
+        _leap_seconds_warned = True
+        last_month = leap_seconds_base_month + 6 * len(leap_seconds_cumulative) - 1
+        warnings.warn \
+          (
+                "I don't know about leap seconds after %04d-%02d"
+            %
+                (1970 + last_month // 12, last_month % 12 + 1)
+          )
+    #end if
+#end _leap_seconds_warning
+
+def _parse_table_lines(filename) :
+    with open(filename, "r") as data :
+        for line in data :
+            line = line.strip()
+            if len(line) != 0 :
+                yield line
             #end if
-            break
-        #end if
-        entry = leap_seconds_adjustments[year - leap_seconds_base_year]
-        if year == when.tm_year :
-            if when.tm_mon > 6 :
-                adj += entry[0]
+        #end for
+    #end with
+#end _parse_table_lines
+
+def load_leap_seconds(filename = None) :
+    "replaces the leap-second table with one read from filename, or restores the" \
+    " built-in table if filename is None. The file may be in the IERS Leap_Second.dat" \
+    " format (MJD, day, month, year, TAI - UTC) or the NIST/IETF leap-seconds.list format" \
+    " (NTP seconds, TAI - UTC). Its expiry date, if given, extends the range of dates" \
+    " for which the table is known to be complete, beyond which a warning is issued" \
+    " (once) and the last value is used."
+    if filename == None :
+        _set_leap_seconds \
+          (
+            base_month = (leap_seconds_base_year - 1970) * 12,
+            cumulative = np.concatenate(([10], 10 + np.cumsum(leap_seconds_adjustments)))
+          )
+        return
+    #end if
+    ntp_epoch = datetime.datetime(1900, 1, 1)
+    entries = []
+    expires = None
+    for line in _parse_table_lines(filename) :
+        if line.startswith("#@") : # leap-seconds.list expiry, in NTP seconds
+            expires = ntp_epoch + datetime.timedelta(seconds = int(line[2:].split()[0]))
+            expires = (expires.year - 1970) * 12 + expires.month - 1
+        elif line.startswith("#") :
+            fields = line[1:].split()
+            if fields[:3] == ["File", "expires", "on"] : # Leap_Second.dat expiry
+                expires = datetime.datetime.strptime(" ".join(fields[3:6]), "%d %B %Y")
+                expires = (expires.year - 1970) * 12 + expires.month - 1
             #end if
-            break
+        else :
+            fields = line.split("#", 1)[0].split()
+            if len(fields) == 5 :
+                month = (int(fields[3]) - 1970) * 12 + int(fields[2]) - 1
+            elif len(fields) == 2 :
+                start = ntp_epoch + datetime.timedelta(seconds = int(fields[0]))
+                month = (start.year - 1970) * 12 + start.month - 1
+            else :
+                raise ValueError("unrecognized leap-second table line: %r" % line)
+            #end if
+            if month % 6 != 0 :
+                raise ValueError("leap second not at the end of June or December: %r" % line)
+            #end if
+            entries.append((month, int(float(fields[-1]))))
         #end if
-        adj += entry[0] + entry[1]
-        year += 1
-    #end while
+    #end for
+    if len(entries) == 0 :
+        raise ValueError("no leap-second entries in %s" % filename)
+    #end if
+    entries.sort()
+    base_month = entries[0][0]
+    last_month = max(entries[-1][0], base_month if expires == None else expires)
+    cumulative = np.empty((last_month - base_month) // 6 + 1, dtype = np.int64)
+    for (month, offset), (next_month, _) in zip(entries, entries[1:] + [(last_month + 6, None)]) :
+        cumulative[(month - base_month) // 6 : (next_month - base_month) // 6] = offset
+    #end for
+    _set_leap_seconds(base_month, cumulative)
+#end load_leap_seconds
+
+load_leap_seconds()
+
+def get_leap_seconds_for_month(month) :
+    "returns adjustment to be added to UTC to produce TAI during the month with the" \
+    " given get_month_index() value."
+    index = max((month - leap_seconds_base_month) // 6, 0)
+    if index >= len(leap_seconds_cumulative) :
+        _leap_seconds_warning()
+        index = len(leap_seconds_cumulative) - 1
+    #end if
+    return \
+        leap_seconds_cumulative.item(index)
+#end get_leap_seconds_for_month
+
+def get_leap_seconds(when) :
+    "returns adjustment to be added to UTC at the specified datetime to produce TAI."
     return \
-        adj
+        get_leap_seconds_for_month(get_month_index(when))
 #end get_leap_seconds
 
+def get_leap_seconds_array(timestamps) :
+    "array version of get_leap_seconds(), for an array of POSIX timestamps."
+    index = np.maximum((get_month_indices(timestamps) - leap_seconds_base_month) // 6, 0)
+    if np.any(index >= len(leap_seconds_cumulative)) :
+        _leap_seconds_warning()
+    #end if
+    return \
+        leap_seconds_cumulative[np.minimum(index, len(leap_seconds_cumulative) - 1)]
+#end get_leap_seconds_array
+
 # table of values to add to UT1 to get TT (to date), generated by util/get_delta_t script
 delta_t_base_year = 1973
 delta_t_base_month = 2
@@ -709,48 +816,138 @@ delta_t = \
         ],
     ] # delta_t
 
-def get_delta_t(when) :
-    "returns a suitable value for delta_t for the given datetime."
-    when = when.utctimetuple()
-    year, month = when.tm_year, when.tm_mon
-    if year < delta_t_base_year :
-        year = delta_t_base_year
-        month = 1
-    elif year == delta_t_base_year :
-        month = max(0, month - delta_t_base_month) + 1
-    elif year >= delta_t_base_year + len(delta_t) :
-        year = delta_t_base_year + len(delta_t) - 1
+# delta_t flattened to one entry per month, starting at month index delta_t_base_index.
+# Before the table the first entry is used; after it, the last entry plus
+# delta_t_slope seconds per month (zero, i.e. clamping, unless a loaded table asks
+# for extrapolation). load_delta_t() can replace the built-in table.
+delta_t_months = None
+delta_t_base_index = None
+delta_t_slope = None
+
+def _set_delta_t(base_index, values, slope) :
+    global delta_t_months, delta_t_base_index, delta_t_slope
+    delta_t_months = np.asarray(values, dtype = float)
+    delta_t_base_index = base_index
+    delta_t_slope = slope
+#end _set_delta_t
+
+def load_delta_t(filename = None, extrapolate = False) :
+    "replaces the delta_t table with one read from filename, or restores the built-in" \
+    " table if filename is None. The file is in the USNO deltat.data format read by" \
+    " util/get_delta_t: one line per month of year, month, day (always 1) and delta_t" \
+    " in seconds. If extrapolate, dates after the table continue the trend of its last" \
+    " twelve months instead of keeping its last value."
+    if filename == None :
+        _set_delta_t \
+          (
+            base_index = (delta_t_base_year - 1970) * 12 + delta_t_base_month - 1,
+            values = [dt for row in delta_t for dt in row],
+            slope = 0.0
+          )
+        return
     #end if
-    if year == delta_t_base_year + len(delta_t) - 1 :
-        month = min(month, len(delta_t[year - delta_t_base_year]))
+    base_index = None
+    values = []
+    for line in _parse_table_lines(filename) :
+        if line.startswith("#") :
+            continue
+        #end if
+        year, month, day, dt = line.split()[:4]
+        month = (int(year) - 1970) * 12 + int(month) - 1
+        if int(day) != 1 :
+            raise ValueError("delta_t entry not on first day of month: %r" % line)
+        #end if
+        if base_index == None :
+            base_index = month
+        elif month != base_index + len(values) :
+            raise ValueError("delta_t entries not for consecutive months: %r" % line)
+        #end if
+        values.append(float(dt))
+    #end for
+    if len(values) == 0 :
+        raise ValueError("no delta_t entries in %s" % filename)
+    #end if
+    if extrapolate and len(values) > 12 :
+        slope = (values[-1] - values[-13]) / 12
+    else :
+        slope = 0.0
+    #end if
+    _set_delta_t(base_index, values, slope)
+#end load_delta_t
+
+load_delta_t()
+
+def get_delta_t_for_month(month) :
+    "returns a suitable value for delta_t for the month with the given get_month_index()" \
+    " value; see delta_t_slope for months outside the table."
+    index = month - delta_t_base_index
+    if index >= len(delta_t_months) :
+        return \
+            delta_t_months.item(-1) + delta_t_slope * (index - len(delta_t_months) + 1)
     #end if
     return \
-        delta_t[year - delta_t_base_year][month - 1]
+        delta_t_months.item(max(index, 0))
           # don't bother doing any fancy interpolation
+#end get_delta_t_for_month
+
+def get_delta_t(when) :
+    "returns a suitable value for delta_t for the given datetime."
+    return \
+        get_delta_t_for_month(get_month_index(when))
 #end get_delta_t
 
+def get_delta_t_array(timestamps) :
+    "array version of get_delta_t(), for an array of POSIX timestamps."
+    index = get_month_indices(timestamps) - delta_t_base_index
+    beyond = np.maximum(index - len(delta_t_months) + 1, 0)
+    return \
+        delta_t_months[np.clip(index, 0, len(delta_t_months) - 1)] + delta_t_slope * beyond
+#end get_delta_t_array
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo = datetime.timezone.utc)
+_NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH64 = np.datetime64("1970-01-01T00:00:00", "s")
+
 def timestamp(when):
-    """ Return POSIX timestamp as a float.
-    cloned from https://hg.python.org/cpython/file/3.5/Lib/datetime.py in order to work on python 3.2
+    """Return POSIX timestamp as a float.
+    Naive datetimes are taken to be in UTC, like numpy.datetime64 values; pass a
+    timezone-aware datetime to use any other timezone. (Earlier versions passed
+    naive datetimes through time.mktime(), taking them to be in the local timezone
+    of the machine, so the result for them changes unless that is UTC.)
     """
-    _EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
-    print(when)
-    "Return POSIX timestamp as float"
     if when.tzinfo is None:
-        return time.mktime((when.year, when.month, when.day,
-                             when.hour, when.minute, when.second,
-                             -1, -1, -1)) + when.microsecond / 1e6
+        return (when - _NAIVE_EPOCH).total_seconds()
     else:
         return (when - _EPOCH).total_seconds()
 
+def get_timestamps(when):
+    "returns a NumPy array of POSIX timestamps for an array of numpy.datetime64 values" \
+    " (taken to be UTC), which is converted in a single array operation, for an array" \
+    " of numbers, which are taken to be POSIX timestamps already, or for a sequence or" \
+    " array of datetime.datetime objects."
+    if not isinstance(when, np.ndarray) :
+        when = np.asarray(when)
+    #end if
+    if np.issubdtype(when.dtype, np.datetime64):
+        result = (when - _EPOCH64) / np.timedelta64(1, "s")
+    elif np.issubdtype(when.dtype, np.number) :
+        result = when.astype(float)
+    else:
+        result = np.fromiter((timestamp(w) for w in when.flat), dtype = float, count = when.size).reshape(when.shape)
+    #end if
+    return \
+        result
+#end get_timestamps
+
 def get_julian_solar_day(when):
     "returns the UT Julian day number (including fraction of a day) corresponding to" \
     " the specified date/time. This version assumes the proleptic Gregorian calender;" \
     " trying to adjust for pre-Gregorian dates/times seems pointless when the changeover" \
     " happened over such wildly varying times in different regions."
+    month = get_month_index(when)
     return \
         (
-                (timestamp(when) + get_leap_seconds(when) + tt_offset - get_delta_t(when))
+                (timestamp(when) + get_leap_seconds_for_month(month) + tt_offset - get_delta_t_for_month(month))
             /
                 seconds_per_day
         +
@@ -767,7 +964,7 @@ def get_julian_ephemeris_day(when) :
     " happened over such wildly varying times in different regions."
     return \
         (
-                (timestamp(when) + get_leap_seconds(when) + tt_offset)
+                (timestamp(when) + get_leap_seconds_for_month(get_month_index(when)) + tt_offset)
             /
                 seconds_per_day
         +
@@ -777,6 +974,136 @@ def get_julian_ephemeris_day(when) :
         )
 #end get_julian_ephemeris_day
 
+def get_julian_days(when) :
+    "returns the UT and TT Julian days (get_julian_solar_day(), get_julian_ephemeris_day())" \
+    " for the specified date/time as a tuple, converting it only once. when may also be" \
+    " anything accepted by get_instants(), in which case the Julian days are arrays of" \
+    " the same shape, or floats for a single instant."
+    if not isinstance(when, datetime.datetime) :
+        instants = get_instants(when)
+        if np.ndim(instants.jd) == 0 :
+            return \
+                float(instants.jd), float(instants.jde)
+        #end if
+        return \
+            instants.jd, instants.jde
+    #end if
+    month = get_month_index(when)
+    tai = timestamp(when) + get_leap_seconds_for_month(month) + tt_offset
+    return \
+        (
+            (tai - get_delta_t_for_month(month)) / seconds_per_day + gregorian_day_offset + julian_day_offset,
+            tai / seconds_per_day + gregorian_day_offset + julian_day_offset,
+        )
+#end get_julian_days
+
+timestamp_units = {"s" : 1, "ms" : 10 ** 3, "us" : 10 ** 6, "ns" : 10 ** 9}
+
+def get_datetime64(timestamps, unit = "s") :
+    "the inverse of get_timestamps() for arrays of numbers: converts POSIX timestamps" \
+    " to numpy.datetime64 values in the given unit (one of timestamp_units), rounding" \
+    " to the nearest, with NaT for NaN."
+    if unit not in timestamp_units :
+        raise ValueError("unknown timestamp unit %r, expected one of %s" % (unit, ", ".join(timestamp_units)))
+    #end if
+    timestamps = np.asarray(timestamps, dtype = float)
+    missing = np.isnan(timestamps)
+    result = np.rint(np.where(missing, 0, timestamps) * timestamp_units[unit]).astype(np.int64).astype("datetime64[%s]" % unit)
+    result[missing] = np.datetime64("NaT")
+    return \
+        result
+#end get_datetime64
+
+class Instants :
+    "one instant or an array of them, converted once up front into the forms the solar" \
+    " position calculations need: POSIX timestamps (UTC seconds), and UT and TT Julian" \
+    " days. Every attribute is an array of the same shape. Build one with get_instants()" \
+    " or the from_xxx() class methods, and pass it anywhere a time is expected, to avoid" \
+    " creating datetime.datetime objects or repeating the conversion."
+
+    def __init__(self, timestamps, jd, jde) :
+        self.timestamps = timestamps
+        self.jd = jd
+        self.jde = jde
+    #end __init__
+
+    @classmethod
+    def from_timestamps(cls, timestamps, unit = "s") :
+        "converts an array of POSIX timestamps, which may be integers in any of the" \
+        " timestamp_units (e.g. int64 epoch nanoseconds as stored by Parquet)."
+        if unit not in timestamp_units :
+            raise ValueError("unknown timestamp unit %r, expected one of %s" % (unit, ", ".join(timestamp_units)))
+        #end if
+        timestamps = np.asarray(timestamps)
+        if timestamps.dtype.kind == "M" :
+            timestamps = get_timestamps(timestamps)
+        else :
+            timestamps = timestamps / timestamp_units[unit] if unit != "s" else timestamps.astype(float)
+        #end if
+        tai = timestamps + get_leap_seconds_array(timestamps) + tt_offset
+        # same order of operations as get_julian_days(), so results round identically
+        return \
+            cls \
+              (
+                timestamps = timestamps,
+                jd = (tai - get_delta_t_array(timestamps)) / seconds_per_day + gregorian_day_offset + julian_day_offset,
+                jde = tai / seconds_per_day + gregorian_day_offset + julian_day_offset
+              )
+    #end from_timestamps
+
+    @classmethod
+    def from_julian_days(cls, jd, jde = None) :
+        "converts arrays of UT Julian days and, optionally, the corresponding TT Julian" \
+        " days. If jde is omitted, it is derived from jd with the delta_t table."
+        jd = np.asarray(jd, dtype = float)
+        ut_seconds = (jd - julian_day_offset - gregorian_day_offset) * seconds_per_day
+        if jde is None : # not "== None", which compares element-wise with arrays
+            jde = jd + get_delta_t_array(ut_seconds) / seconds_per_day
+        else :
+            jde = np.asarray(jde, dtype = float)
+        #end if
+        tai = (jde - julian_day_offset - gregorian_day_offset) * seconds_per_day - tt_offset
+        # tai is less than a minute ahead of UTC, so only differs in month near a leap second
+        timestamps = tai - get_leap_seconds_array(tai)
+        return \
+            cls \
+              (
+                timestamps = tai - get_leap_seconds_array(timestamps),
+                jd = jd,
+                jde = jde
+              )
+    #end from_julian_days
+
+    @property
+    def shape(self) :
+        return \
+            np.shape(self.jd)
+    #end shape
+
+    @property
+    def day_of_year(self) :
+        "the UTC day of the year of each instant, starting from 1 on January 1."
+        date = np.floor(self.timestamps / seconds_per_day).astype(np.int64).astype("datetime64[D]")
+        return \
+            (date - date.astype("datetime64[Y]")).astype(np.int64) + 1
+    #end day_of_year
+
+#end Instants
+
+def get_instants(when) :
+    "returns an Instants for when, which may be an Instants already, a datetime.datetime" \
+    " or a sequence or array of them, a numpy.datetime64 or an array of them (in any unit," \
+    " taken to be UTC), or a number or array of numbers, taken to be POSIX timestamps in" \
+    " seconds. Use Instants.from_timestamps() for timestamps in other units, or" \
+    " Instants.from_julian_days() for Julian days."
+    if isinstance(when, Instants) :
+        return \
+            when
+    #end if
+    return \
+        Instants.from_timestamps(get_timestamps(when))
+#end get_instants
+
 def get_julian_century(julian_day):
     return (julian_day - 2451545.0) / 36525.0
 
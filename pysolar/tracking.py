@@ -0,0 +1,161 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Orientation of single-axis and dual-axis solar trackers
+
+A single-axis tracker turns its surface about an axis that points towards
+axis_azimuth_deg (in the same convention as the sun's azimuth: degrees from
+south, positive towards the east), sloping down that way by axis_tilt_deg.
+At a rotation of zero the surface faces the same way, tilted by
+axis_tilt_deg; positive rotations turn it clockwise as seen looking along the
+axis, so towards the west for an axis pointing south. The ideal rotation puts
+the sun in the plane through the axis and the surface normal, minimizing the
+angle of incidence (Marion and Dobos, 2013). With backtracking, rows of
+trackers at the given ground coverage ratio (the width of the surface over the
+distance between axes) turn back from the ideal rotation when the sun is low
+just far enough not to shade each other, assuming level ground across the rows.
+Rotations are limited to max_rotation_deg either way. A dual-axis tracker
+points straight at the sun, with its tilt limited to max_tilt_deg.
+
+Everything is computed from unit vectors, (east, north, up) as returned by
+transposition.get_direction(): those towards the sun once per time, and those
+along each tracker's axis and its surface normal at zero rotation once per
+tracker. The arguments broadcast against each other, and the functions that
+take a site and times compute the solar position with
+vectorized.get_position_matrix() and return (N, M) arrays for N trackers and
+M times, so a whole plant can be updated in one call. The angles are NaN while
+the sun is below the horizon.
+
+"""
+import collections
+import numpy as np
+from . import constants
+from . import transposition
+from . import vectorized
+
+SingleAxisAngles = collections.namedtuple \
+  (
+    "SingleAxisAngles",
+    (
+        "rotation", # degrees, after backtracking and limits
+        "ideal_rotation", # degrees, tracking the sun exactly
+        "surface_tilt",
+        "surface_azimuth", # degrees, same convention as the sun's azimuth
+        "incidence", # angle of incidence on the surface, degrees
+    )
+  )
+
+DualAxisAngles = collections.namedtuple("DualAxisAngles", ("surface_tilt", "surface_azimuth", "incidence"))
+
+def _dot(a, b) :
+    # dot products of broadcast arrays of vectors along the last axis
+    return \
+        np.einsum("...i,...i->...", a, b)
+#end _dot
+
+def get_axis_frame(axis_tilt_deg, axis_azimuth_deg) :
+    "returns unit vectors along the axis of a single-axis tracker, along the normal to" \
+    " its surface at zero rotation, and in the direction in which positive rotations" \
+    " turn that normal."
+    axis = transposition.get_direction(np.negative(axis_tilt_deg), axis_azimuth_deg)
+    normal = transposition.get_direction(90 - np.asarray(axis_tilt_deg), axis_azimuth_deg)
+    return \
+        axis, normal, np.cross(axis, normal)
+#end get_axis_frame
+
+def get_backtracking_rotation(ideal_rotation_deg, gcr) :
+    "returns the rotation that rows of trackers with ground coverage ratio gcr turn to, so" \
+    " as not to shade each other, when the ideal rotation is ideal_rotation_deg."
+    cos_ideal = np.abs(np.cos(np.radians(ideal_rotation_deg)))
+    correction = np.degrees(np.arccos(np.minimum(cos_ideal / gcr, 1)))
+    return \
+        ideal_rotation_deg - np.sign(ideal_rotation_deg) * correction
+#end get_backtracking_rotation
+
+def get_single_axis_angles(altitude_deg, azimuth_deg, axis_tilt_deg = 0, axis_azimuth_deg = 0, max_rotation_deg = 90, gcr = None) :
+    "computes the orientation of single-axis trackers with the sun at the given altitudes" \
+    " and azimuths, all broadcast against each other. If gcr (the ground coverage ratio)" \
+    " is not None, backtracks to avoid shading between rows. Returns a SingleAxisAngles" \
+    " of arrays, NaN where the sun is below the horizon."
+    sun = transposition.get_direction(altitude_deg, azimuth_deg)
+    axis, normal, turn = get_axis_frame(axis_tilt_deg, axis_azimuth_deg)
+    ideal_rotation = np.degrees(np.arctan2(_dot(sun, turn), _dot(sun, normal)))
+    ideal_rotation = np.where(np.asarray(altitude_deg) > 0, ideal_rotation, np.nan)
+    if gcr is not None :
+        rotation = get_backtracking_rotation(ideal_rotation, gcr)
+    else :
+        rotation = ideal_rotation
+    #end if
+    rotation = np.clip(rotation, np.negative(max_rotation_deg), max_rotation_deg)
+    rotation_rad = np.radians(rotation)[..., np.newaxis]
+    surface_normal = np.cos(rotation_rad) * normal + np.sin(rotation_rad) * turn
+    east, north, up = (surface_normal[..., i] for i in range(3))
+    return \
+        SingleAxisAngles \
+          (
+            rotation = rotation,
+            ideal_rotation = ideal_rotation,
+            surface_tilt = np.degrees(np.arccos(np.clip(up, -1, 1))),
+            surface_azimuth = np.degrees(np.arctan2(east, -north)),
+            incidence = np.degrees(np.arccos(np.clip(_dot(surface_normal, sun), -1, 1))),
+          )
+#end get_single_axis_angles
+
+def get_dual_axis_angles(altitude_deg, azimuth_deg, max_tilt_deg = 90) :
+    "computes the orientation of dual-axis trackers with the sun at the given altitudes and" \
+    " azimuths, all broadcast against each other. Returns a DualAxisAngles of arrays, NaN" \
+    " where the sun is below the horizon."
+    altitude_deg, azimuth_deg, max_tilt_deg = np.broadcast_arrays(*(np.asarray(x, dtype = float) for x in (altitude_deg, azimuth_deg, max_tilt_deg)))
+    up = altitude_deg > 0
+    surface_tilt = np.where(up, np.minimum(90 - altitude_deg, max_tilt_deg), np.nan)
+    return \
+        DualAxisAngles \
+          (
+            surface_tilt = surface_tilt,
+            surface_azimuth = np.where(up, azimuth_deg, np.nan),
+            incidence = 90 - altitude_deg - surface_tilt,
+          )
+#end get_dual_axis_angles
+
+def _tracker(x) :
+    # reshapes a tracker argument (a scalar or a vector of length N) to broadcast against times
+    return \
+        np.reshape(x, (-1, 1)) if np.ndim(x) != 0 else x
+#end _tracker
+
+def get_single_axis_tracker_angles(latitude_deg, longitude_deg, when, axis_tilt_deg = 0, axis_azimuth_deg = 0, max_rotation_deg = 90, gcr = None, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full") :
+    "computes get_single_axis_angles() for every combination of N trackers (the site and" \
+    " tracker arguments, scalars or vectors of length N) and the M times when (a vector" \
+    " of anything accepted by time.get_instants(), or a single instant), following the" \
+    " apparent (refracted) sun. Returns a SingleAxisAngles of (N, M) arrays."
+    position = vectorized.get_position_matrix(latitude_deg, longitude_deg, np.atleast_1d(when), elevation, temperature, pressure, precision)
+    return \
+        get_single_axis_angles \
+          (
+            position.altitude, position.azimuth,
+            _tracker(axis_tilt_deg), _tracker(axis_azimuth_deg), _tracker(max_rotation_deg),
+            (_tracker(gcr) if gcr is not None else None)
+          )
+#end get_single_axis_tracker_angles
+
+def get_dual_axis_tracker_angles(latitude_deg, longitude_deg, when, max_tilt_deg = 90, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full") :
+    "computes get_dual_axis_angles() for every combination of N trackers and M times, as" \
+    " get_single_axis_tracker_angles() does. Returns a DualAxisAngles of (N, M) arrays."
+    position = vectorized.get_position_matrix(latitude_deg, longitude_deg, np.atleast_1d(when), elevation, temperature, pressure, precision)
+    return \
+        get_dual_axis_angles(position.altitude, position.azimuth, _tracker(max_tilt_deg))
+#end get_dual_axis_tracker_angles
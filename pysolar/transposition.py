@@ -0,0 +1,172 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Irradiance on tilted surfaces (plane of array)
+
+Transposes direct normal, diffuse horizontal and global horizontal irradiance
+(for example, from rest.get_clear_sky_irradiance() after rest.sum_bands(), or
+vectorized.get_radiation_direct()) onto surfaces of any tilt and orientation,
+splitting the result into the beam, sky diffuse and ground-reflected parts.
+
+Surface azimuths are in the same convention as the sun's azimuth from
+solar.get_azimuth() and vectorized.get_position(): degrees from south,
+positive towards the east, so a surface faces the sun when the two are equal.
+(solar.get_incidence_angle() instead takes the orientation from south
+positive towards the west, and the azimuth clockwise from north.) Tilts are
+in degrees from horizontal.
+
+The sky diffuse part is either isotropic, or anisotropic after Hay and Davies
+(1980), in which a share of it, in proportion to how much of the
+extraterrestrial beam gets through, comes from the direction of the sun. The
+ground reflects the global horizontal irradiance isotropically with the given
+albedo.
+
+All the arguments broadcast against each other. The _matrix functions take
+vectors of N surfaces and M times, compute the unit vectors towards the sun and
+along the surface normals once each, and find the cosines of all N x M
+incidence angles as one matrix product.
+
+"""
+import collections
+import numpy as np
+from . import rest
+
+PlaneOfArrayIrradiance = collections.namedtuple \
+  (
+    "PlaneOfArrayIrradiance",
+    (
+        "beam",
+        "sky_diffuse",
+        "ground_reflected",
+        "total",
+    )
+  )
+
+sky_models = ("isotropic", "hay-davies")
+
+default_albedo = 0.2
+default_extraterrestrial_normal = rest.band_E0n.sum() # W/m^2, as used by rest
+min_cos_zenith = np.cos(np.radians(89)) # limits the beam ratio near the horizon
+
+def get_direction(altitude_deg, azimuth_deg) :
+    "returns unit vectors (east, north, up) along the last axis pointing at the given" \
+    " altitudes and azimuths (degrees from south, positive towards the east). With" \
+    " altitude 90 - tilt, this is also the normal to a surface of that tilt."
+    altitude_rad = np.radians(altitude_deg)
+    azimuth_rad = np.radians(azimuth_deg)
+    cos_altitude = np.cos(altitude_rad)
+    return \
+        np.stack \
+          (
+            np.broadcast_arrays
+              (
+                cos_altitude * np.sin(azimuth_rad),
+                -cos_altitude * np.cos(azimuth_rad),
+                np.sin(altitude_rad),
+              ),
+            axis = -1
+          )
+#end get_direction
+
+def get_cos_incidence(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg) :
+    "returns the cosine of the angle between the sun and the normal to the surface, which" \
+    " is negative when the sun is behind it."
+    altitude_rad = np.radians(altitude_deg)
+    tilt_rad = np.radians(tilt_deg)
+    return \
+        (
+            np.sin(altitude_rad) * np.cos(tilt_rad)
+        +
+            np.cos(altitude_rad) * np.sin(tilt_rad) * np.cos(np.radians(np.subtract(azimuth_deg, surface_azimuth_deg)))
+        )
+#end get_cos_incidence
+
+def get_incidence_angle(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg) :
+    "array version of solar.get_incidence_angle(), in the conventions of this module;" \
+    " returns the angle in degrees between the sun and the normal to the surface."
+    return \
+        np.degrees(np.arccos(np.clip(get_cos_incidence(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg), -1, 1)))
+#end get_incidence_angle
+
+def _transpose(cos_incidence, altitude_deg, tilt_deg, direct_normal, diffuse_horizontal, global_horizontal, albedo, sky_model, extraterrestrial_normal) :
+    # does the work of get_plane_of_array_irradiance() once the incidence is known
+    if sky_model not in sky_models :
+        raise ValueError("unknown sky_model %r, expected one of %s" % (sky_model, ", ".join(sky_models)))
+    #end if
+    up = np.asarray(altitude_deg) > 0
+    cos_zenith = np.sin(np.radians(altitude_deg))
+    if global_horizontal is None :
+        global_horizontal = direct_normal * np.maximum(cos_zenith, 0) + diffuse_horizontal
+    #end if
+    cos_tilt = np.cos(np.radians(tilt_deg))
+    beam = np.where(up, direct_normal * np.maximum(cos_incidence, 0), 0.0)
+    sky_view = (1 + cos_tilt) / 2
+    if sky_model == "hay-davies" :
+        if extraterrestrial_normal is None :
+            extraterrestrial_normal = default_extraterrestrial_normal
+        #end if
+        anisotropy = np.where(up, np.clip(direct_normal / extraterrestrial_normal, 0, 1), 0.0)
+        beam_ratio = np.maximum(cos_incidence, 0) / np.maximum(cos_zenith, min_cos_zenith)
+        sky_diffuse = diffuse_horizontal * (anisotropy * beam_ratio + (1 - anisotropy) * sky_view)
+    else :
+        sky_diffuse = diffuse_horizontal * sky_view
+    #end if
+    ground_reflected = global_horizontal * albedo * (1 - cos_tilt) / 2
+    total = beam + sky_diffuse + ground_reflected
+    return \
+        PlaneOfArrayIrradiance(*np.broadcast_arrays(beam, sky_diffuse, ground_reflected, total))
+#end _transpose
+
+def get_plane_of_array_irradiance(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg, direct_normal, diffuse_horizontal, global_horizontal = None, albedo = default_albedo, sky_model = "isotropic", extraterrestrial_normal = None) :
+    "transposes the irradiance (W/m^2) with the sun at the given altitudes and azimuths" \
+    " onto surfaces with the given tilts and azimuths, all broadcast against each other." \
+    " global_horizontal defaults to the sum of the beam and diffuse on the horizontal;" \
+    " extraterrestrial_normal, used only by the hay-davies sky_model, defaults to the" \
+    " total of rest.E0n. Returns a PlaneOfArrayIrradiance of arrays."
+    return \
+        _transpose \
+          (
+            get_cos_incidence(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg),
+            altitude_deg, tilt_deg, direct_normal, diffuse_horizontal, global_horizontal,
+            albedo, sky_model, extraterrestrial_normal
+          )
+#end get_plane_of_array_irradiance
+
+def get_cos_incidence_matrix(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg) :
+    "returns the (N, M) cosines of incidence for N surfaces (scalars or vectors of length" \
+    " N) and M sun positions (vectors of length M)."
+    sun = get_direction(np.ravel(altitude_deg), np.ravel(azimuth_deg))
+    normals = get_direction(90 - np.atleast_1d(tilt_deg), np.atleast_1d(surface_azimuth_deg))
+    return \
+        normals @ sun.T
+#end get_cos_incidence_matrix
+
+def get_plane_of_array_irradiance_matrix(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg, direct_normal, diffuse_horizontal, global_horizontal = None, albedo = default_albedo, sky_model = "isotropic", extraterrestrial_normal = None) :
+    "get_plane_of_array_irradiance() for every combination of N surfaces (tilt_deg," \
+    " surface_azimuth_deg and albedo, scalars or vectors of length N) and M times (the" \
+    " sun position and irradiance, vectors of length M). Returns a PlaneOfArrayIrradiance" \
+    " of (N, M) arrays."
+    surface = lambda x : np.reshape(x, (-1, 1)) if np.ndim(x) != 0 else x
+    return \
+        _transpose \
+          (
+            get_cos_incidence_matrix(altitude_deg, azimuth_deg, tilt_deg, surface_azimuth_deg),
+            np.ravel(altitude_deg), surface(tilt_deg), np.ravel(direct_normal), np.ravel(diffuse_horizontal),
+            (np.ravel(global_horizontal) if global_horizontal is not None else None),
+            surface(albedo), sky_model, extraterrestrial_normal
+          )
+#end get_plane_of_array_irradiance_matrix
@@ -45,6 +45,8 @@ elevation_default = 0.0      # Default elevation is 0.0
 
 def get_sunrise_sunset(latitude_deg, longitude_deg, when):
     """This function calculates the astronomical sunrise and sunset times in local time.
+    It uses an approximate empirical formula; events.get_sunrise_sunset() computes
+    them from the full solar position algorithm.
 
     Parameters
     ----------
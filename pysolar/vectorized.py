@@ -0,0 +1,464 @@
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Vectorized solar geometry functions
+
+This module evaluates the same Reda and Andreas algorithm as solar.py, but
+over NumPy arrays of times (and, by broadcasting, of locations) instead of one
+datetime at a time. Times may be given as anything time.get_instants() accepts:
+an array of numpy.datetime64 values (taken to be UTC), an array of POSIX
+timestamps, a sequence of timezone-aware datetime.datetime objects, or a
+time.Instants already converted from any of these or from Julian days.
+
+"""
+import datetime
+import numpy as np
+from . import constants
+from . import rest
+from . import simulate
+from . import solar
+from . import time
+
+def get_julian_days(timestamps):
+    "returns the arrays (jd, jde) of UT and TT Julian days for an array of POSIX timestamps."
+    instants = time.Instants.from_timestamps(timestamps)
+    return \
+        instants.jd, instants.jde
+#end get_julian_days
+
+def get_true_ecliptic_obliquity(jme, nutation_obliquity):
+    u = jme / 10.0
+    mean_obliquity = 84381.448 - (4680.93 * u) - (1.55 * u ** 2) + (1999.25 * u ** 3) \
+    - (51.38 * u ** 4) -(249.67 * u ** 5) - (39.05 * u ** 6) + (7.12 * u ** 7) \
+    + (27.87 * u ** 8) + (5.79 * u ** 9) + (2.45 * u ** 10)
+    return (mean_obliquity / 3600.0) + nutation_obliquity
+
+def get_mean_sidereal_time(jd):
+    jc = time.get_julian_century(jd)
+    sidereal_time =  280.46061837 + (360.98564736629 * (jd - 2451545.0)) + 0.000387933 * jc * jc * (1 - jc / 38710000)
+    return sidereal_time % 360
+
+def get_equation_of_time(jme, right_ascension, nutation_longitude, true_ecliptic_obliquity):
+    "returns the number of minutes to add to mean solar time to get apparent solar time," \
+    " from Reda and Andreas (2005) equation A.1."
+    sun_mean_longitude = \
+        (
+            280.4664567 + 360007.6982779 * jme + 0.03032028 * jme ** 2
+        +
+            jme ** 3 / 49931 - jme ** 4 / 15300 - jme ** 5 / 2000000
+        ) % 360
+    eot = 4 * (sun_mean_longitude - 0.0057183 - right_ascension + nutation_longitude * np.cos(np.radians(true_ecliptic_obliquity)))
+    return \
+        (eot + 720) % 1440 - 720 # whichever way round the difference in angles wraps
+#end get_equation_of_time
+
+def get_projected_radial_distance(elevation, latitude):
+    latitude_rad = np.radians(latitude)
+    flattened_latitude_rad = np.arctan(0.99664719 * np.tan(latitude_rad))
+    return np.cos(flattened_latitude_rad) + (elevation * np.cos(latitude_rad) / constants.earth_radius)
+
+def get_projected_axial_distance(elevation, latitude):
+    latitude_rad = np.radians(latitude)
+    flattened_latitude_rad = np.arctan(0.99664719 * np.tan(latitude_rad))
+    return 0.99664719 * np.sin(flattened_latitude_rad) + (elevation * np.sin(latitude_rad) / constants.earth_radius)
+
+def get_refraction_correction(pressure, temperature, topocentric_elevation_angle):
+    "array version of solar.get_refraction_correction()."
+    tea = np.asarray(topocentric_elevation_angle, dtype = float)
+    sun_radius = 0.26667
+    atmos_refract = 0.5667
+    visible = tea >= -1.0 * (sun_radius + atmos_refract)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        a = pressure * 2.830 * 1.02
+        b = 1010.0 * temperature * 60.0 * np.tan(np.radians(tea + (10.3 / (tea + 5.11))))
+        del_e = a / b
+    #end with
+    return \
+        np.where(visible, del_e, 0.0)
+#end get_refraction_correction
+
+class SolarEphemeris :
+    "array version of solar.SolarEphemeris, holding the location-independent part of" \
+    " the solar position algorithm for an array of times. when is anything accepted by" \
+    " time.get_instants(); every attribute is an array with the same shape."
+
+    def __init__(self, when, precision = "full") :
+        instants = time.get_instants(when)
+        self._compute(instants.jd, instants.jde, precision)
+    #end __init__
+
+    @classmethod
+    def from_julian_days(cls, jd, jde, precision = "full") :
+        "builds the ephemeris for arrays of UT and TT Julian days."
+        result = cls.__new__(cls)
+        result._compute(np.asarray(jd, dtype = float), np.asarray(jde, dtype = float), precision)
+        return \
+            result
+    #end from_julian_days
+
+    # the attributes that topocentric() and from_attributes() use
+    topocentric_attributes = \
+        (
+            "jd",
+            "jde",
+            "apparent_sidereal_time",
+            "right_ascension",
+            "declination",
+            "equatorial_horizontal_parallax",
+            "sun_earth_distance",
+        )
+
+    @classmethod
+    def from_attributes(cls, precision, **attributes) :
+        "rebuilds an ephemeris from arrays for each of topocentric_attributes, for example" \
+        " views of one computed elsewhere and held in shared memory. The other attributes" \
+        " are not recomputed, and are None."
+        constants.check_precision(precision)
+        result = cls.__new__(cls)
+        result.precision = precision
+        for name in ("jce", "jme", "geocentric_latitude", "geocentric_longitude", "aberration_correction", "nutation", "true_ecliptic_obliquity", "apparent_sun_longitude", "equation_of_time") :
+            setattr(result, name, None)
+        #end for
+        for name in cls.topocentric_attributes :
+            setattr(result, name, attributes[name])
+        #end for
+        return \
+            result
+    #end from_attributes
+
+    def select(self, index) :
+        "returns an ephemeris for the times selected from this one by index (e.g. a slice)," \
+        " with just the topocentric_attributes."
+        return \
+            type(self).from_attributes(self.precision, **dict((name, getattr(self, name)[index]) for name in self.topocentric_attributes))
+    #end select
+
+    def _compute(self, jd, jde, precision) :
+        constants.check_precision(precision)
+        self.precision = precision
+        self.jd = jd
+        self.jde = jde
+        self.jce = time.get_julian_ephemeris_century(self.jde)
+        self.jme = time.get_julian_ephemeris_millennium(self.jce)
+        if precision == "fast" :
+            self._compute_fast()
+            return
+        #end if
+        longitude_series, latitude_series, distance_series = solar.get_vsop87_series(self.jme, precision)
+        self.geocentric_latitude = -1 * np.degrees(latitude_series / 1e8)
+        self.geocentric_longitude = (np.degrees(longitude_series / 1e8) % 360 + 180) % 360
+        self.sun_earth_distance = distance_series / 1e8
+        self.aberration_correction = -20.4898 / (3600.0 * self.sun_earth_distance)
+        self.equatorial_horizontal_parallax = 8.794 / (3600 / self.sun_earth_distance)
+        self.nutation = solar.get_nutation(self.jce, precision)
+        nutation_longitude, nutation_obliquity = self.nutation
+        self.true_ecliptic_obliquity = get_true_ecliptic_obliquity(self.jme, nutation_obliquity)
+        self.apparent_sidereal_time = get_mean_sidereal_time(self.jd) + nutation_longitude * np.cos(self.true_ecliptic_obliquity)
+        self.apparent_sun_longitude = self.geocentric_longitude + nutation_longitude + self.aberration_correction
+        apparent_sun_longitude_rad = np.radians(self.apparent_sun_longitude)
+        true_ecliptic_obliquity_rad = np.radians(self.true_ecliptic_obliquity)
+        geocentric_latitude_rad = np.radians(self.geocentric_latitude)
+        self.right_ascension = np.degrees \
+          (
+            np.arctan2
+              (
+                    np.sin(apparent_sun_longitude_rad) * np.cos(true_ecliptic_obliquity_rad)
+                -
+                    np.tan(geocentric_latitude_rad) * np.sin(true_ecliptic_obliquity_rad),
+                np.cos(apparent_sun_longitude_rad)
+              )
+          ) % 360
+        self.declination = np.degrees \
+          (
+            np.arcsin
+              (
+                    np.sin(geocentric_latitude_rad) * np.cos(true_ecliptic_obliquity_rad)
+                +
+                    np.cos(geocentric_latitude_rad) * np.sin(true_ecliptic_obliquity_rad) * np.sin(apparent_sun_longitude_rad)
+              )
+          )
+        self.equation_of_time = get_equation_of_time(self.jme, self.right_ascension, nutation_longitude, self.true_ecliptic_obliquity)
+    #end _compute
+
+    def _compute_fast(self) :
+        # array version of solar.SolarEphemeris._compute_fast()
+        days = self.jd - time.julian_day_offset - time.gregorian_day_offset # since 1970-01-01
+        date = np.floor(days).astype(np.int64).astype("datetime64[D]")
+        day = (date - date.astype("datetime64[Y]")).astype(np.int64) + 1
+        minutes = days % 1 * 24 * 60
+        b = 2 * np.pi / 364.0 * (day - 81)
+        equation_of_time = 9.87 * np.sin(2 * b) - 7.53 * np.cos(b) - 1.5 * np.sin(b)
+        greenwich_hour_angle = 15 * ((minutes + equation_of_time) / 60 - 12)
+        self.geocentric_latitude = self.geocentric_longitude = None
+        self.aberration_correction = self.nutation = None
+        self.true_ecliptic_obliquity = self.apparent_sun_longitude = None
+        self.sun_earth_distance = 1 - 0.01672 * np.cos(np.radians(0.9856 * (day - 4)))
+        self.equatorial_horizontal_parallax = 8.794 / (3600 / self.sun_earth_distance)
+        self.apparent_sidereal_time = get_mean_sidereal_time(self.jd)
+        self.right_ascension = (self.apparent_sidereal_time - greenwich_hour_angle) % 360
+        self.declination = constants.earth_axis_inclination * np.sin((2 * np.pi / 365.0) * (day - 81))
+        self.equation_of_time = equation_of_time
+    #end _compute_fast
+
+    def topocentric(self, latitude_deg, longitude_deg, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure) :
+        "returns a solar.SolarPosition of arrays for the given locations, which are" \
+        " broadcast against the times of this ephemeris."
+        # location-dependent calculations
+        projected_radial_distance = get_projected_radial_distance(elevation, latitude_deg)
+        projected_axial_distance = get_projected_axial_distance(elevation, latitude_deg)
+        latitude_rad = np.radians(latitude_deg)
+        sin_latitude = np.sin(latitude_rad)
+        cos_latitude = np.cos(latitude_rad)
+
+        # calculations dependent on location and time
+        geocentric_sun_declination_rad = np.radians(self.declination)
+        local_hour_angle_rad = np.radians((self.apparent_sidereal_time + longitude_deg - self.right_ascension) % 360)
+        ehp_rad = np.radians(self.equatorial_horizontal_parallax)
+        parallax_sun_right_ascension = np.degrees \
+          (
+            np.arctan2
+              (
+                -1 * projected_radial_distance * np.sin(ehp_rad) * np.sin(local_hour_angle_rad),
+                np.cos(geocentric_sun_declination_rad) - projected_radial_distance * np.sin(ehp_rad) * np.cos(local_hour_angle_rad)
+              )
+          )
+        topocentric_local_hour_angle = np.degrees(local_hour_angle_rad) - parallax_sun_right_ascension
+        topocentric_sun_declination = np.degrees \
+          (
+            np.arctan2
+              (
+                (np.sin(geocentric_sun_declination_rad) - projected_axial_distance * np.sin(ehp_rad)) * np.cos(np.radians(parallax_sun_right_ascension)),
+                np.cos(geocentric_sun_declination_rad) - projected_axial_distance * np.sin(ehp_rad) * np.cos(local_hour_angle_rad)
+              )
+          )
+        tsd_rad = np.radians(topocentric_sun_declination)
+        tlha_rad = np.radians(topocentric_local_hour_angle)
+        topocentric_elevation_angle = np.degrees \
+          (
+            np.arcsin
+              (
+                    sin_latitude * np.sin(tsd_rad)
+                +
+                    cos_latitude * np.cos(tsd_rad) * np.cos(tlha_rad)
+              )
+          )
+        refraction_correction = get_refraction_correction(pressure, temperature, topocentric_elevation_angle)
+        altitude = topocentric_elevation_angle + refraction_correction
+        topocentric_azimuth_angle = 180.0 + np.degrees \
+          (
+            np.arctan2
+              (
+                np.sin(tlha_rad),
+                np.cos(tlha_rad) * sin_latitude - np.tan(tsd_rad) * cos_latitude
+              )
+          ) % 360
+        return \
+            solar.SolarPosition \
+              (
+                altitude = altitude,
+                azimuth = 180 - topocentric_azimuth_angle,
+                zenith = 90 - altitude,
+                declination = topocentric_sun_declination,
+                right_ascension = self.right_ascension + parallax_sun_right_ascension,
+                hour_angle = topocentric_local_hour_angle,
+                sun_earth_distance = np.broadcast_to(self.sun_earth_distance, altitude.shape),
+                refraction_correction = refraction_correction,
+              )
+    #end topocentric
+
+    def topocentric_matrix(self, latitude_deg, longitude_deg, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure) :
+        "returns a solar.SolarPosition of (N, M) arrays for every combination of N sites" \
+        " (scalars or vectors of length N) and the M times of this one-dimensional ephemeris."
+        site = lambda x : np.reshape(x, (-1, 1)) if np.ndim(x) != 0 else x
+        latitude_deg, longitude_deg, elevation, temperature, pressure = \
+            (site(x) for x in (latitude_deg, longitude_deg, elevation, temperature, pressure))
+        position = self.topocentric(latitude_deg, longitude_deg, elevation, temperature, pressure)
+        shape = np.broadcast_shapes(np.shape(latitude_deg), np.shape(longitude_deg), np.shape(elevation), np.shape(temperature), np.shape(pressure), (1, 1))[:1] + np.shape(self.jd)
+        return \
+            solar.SolarPosition(*(np.broadcast_to(a, shape) for a in position))
+    #end topocentric_matrix
+
+#end SolarEphemeris
+
+def get_position(latitude_deg, longitude_deg, when, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full"):
+    """array version of solar.get_position(). when is anything accepted by
+    time.get_instants(); the location arguments may be scalars or arrays that
+    broadcast against it. Returns a solar.SolarPosition of arrays."""
+    return \
+        SolarEphemeris(when, precision).topocentric(latitude_deg, longitude_deg, elevation, temperature, pressure)
+#end get_position
+
+def get_position_matrix(latitude_deg, longitude_deg, when, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full"):
+    """computes the solar position for every combination of N sites and M times.
+    The site arguments are scalars or vectors of length N, and when is a vector of M
+    times. The location-independent terms are computed once per time and the
+    time-independent ones once per site; the result is a solar.SolarPosition of
+    (N, M) arrays."""
+    instants = time.get_instants(when)
+    ephemeris = SolarEphemeris.from_julian_days(np.ravel(instants.jd), np.ravel(instants.jde), precision)
+    return \
+        ephemeris.topocentric_matrix(latitude_deg, longitude_deg, elevation, temperature, pressure)
+#end get_position_matrix
+
+def get_altitude(latitude_deg, longitude_deg, when, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure):
+    return get_position(latitude_deg, longitude_deg, when, elevation, temperature, pressure).altitude
+
+def get_azimuth(latitude_deg, longitude_deg, when, elevation = 0):
+    return get_position(latitude_deg, longitude_deg, when, elevation).azimuth
+
+def get_radiation_direct(when, altitude_deg):
+    "array version of radiation.get_radiation_direct(). when is anything accepted by" \
+    " time.get_instants(), or a time.Instants, broadcast against altitude_deg."
+    day = time.get_instants(when).day_of_year
+    flux = 1160 + (75 * np.sin(2 * np.pi / 365 * (day - 275)))
+    optical_depth = 0.174 + (0.035 * np.sin(2 * np.pi / 365 * (day - 100)))
+    with np.errstate(divide = "ignore", over = "ignore"):
+        air_mass_ratio = 1 / np.sin(np.radians(altitude_deg)) # inf at the horizon, like radiation.get_air_mass_ratio()
+        result = flux * np.exp(-1 * optical_depth * air_mass_ratio)
+    #end with
+    return \
+        result
+#end get_radiation_direct
+
+def get_clear_sky_irradiance(latitude_deg, longitude_deg, when, atmosphere = None, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full"):
+    "computes the solar position as get_position() does, and from it the REST2 clear-sky" \
+    " irradiance in the given rest.AtmosphereState, allowing for the sun-earth distance." \
+    " Returns a rest.ClearSkyIrradiance of arrays with the two bands along a leading" \
+    " axis; rest.sum_bands() adds them up."
+    position = get_position(latitude_deg, longitude_deg, when, elevation, temperature, pressure, precision)
+    return \
+        rest.get_clear_sky_irradiance(position.altitude, atmosphere, position.sun_earth_distance)
+#end get_clear_sky_irradiance
+
+def get_time_range_steps(start_datetime, end_datetime, step_minutes):
+    "returns the start (numpy.datetime64, UTC) and step (numpy.timedelta64) of the" \
+    " times of simulate.datetime_range(), and how many there are, as a tuple."
+    step = step_minutes * 60
+    span = end_datetime - start_datetime
+    count = int((span.days * constants.seconds_per_day + span.seconds) // step)
+    if start_datetime.tzinfo != None :
+        start_datetime = start_datetime.astimezone(datetime.timezone.utc).replace(tzinfo = None)
+    #end if
+    return \
+        np.datetime64(start_datetime, "us"), np.timedelta64(round(step * 10 ** 6), "us"), count
+#end get_time_range_steps
+
+def get_time_range(start_datetime, end_datetime, step_minutes):
+    "array version of simulate.datetime_range(), returning the same times as" \
+    " numpy.datetime64 values in UTC."
+    start, step, count = get_time_range_steps(start_datetime, end_datetime, step_minutes)
+    return \
+        start + np.arange(count) * step
+#end get_time_range
+
+default_chunk_size = 65536
+
+def get_time_range_chunks(start_datetime, end_datetime, step_minutes, chunk_size = default_chunk_size, first_step = 0):
+    "yields get_time_range()[first_step:] in successive arrays of at most chunk_size" \
+    " times, without ever creating the whole range."
+    if chunk_size < 1 :
+        raise ValueError("chunk_size must be at least 1, not %r" % chunk_size)
+    #end if
+    start, step, count = get_time_range_steps(start_datetime, end_datetime, step_minutes)
+    for first in range(first_step, count, chunk_size) :
+        yield start + np.arange(first, min(first + chunk_size, count)) * step
+    #end for
+#end get_time_range_chunks
+
+simulation_fields = ("time", "altitude", "azimuth", "radiation", "shade")
+
+def get_simulation_dtype(shade_dtype = int):
+    "returns the NumPy structured dtype of the simulate_span_array() results, with" \
+    " fields simulation_fields, for a horizon with elements of type shade_dtype."
+    return \
+        np.dtype \
+          (
+            [
+                ("time", "datetime64[us]"),
+                ("altitude", float),
+                ("azimuth", float),
+                ("radiation", float),
+                ("shade", shade_dtype),
+            ]
+          )
+#end get_simulation_dtype
+
+def simulate_ephemeris(latitude_deg, longitude_deg, horizon, times, ephemeris, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure):
+    "the common part of simulate_span_array() and its streaming and parallel" \
+    " variants: returns the simulation results for an array of numpy.datetime64 times" \
+    " whose SolarEphemeris has already been computed."
+    sites = (latitude_deg, longitude_deg, elevation, temperature, pressure)
+    if all(np.ndim(x) == 0 for x in sites) :
+        position = ephemeris.topocentric(latitude_deg, longitude_deg, elevation, temperature, pressure)
+    else :
+        position = ephemeris.topocentric_matrix(latitude_deg, longitude_deg, elevation, temperature, pressure)
+    #end if
+    alt, azi = position.altitude, position.azimuth
+    horizon = np.asarray(horizon)
+    index = np.rint(azi).astype(np.int64) % horizon.shape[-1] # same entries as negative indexes into a list
+    if horizon.ndim == 1 :
+        shade = horizon[index]
+    else :
+        shade = np.take_along_axis(horizon, index, axis = -1)
+    #end if
+    alt_zero = 380
+    shaded = shade < alt_zero - np.rint(alt_zero * np.sin(np.radians(alt)))
+    instants = time.Instants(time.get_timestamps(times), ephemeris.jd, ephemeris.jde)
+    result = np.empty(alt.shape, dtype = get_simulation_dtype(shade.dtype))
+    result["time"] = times
+    result["altitude"] = alt
+    result["azimuth"] = azi
+    result["radiation"] = np.where(shaded, 0.0, get_radiation_direct(instants, alt))
+    result["shade"] = shade
+    return \
+        result
+#end simulate_ephemeris
+
+def simulate_span_array(latitude_deg, longitude_deg, horizon, start_datetime, end_datetime, step_minutes, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full"):
+    """columnar version of simulate.simulate_span(): computes the whole span in one
+    vectorized pass, including the horizon mask and direct radiation, and returns a
+    NumPy structured array with the fields in simulation_fields (time as
+    numpy.datetime64 in UTC) instead of yielding a tuple per step.
+
+    For one site the result has one element per step. The site arguments may instead
+    be vectors of length N, with horizon either one profile shared by all sites or an
+    (N, 360) array of profiles; the result is then an (N, steps) array. For spans too
+    long to hold in memory at once, use simulate_span_chunks()."""
+    times = get_time_range(start_datetime, end_datetime, step_minutes)
+    return \
+        simulate_ephemeris(latitude_deg, longitude_deg, horizon, times, SolarEphemeris(times, precision), elevation, temperature, pressure)
+#end simulate_span_array
+
+def simulate_span_chunks(latitude_deg, longitude_deg, horizon, start_datetime, end_datetime, step_minutes, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure, precision = "full", chunk_size = default_chunk_size):
+    """streaming version of simulate_span_array(): yields its result in successive
+    blocks of at most chunk_size steps (along the last axis, for several sites), so
+    that memory use depends only on chunk_size and not on the length of the span.
+    Concatenating the blocks gives the same array as simulate_span_array()."""
+    for times in get_time_range_chunks(start_datetime, end_datetime, step_minutes, chunk_size) :
+        yield simulate_ephemeris(latitude_deg, longitude_deg, horizon, times, SolarEphemeris(times, precision), elevation, temperature, pressure)
+    #end for
+#end simulate_span_chunks
+
+def simulate_span(latitude_deg, longitude_deg, horizon, start_datetime, end_datetime, step_minutes, elevation = 0, temperature = constants.standard_temperature, pressure = constants.standard_pressure):
+    '''drop-in replacement for simulate.simulate_span() that computes the whole span
+    with simulate_span_array() before yielding the same tuples.'''
+    times = simulate.datetime_range(start_datetime, end_datetime, step_minutes)
+    result = simulate_span_array(latitude_deg, longitude_deg, horizon, start_datetime, end_datetime, step_minutes, elevation, temperature, pressure)
+    for when, alt, azi, rad, shade in zip(times, *(result[field].tolist() for field in simulation_fields[1:])) :
+        yield when, alt, azi, rad, shade
+    #end for
+#end simulate_span
@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+"""Writes the fixtures that testrest.py checks pysolar.rest against.
+
+rest2_regression.csv holds the broadband irradiance components computed by the
+scalar REST2 functions in pysolar.rest for a spread of solar altitudes and
+atmospheres. It checks that the array versions agree with the scalar ones, and
+catches unintended changes to either, but being derived from this code it says
+nothing about whether the formulas themselves are right.
+
+rest2_reference.csv holds the direct normal, diffuse horizontal and global
+horizontal irradiance from an independent implementation of REST2: NREL's
+nrel-rest2 package, version 1.0.2 (https://pypi.org/project/nrel-rest2/, NREL
+software record SWR-23-96, as used for the National Solar Radiation Database),
+function rest2.rest2(). Writing it needs that package installed (pip install
+nrel-rest2==1.0.2); nothing else here depends on it. That code follows a later
+revision of Gueymard's model (v9) than the 2008 paper pysolar.rest follows, so the
+two are not expected to agree exactly: v9 adds a correction to the aerosol optical
+depth of the direct beam, splits the extraterrestrial irradiance between the bands
+slightly differently, and has a new algorithm for the diffuse irradiance. It is
+given inputs as close as it allows to the assumptions of pysolar.rest: ground
+albedo 0.15; aerosol single-scattering albedo 0.89, which it turns into 0.92 and
+0.87 for the two bands (against 0.92 and 0.84 here); aerosol asymmetry 0.7; mean
+sun-earth distance. It has no input for nitrogen dioxide, so the nitrogen column
+is always the default of pysolar.rest, 0.0002 atm-cm. Solar zeniths go up to 75
+degrees, beyond which the two revisions diverge more.
+
+The 2008 paper publishes validation statistics against measurements rather than
+individual model outputs, so it has no cases to reproduce here.
+
+"""
+import csv
+import os
+import random
+from pysolar import rest
+
+fields = \
+    (
+        "altitude", "pressure", "ozone", "nitrogen", "water", "alpha", "beta",
+        "direct_normal", "beam", "diffuse", "backscattered", "global_horizontal",
+    )
+
+reference_fields = \
+    (
+        "altitude", "pressure", "ozone", "nitrogen", "water", "alpha", "beta",
+        "direct_normal", "diffuse_horizontal", "global_horizontal",
+    )
+
+def get_atmosphere() :
+    # a random atmosphere, as arguments to the functions in pysolar.rest
+    return \
+        (
+            random.uniform(700, 1050), # pressure, millibars
+            random.uniform(0.2, 0.45), # ozone, atm-cm
+            random.uniform(0.0001, 0.003), # nitrogen dioxide, atm-cm
+            random.uniform(0.1, 6.0), # precipitable water, cm
+            random.uniform(0.3, 2.2), # Angstrom alpha
+            random.uniform(0.0, 0.5), # Angstrom beta
+        )
+#end get_atmosphere
+
+def write_regression() :
+    random.seed(2008)
+    with open(os.path.join(os.path.dirname(__file__), "rest2_regression.csv"), "w", newline = "") as out :
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        for i in range(60) :
+            atmosphere = get_atmosphere()
+            altitude = random.uniform(0.5, 90)
+            values = \
+                (
+                    rest.get_broadband_direct_normal_irradiance(altitude, *atmosphere),
+                    rest.get_beam_broadband_irradiance(altitude, *atmosphere),
+                    rest.get_diffuse_broadband_irradiance(altitude, *atmosphere),
+                    rest.get_backscattered_diffuse_broadband_irradiance(altitude, *atmosphere),
+                    rest.get_global_broadband_irradiance(altitude, *atmosphere),
+                )
+            writer.writerow(tuple(repr(x) for x in (altitude,) + atmosphere + values))
+        #end for
+    #end with
+#end write_regression
+
+def write_reference() :
+    import numpy as np
+    from rest2.rest2 import rest2 # from nrel-rest2 1.0.2
+    random.seed(2007)
+    with open(os.path.join(os.path.dirname(__file__), "rest2_reference.csv"), "w", newline = "") as out :
+        writer = csv.writer(out)
+        writer.writerow(reference_fields)
+        for i in range(80) :
+            pressure, ozone, nitrogen, water, alpha, beta = get_atmosphere()
+            beta = max(beta, 0.01) # the least it allows is 0.001
+            atmosphere = (pressure, ozone, 0.0002, water, alpha, beta)
+            altitude = random.uniform(15, 90)
+            inputs = dict \
+              (
+                p = pressure,
+                albedo = 0.15,
+                ssa = 0.89,
+                g = 0.7,
+                z = 90 - altitude,
+                radius = 1.0,
+                alpha = alpha,
+                beta = beta,
+                ozone = ozone,
+                w = water,
+              )
+            result = rest2(**dict((k, np.array([v])) for k, v in inputs.items()))
+            values = (result.dni[0], result.dhi[0], result.ghi[0])
+            writer.writerow(tuple(repr(float(x)) for x in (altitude,) + atmosphere + values))
+        #end for
+    #end with
+#end write_reference
+
+def main() :
+    write_regression()
+    write_reference()
+#end main
+
+if __name__ == "__main__" :
+    main()
+#end if
@@ -87,10 +87,9 @@ def RequestEphemerisData(datum):
     return result
 
 def ComparePysolarToUSNO(datum):
-    alt = get_altitude(float(datum.latitude), float(datum.longitude), datum.timestamp, datum.elevation)
-    pysolar_alt = (90.0 - alt)
-    az = get_azimuth(float(datum.latitude), float(datum.longitude), datum.timestamp, datum.elevation)
-    pysolar_az = (180.0 - az)%360.0
+    position = get_position(float(datum.latitude), float(datum.longitude), datum.timestamp, datum.elevation)
+    pysolar_alt = (90.0 - position.altitude)
+    pysolar_az = (180.0 - position.azimuth)%360.0
 
 #   print(pysolar_alt)
 #   print(pysolar_az)
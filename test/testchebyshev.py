@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	chebyshev, \
+	vectorized
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+class testChebyshev(unittest.TestCase):
+
+	def setUp(self):
+		self.start = datetime.datetime(2010, 11, 20, tzinfo = datetime.timezone.utc)
+		self.end = datetime.datetime(2011, 3, 1, tzinfo = datetime.timezone.utc)
+		self.ephemeris = chebyshev.ChebyshevEphemeris.build(self.start, self.end)
+		rng = np.random.default_rng(18)
+		self.times = np.datetime64("2010-11-20T00:00:00", "us") + np.sort(rng.integers(0, 101 * 86400 * 10 ** 6, 1000)).astype("timedelta64[us]")
+
+	def test_accuracy(self):
+		fitted = self.ephemeris.get_ephemeris(self.times)
+		expected = vectorized.SolarEphemeris(self.times)
+		for name in ("right_ascension", "declination", "apparent_sidereal_time", "equation_of_time") :
+			difference = (getattr(fitted, name) - getattr(expected, name) + 180) % 360 - 180
+			self.assertLess(np.abs(difference).max(), 1e-8, name)
+		np.testing.assert_allclose(fitted.sun_earth_distance, expected.sun_earth_distance, rtol = 0, atol = 1e-12)
+		np.testing.assert_array_equal(fitted.jd, expected.jd)
+		position = self.ephemeris.get_position(42.364908, -71.112828, self.times, 100.0)
+		np.testing.assert_allclose(position.altitude, vectorized.get_altitude(42.364908, -71.112828, self.times, 100.0), rtol = 0, atol = 1e-8)
+		matrix = fitted.topocentric_matrix(np.array([42.364908, -33.9]), np.array([-71.112828, 151.2]))
+		self.assertEqual((2, 1000), matrix.altitude.shape)
+
+	def test_span(self):
+		self.assertEqual(13, len(self.ephemeris.segments))
+		self.assertEqual(self.ephemeris.start_jde, np.floor(self.ephemeris.start_jde) + 0.5)
+		self.assertRaises(ValueError, self.ephemeris.get_ephemeris, np.array(["2010-11-19T23:00"], dtype = "datetime64[s]"))
+		self.assertRaises(ValueError, self.ephemeris.get_ephemeris, np.array(["2011-03-20T00:00"], dtype = "datetime64[s]"))
+		self.assertRaises(ValueError, chebyshev.ChebyshevEphemeris.build, self.start, self.end, precision = "fast")
+
+	def test_save_load(self):
+		directory = tempfile.mkdtemp()
+		try:
+			filename = os.path.join(directory, "ephemeris.npy")
+			self.ephemeris.save(filename)
+			loaded = chebyshev.ChebyshevEphemeris.load(filename)
+			self.assertIsInstance(loaded.segments, np.memmap)
+			self.assertEqual(self.ephemeris.days_per_segment, loaded.days_per_segment)
+			self.assertEqual("full", loaded.precision)
+			np.testing.assert_array_equal(self.ephemeris.get_ephemeris(self.times).declination, loaded.get_ephemeris(self.times).declination)
+			del loaded
+		finally:
+			shutil.rmtree(directory)
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testChebyshev)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
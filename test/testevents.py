@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	events, \
+	vectorized
+import datetime
+import unittest
+import numpy as np
+
+class testEvents(unittest.TestCase):
+
+	def setUp(self):
+		self.latitudes = np.array([39.742476, -33.9, 0.5, 66.0, 78.2])
+		self.longitudes = np.array([-105.1786, 151.2, 36.8, 25.0, 15.6])
+		self.dates = np.arange(np.datetime64("2011-03-01"), np.datetime64("2011-10-01"))
+		self.events = events.get_event_timestamps(self.latitudes, self.longitudes, self.dates)
+
+	def test_spa_example(self):
+		# Reda and Andreas (2005), table A4.1
+		tz = datetime.timezone(datetime.timedelta(hours = -7))
+		result = events.get_events(39.742476, -105.1786, datetime.datetime(2003, 10, 17, 12, 30, 30, tzinfo = tz))
+		self.assertEqual(tz, result.sunrise.tzinfo)
+		self.assertAlmostEqual(0, (result.transit - datetime.datetime(2003, 10, 17, 11, 46, 4, tzinfo = tz)).total_seconds(), delta = 2)
+		self.assertAlmostEqual(0, (result.sunrise - datetime.datetime(2003, 10, 17, 6, 12, 43, tzinfo = tz)).total_seconds(), delta = 2)
+		sunrise, sunset = events.get_sunrise_sunset(39.742476, -105.1786, datetime.datetime(2003, 10, 17, 12, 30, 30, tzinfo = tz))
+		self.assertEqual((result.sunrise, result.sunset), (sunrise, sunset))
+
+	def test_altitudes(self):
+		self.assertEqual((5, len(self.dates)), self.events.transit.shape)
+		position = vectorized.get_position(self.latitudes[:, np.newaxis], self.longitudes[:, np.newaxis], self.events.transit)
+		self.assertLess(np.abs((position.hour_angle + 180) % 360 - 180).max(), 0.01)
+		for name, altitude in zip(events.SolarEvents._fields[1:], np.repeat(events.event_altitudes, 2)):
+			when = getattr(self.events, name)
+			happens = ~np.isnan(when)
+			position = vectorized.get_position(self.latitudes[:, np.newaxis], self.longitudes[:, np.newaxis], np.where(happens, when, 0))
+			error = (position.altitude - position.refraction_correction - altitude)[happens]
+			self.assertLess(np.abs(error).max(), 0.01, name) # mostly the difference between geocentric and topocentric
+
+	def test_polar(self):
+		self.assertFalse(np.isnan(self.events.transit).any())
+		polar_day = self.dates == np.datetime64("2011-06-21")
+		self.assertTrue(np.isnan(self.events.sunrise[3:, polar_day]).all())
+		self.assertTrue(np.isnan(self.events.sunset[3:, polar_day]).all())
+		self.assertFalse(np.isnan(self.events.sunrise[:3]).any())
+		result = events.get_events(78.2, 15.6, datetime.datetime(2011, 12, 21, tzinfo = datetime.timezone.utc))
+		self.assertNotEqual(None, result.transit)
+		self.assertEqual((None,) * 4, result[1:5]) # the sun is 11.6 degrees down at noon
+		self.assertNotIn(None, result[5:])
+
+	def test_order(self):
+		order = (7, 5, 3, 1, 0, 2, 4, 6, 8) # dawns, transit, then dusks
+		values = np.stack(list(self.events[i][:3] for i in order))
+		self.assertTrue((np.diff(values, axis = 0) > 0).all())
+		# each day starts at local mean midnight, unless told otherwise
+		day_start = vectorized.time.get_timestamps(self.dates) - self.longitudes[:, np.newaxis] / 15 * 3600
+		self.assertTrue(((self.events.transit >= day_start) & (self.events.transit < day_start + 86400)).all())
+		sydney = events.get_event_timestamps(-33.9, 151.2, self.dates, utc_offset = 10)
+		np.testing.assert_allclose(self.events.sunrise[1], sydney.sunrise, rtol = 0, atol = 1e-3)
+
+	def test_sunrise_sunset_array(self):
+		result = events.get_sunrise_sunset_array(self.latitudes, self.longitudes, self.dates[0], self.dates[-1] + 1, unit = "ms")
+		self.assertEqual(np.dtype("datetime64[ms]"), result.sunrise.dtype)
+		self.assertEqual((5, len(self.dates)), result.sunset.shape)
+		for name in ("sunrise", "sunset") :
+			expected = getattr(self.events, name)
+			np.testing.assert_array_equal(np.isnan(expected), np.isnat(getattr(result, name)))
+			happens = ~np.isnan(expected)
+			np.testing.assert_allclose(vectorized.time.get_timestamps(getattr(result, name)[happens]), expected[happens], rtol = 0, atol = 1e-3)
+		# on the first and last days of polar day, the sun may rise without setting or the reverse
+		np.testing.assert_array_equal(np.isnat(result.sunrise) & np.isnat(result.sunset), result.polar_day | result.polar_night)
+		midsummer = self.dates == np.datetime64("2011-06-21")
+		self.assertEqual([False, False, False, True, True], list(result.polar_day[:, midsummer].ravel()))
+		self.assertFalse(result.polar_night.any())
+		winter = events.get_sunrise_sunset_array([78.2, -78.2], 15.6, datetime.date(2011, 12, 21), datetime.date(2011, 12, 22))
+		self.assertEqual([[False], [True]], winter.polar_day.tolist())
+		self.assertEqual([[True], [False]], winter.polar_night.tolist())
+		self.assertRaises(ValueError, events.get_sunrise_sunset_array, 0.0, 0.0, self.dates[1], self.dates[0])
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testEvents)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	lookup, \
+	solar, \
+	vectorized
+import datetime
+import os
+import tempfile
+import unittest
+import numpy as np
+
+class testLookup(unittest.TestCase):
+
+	def setUp(self):
+		self.latitudes = np.array([42.364908, -33.9, 0.5, 78.2])
+		self.longitudes = np.array([-71.112828, 151.2, 36.8, 15.6])
+		self.start = datetime.datetime(2011, 6, 1, tzinfo = datetime.timezone.utc)
+		self.end = datetime.datetime(2011, 6, 11, tzinfo = datetime.timezone.utc)
+		self.table = lookup.SiteTable.build(self.latitudes, self.longitudes, self.start, self.end, elevation = 100.0)
+		rng = np.random.default_rng(17)
+		self.times = np.datetime64("2011-06-01T00:00:00", "us") + np.sort(rng.integers(0, 10 * 86400 * 10 ** 6, 500)).astype("timedelta64[us]")
+
+	def test_error_bound(self):
+		self.assertLess(self.table.max_error, 1e-6)
+		position = self.table.get_position(self.times)
+		expected = vectorized.get_position_matrix(self.latitudes, self.longitudes, self.times, elevation = 100.0)
+		self.assertEqual((4, 500), position.altitude.shape)
+		self.assertLess(np.abs(position.altitude - expected.altitude).max(), 1.1 * self.table.max_error)
+		azimuth_error = np.abs((position.azimuth - expected.azimuth + 180) % 360 - 180) * np.cos(np.radians(expected.altitude))
+		self.assertLess(azimuth_error.max(), 1.1 * self.table.max_error)
+		ephemeris = vectorized.SolarEphemeris(self.times)
+		np.testing.assert_allclose(position.declination, ephemeris.declination, rtol = 0, atol = 1e-7)
+		np.testing.assert_allclose(position.equation_of_time, ephemeris.equation_of_time, rtol = 0, atol = 1e-6)
+		when = datetime.datetime(2011, 6, 3, 15, 37, 12, tzinfo = datetime.timezone.utc)
+		self.assertAlmostEqual(solar.get_altitude(self.latitudes[0], self.longitudes[0], when, 100.0), self.table.get_altitude([when], 0)[0], 6)
+		self.assertAlmostEqual(solar.get_azimuth(self.latitudes[0], self.longitudes[0], when, 100.0), self.table.get_azimuth([when], 0)[0], 6)
+
+	def test_span(self):
+		edges = np.array(["2011-06-01T00:00", "2011-06-11T00:00"], dtype = "datetime64[us]")
+		np.testing.assert_allclose(self.table.get_altitude(edges), vectorized.get_position_matrix(self.latitudes, self.longitudes, edges, elevation = 100.0).altitude, rtol = 0, atol = 1e-6)
+		self.assertRaises(ValueError, self.table.get_position, np.array(["2011-06-11T00:00:01"], dtype = "datetime64[s]"))
+		self.assertRaises(ValueError, lookup.SiteTable.build, 0.0, 0.0, self.start, self.end, step_minutes = 240, tolerance = 1e-6)
+
+	def test_save_load(self):
+		with tempfile.TemporaryDirectory() as directory:
+			filename = os.path.join(directory, "table.npz")
+			self.table.save(filename)
+			table = lookup.SiteTable.load(filename)
+		self.assertEqual(self.table.start_jd, table.start_jd)
+		self.assertEqual(self.table.step_days, table.step_days)
+		self.assertEqual(self.table.max_error, table.max_error)
+		self.assertEqual("full", table.precision)
+		np.testing.assert_array_equal(self.table.pressure, table.pressure)
+		for field in lookup.LookupPosition._fields:
+			np.testing.assert_array_equal(getattr(self.table.get_position(self.times), field), getattr(table.get_position(self.times), field))
+
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testLookup)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	output, \
+	vectorized
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+class testOutput(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.filename = os.path.join(self.directory, "span.npy")
+		self.latitudes = np.array([42.0, -33.9, 64.1])
+		self.longitudes = np.array([-70.0, 151.2, -21.9])
+		self.horizon = [(i * 7) % 380 for i in range(360)]
+		self.start = datetime.datetime(2010, 12, 30, tzinfo = datetime.timezone.utc)
+		self.end = self.start + datetime.timedelta(days = 3)
+		self.expected = vectorized.simulate_span_array(self.latitudes, self.longitudes, self.horizon, self.start, self.end, 10)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_write_span(self):
+		result = output.write_span(self.filename, self.latitudes, self.longitudes, self.horizon, self.start, self.end, 10, chunk_size = 100)
+		self.assertIsInstance(result, np.memmap)
+		np.testing.assert_array_equal(self.expected, result)
+		np.testing.assert_array_equal(self.expected, np.load(self.filename))
+		self.assertTrue(output.is_complete(self.filename))
+		single = output.write_span(self.filename, 42.0, -70.0, self.horizon, self.start, self.end, 10, resume = False)
+		np.testing.assert_array_equal(self.expected[0], single)
+
+	def test_resume(self):
+		output.write_span(self.filename, self.latitudes, self.longitudes, self.horizon, self.start, self.end, 10, chunk_size = 100)
+		# pretend the run stopped after the second chunk, leaving a mark in the rest of the file
+		with open(output.get_progress_filename(self.filename)) as data:
+			progress = json.load(data)
+		progress["steps_done"] = 200
+		with open(output.get_progress_filename(self.filename), "w") as out:
+			json.dump(progress, out)
+		partial = output.open_span(self.filename, mode = "r+")
+		partial["altitude"][:, 150:] = -1000
+		del partial
+		self.assertFalse(output.is_complete(self.filename))
+		result = output.write_span(self.filename, self.latitudes, self.longitudes, self.horizon, self.start, self.end, 10, chunk_size = 100)
+		np.testing.assert_array_equal(-1000, result["altitude"][:, 150:200]) # not rewritten
+		np.testing.assert_array_equal(self.expected[:, 200:], result[:, 200:])
+		self.assertTrue(output.is_complete(self.filename))
+		# so do different sites of the same shape, or a different precision, even if unfinished
+		for latitudes, precision in ((self.latitudes + 1, "full"), (self.latitudes + 1, "reduced")) :
+			with open(output.get_progress_filename(self.filename)) as data:
+				progress = json.load(data)
+			progress["steps_done"] = 200
+			with open(output.get_progress_filename(self.filename), "w") as out:
+				json.dump(progress, out)
+			result = output.write_span(self.filename, latitudes, self.longitudes, self.horizon, self.start, self.end, 10, precision = precision, chunk_size = 100)
+			np.testing.assert_array_equal(vectorized.simulate_span_array(latitudes, self.longitudes, self.horizon, self.start, self.end, 10, precision = precision), result)
+		# a different span starts afresh
+		result = output.write_span(self.filename, self.latitudes, self.longitudes, self.horizon, self.start, self.end, 30)
+		np.testing.assert_array_equal(self.expected[:, ::3], result)
+
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testOutput)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	output, \
+	parallel, \
+	vectorized
+import datetime
+import os
+import tempfile
+import unittest
+import numpy as np
+
+class testParallel(unittest.TestCase):
+
+	def setUp(self):
+		self.latitudes = np.linspace(-60.0, 70.0, 11)
+		self.longitudes = np.linspace(-170.0, 170.0, 11)
+		self.horizons = np.array([[(i * (7 + site)) % 380 for i in range(360)] for site in range(11)])
+		self.start = datetime.datetime(2012, 3, 1, tzinfo = datetime.timezone.utc)
+		self.end = self.start + datetime.timedelta(days = 2)
+		self.expected = vectorized.simulate_span_array(self.latitudes, self.longitudes, self.horizons, self.start, self.end, 10)
+
+	def test_simulate_sites(self):
+		for processes in (1, 2):
+			calls = []
+			result = parallel.simulate_sites \
+			  (
+				self.latitudes, self.longitudes, self.horizons, self.start, self.end, 10,
+				processes = processes, steps_per_task = 50, sites_per_task = 4,
+				progress = lambda done, total: calls.append((done, total))
+			  )
+			np.testing.assert_array_equal(self.expected, result)
+			self.assertEqual([(i, 18) for i in range(1, 19)], calls) # 3 blocks of sites by 6 of steps
+
+	def test_shared_horizon(self):
+		result = parallel.simulate_sites(self.latitudes, self.longitudes, self.horizons[0], self.start, self.end, 10, elevation = 100.0, processes = 1)
+		expected = vectorized.simulate_span_array(self.latitudes, self.longitudes, self.horizons[0], self.start, self.end, 10, elevation = 100.0)
+		np.testing.assert_array_equal(expected, result)
+		self.assertRaises(ValueError, parallel.simulate_sites, 42.0, -70.0, self.horizons[0], self.start, self.end, 10)
+
+	def test_invalid_arguments(self):
+		for steps_per_task, sites_per_task, processes in ((0, None, 1), (0, 4, 1), (50, 0, 1), (50, None, 0)) :
+			self.assertRaises(ValueError, parallel.simulate_sites, self.latitudes, self.longitudes, self.horizons, self.start, self.end, 10, processes = processes, steps_per_task = steps_per_task, sites_per_task = sites_per_task)
+		# a horizon profile for each site, but not the right number of them
+		self.assertRaises(ValueError, parallel.simulate_sites, self.latitudes, self.longitudes, self.horizons[:-1], self.start, self.end, 10, processes = 1)
+
+	def test_filename(self):
+		with tempfile.TemporaryDirectory() as directory:
+			filename = os.path.join(directory, "sites.npy")
+			result = parallel.simulate_sites(self.latitudes, self.longitudes, self.horizons, self.start, self.end, 10, processes = 2, steps_per_task = 100, filename = filename)
+			self.assertIsInstance(result, np.memmap)
+			np.testing.assert_array_equal(self.expected, result)
+			del result
+			np.testing.assert_array_equal(self.expected, output.open_span(filename))
+
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testParallel)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
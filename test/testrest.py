@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	rest, \
+	vectorized
+import os
+import unittest
+import numpy as np
+
+class testRest(unittest.TestCase):
+
+	def setUp(self):
+		self.altitudes = np.linspace(2, 90, 45)
+		self.water = np.linspace(0.2, 5, 45)
+		self.beta = np.linspace(0.01, 0.4, 45)
+
+	def test_optical_masses(self):
+		masses = rest.get_optical_masses(np.array([90.0, 30.0]), 900.0)
+		self.assertAlmostEqual(1, masses.ozone[0], 3)
+		self.assertAlmostEqual(900.0 / rest.standard_pressure_millibars, masses.rayleigh[0], 3)
+		for mass in masses :
+			# about sec Z at 60 degrees from the zenith. The ozone layer, some 22 km up, is seen
+			# at a smaller zenith angle than the sun is from the ground, which brings its ratio
+			# down to about 1.988; the others are within 0.006 of 2.
+			self.assertAlmostEqual(2, mass[1] / mass[0], delta = 0.02)
+		self.assertEqual(rest.get_optical_mass_water(30.0), masses.water[1])
+		self.assertEqual(rest.get_optical_mass_rayleigh(30.0, 900.0), masses.rayleigh[1])
+
+	def test_direct_normal_irradiance(self):
+		result = rest.get_direct_normal_irradiance_array(self.altitudes, 950.0, 0.3, 0.0002, self.water, 1.1, self.beta)
+		self.assertEqual((2, 45), result.shape)
+		for i, band in enumerate(rest.bands) :
+			expected = [rest.get_direct_normal_irradiance_by_band(band, a, 950.0, 0.3, 0.0002, w, 1.1, b) for a, w, b in zip(self.altitudes, self.water, self.beta)]
+			np.testing.assert_allclose(result[i], expected, rtol = 1e-12)
+		np.testing.assert_allclose(rest.get_broadband_direct_normal_irradiance_array(self.altitudes), [rest.get_broadband_direct_normal_irradiance(a) for a in self.altitudes], rtol = 1e-12)
+		np.testing.assert_allclose(rest.get_beam_irradiance_array(self.altitudes)[1], [rest.get_beam_irradiance_by_band("low-frequency", a) for a in self.altitudes], rtol = 1e-12)
+		# a clean, dry atmosphere lets most of the sunlight through
+		self.assertTrue(900 < rest.get_broadband_direct_normal_irradiance_array(90.0, precipitable_water_cm = 1.0, turbidity_beta = 0.05) < 1000)
+		# atmospheric arguments broadcast against the altitudes
+		grid = rest.get_direct_normal_irradiance_array(np.full((3, 4), 40.0), precipitable_water_cm = np.array([0.5, 1.0, 2.0, 4.0]))
+		self.assertEqual((2, 3, 4), grid.shape)
+		self.assertTrue((np.diff(grid, axis = -1) < 0).all())
+
+	def test_atmosphere_state(self):
+		state = rest.AtmosphereState(950.0, 0.3, 0.0002, 1.4, 1.1, 0.1)
+		for i, band in enumerate(rest.bands) :
+			self.assertAlmostEqual(rest.get_sky_albedo(band, 1.1, 0.1), state.sky_albedo[i], 12)
+			masses = state.get_optical_masses(40.0)
+			self.assertAlmostEqual(rest.get_effective_aerosol_wavelength(band, masses.aerosol, 1.1, 0.1), state.get_effective_aerosol_wavelength(masses.aerosol)[i], 12)
+		np.testing.assert_array_equal(state.get_direct_normal_irradiance(self.altitudes), rest.get_direct_normal_irradiance_array(self.altitudes, 950.0, 0.3, 0.0002, 1.4, 1.1, 0.1))
+		# hourly atmospheres, each applied to a row of per-minute altitudes
+		hourly = rest.AtmosphereState(precipitable_water_cm = np.array([[0.5], [1.5], [3.0]]), turbidity_beta = np.array([[0.05], [0.1], [0.2]]))
+		altitudes = np.linspace(10, 70, 180).reshape(3, 60)
+		result = hourly.get_direct_normal_irradiance(altitudes, hourly.get_optical_masses(altitudes))
+		self.assertEqual((2, 3, 60), result.shape)
+		np.testing.assert_allclose(result[:, 1], rest.get_direct_normal_irradiance_array(altitudes[1], precipitable_water_cm = 1.5, turbidity_beta = 0.1), rtol = 1e-12)
+
+	def test_clear_sky_irradiance(self):
+		fixture = np.genfromtxt(os.path.join(os.path.dirname(__file__), "rest2_regression.csv"), delimiter = ",", names = True)
+		state = rest.AtmosphereState(*(fixture[name] for name in ("pressure", "ozone", "nitrogen", "water", "alpha", "beta")))
+		by_band = rest.get_clear_sky_irradiance(fixture["altitude"], state)
+		self.assertEqual((2, len(fixture)), by_band.global_horizontal.shape)
+		result = rest.sum_bands(by_band)
+		for name in ("direct_normal", "beam", "diffuse", "backscattered", "global_horizontal") :
+			np.testing.assert_allclose(getattr(result, name), fixture[name], rtol = 1e-10, err_msg = name)
+		np.testing.assert_allclose(result.global_horizontal, result.beam + result.diffuse_horizontal, rtol = 1e-12)
+		np.testing.assert_allclose(result.beam, result.direct_normal * np.sin(np.radians(fixture["altitude"])), rtol = 1e-12)
+		np.testing.assert_allclose(by_band.direct_normal, state.get_direct_normal_irradiance(fixture["altitude"]), rtol = 1e-12)
+		# nothing at night, and less the further the sun is from the earth
+		result = rest.sum_bands(rest.get_clear_sky_irradiance(np.array([-10.0, 0.0, 30.0]), sun_earth_distance = np.array([1.0, 1.0, 1.0167])))
+		np.testing.assert_array_equal(result.global_horizontal[:2], 0)
+		self.assertAlmostEqual(rest.get_global_broadband_irradiance(30.0) / 1.0167 ** 2, result.global_horizontal[2], 9)
+
+	def test_independent_reference(self):
+		# against NREL's independent implementation of REST2 (see make_rest2_regression.py).
+		# It follows a later revision of the model, so the bounds allow for the differences
+		# between revisions, which are largest for the diffuse under very clean or very
+		# turbid skies; mistakes such as a missing cos Z or a wrong optical mass would take
+		# whole components far outside them.
+		reference = np.genfromtxt(os.path.join(os.path.dirname(__file__), "rest2_reference.csv"), delimiter = ",", names = True)
+		state = rest.AtmosphereState(*(reference[name] for name in ("pressure", "ozone", "nitrogen", "water", "alpha", "beta")))
+		result = rest.sum_bands(rest.get_clear_sky_irradiance(reference["altitude"], state))
+		bounds = (("direct_normal", 0.02, 0.15), ("diffuse_horizontal", 0.05, 0.2), ("global_horizontal", 0.025, 0.08)) # relative: median, worst
+		for name, median, worst in bounds :
+			error = np.abs(getattr(result, name) / reference[name] - 1)
+			self.assertLess(np.median(error), median, name)
+			self.assertLess(error.max(), worst, name)
+
+	def test_clear_sky_irradiance_from_position(self):
+		times = np.datetime64("2015-06-21T00:00") + np.arange(48) * np.timedelta64(30, "m")
+		latitudes, longitudes = np.array([[40.0], [-33.9]]), np.array([[-105.3], [151.2]])
+		atmosphere = rest.AtmosphereState(precipitable_water_cm = 1.5, turbidity_beta = 0.08)
+		result = vectorized.get_clear_sky_irradiance(latitudes, longitudes, times, atmosphere)
+		self.assertEqual((2, 2, 48), result.global_horizontal.shape)
+		position = vectorized.get_position(latitudes, longitudes, times)
+		expected = rest.get_clear_sky_irradiance(position.altitude, atmosphere, position.sun_earth_distance)
+		for name in rest.ClearSkyIrradiance._fields :
+			np.testing.assert_array_equal(getattr(result, name), getattr(expected, name))
+		broadband = rest.sum_bands(result).global_horizontal
+		np.testing.assert_array_equal(broadband == 0, position.altitude <= 0)
+		self.assertTrue(900 < broadband[0].max() < 1100) # near midsummer noon in Colorado
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testRest)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
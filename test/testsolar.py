@@ -20,12 +20,17 @@
 #    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
 
 from pysolar import \
+	cache, \
 	solar, \
 	constants, \
 	time, \
 	elevation
 import datetime
+import os
+import tempfile
 import unittest
+import warnings
+import numpy as np
 
 class testSolar(unittest.TestCase):
 
@@ -74,8 +79,85 @@ class testSolar(unittest.TestCase):
   
 	def test_timestamp(self):
 		no_tzinfo = datetime.datetime(2003, 10, 17, 19, 30, 30, tzinfo=None)
-		print('d', time.timestamp(self.d))
-		print('no tzinfo', time.timestamp(no_tzinfo))
+		utc = datetime.datetime(2003, 10, 17, 19, 30, 30, tzinfo=datetime.timezone.utc)
+		eastern = utc.astimezone(datetime.timezone(datetime.timedelta(hours = -5)))
+		self.assertEqual(1066419030.0, time.timestamp(utc))
+		self.assertEqual(1066419030.0, time.timestamp(eastern))
+		self.assertEqual(1066419030.0, time.timestamp(no_tzinfo)) # naive datetimes are UTC
+		self.assertEqual(self.d.timestamp(), time.timestamp(self.d))
+
+	def test_get_timestamps(self):
+		whens = [self.d, self.d + datetime.timedelta(days = 400, microseconds = 250)]
+		expected = [time.timestamp(w) for w in whens]
+		self.assertEqual(expected, time.get_timestamps(whens).tolist())
+		self.assertEqual(expected, time.get_timestamps(np.array([np.datetime64(w.replace(tzinfo = None)) for w in whens])).tolist())
+		converted = time.get_datetime64(expected + [np.nan], "us")
+		self.assertEqual([np.datetime64(w.replace(tzinfo = None), "us") for w in whens], list(converted[:2]))
+		self.assertTrue(np.isnat(converted[2]))
+
+	def test_leap_seconds_and_delta_t(self):
+		utc = datetime.timezone.utc
+		self.assertEqual(10, time.get_leap_seconds(datetime.datetime(1960, 1, 1, tzinfo = utc)))
+		self.assertEqual(10, time.get_leap_seconds(datetime.datetime(1972, 6, 30, tzinfo = utc)))
+		self.assertEqual(11, time.get_leap_seconds(datetime.datetime(1972, 7, 1, tzinfo = utc)))
+		self.assertEqual(32, time.get_leap_seconds(self.d))
+		self.assertEqual(43.4724, time.get_delta_t(datetime.datetime(1950, 1, 1, tzinfo = utc)))
+		self.assertEqual(64.5415, time.get_delta_t(self.d))
+		self.assertEqual(67.3890, time.get_delta_t(datetime.datetime(2014, 4, 30, tzinfo = utc)))
+		self.assertEqual(67.3890, time.get_delta_t(datetime.datetime(2015, 1, 1, tzinfo = utc)))
+		whens = [datetime.datetime(y, m, 15, tzinfo = utc) for y in range(1965, 2016) for m in (1, 6, 7, 12)]
+		timestamps = time.get_timestamps(whens)
+		self.assertEqual([time.get_leap_seconds(w) for w in whens], time.get_leap_seconds_array(timestamps).tolist())
+		self.assertEqual([time.get_delta_t(w) for w in whens], time.get_delta_t_array(timestamps).tolist())
+		self.assertEqual((self.jd, self.jde), time.get_julian_days(self.d))
+		time.load_leap_seconds() # resets the once-only warning
+		with warnings.catch_warnings(record = True) as caught:
+			warnings.simplefilter("always")
+			time.get_leap_seconds(datetime.datetime(2017, 6, 1, tzinfo = utc))
+			self.assertEqual(0, len(caught))
+			time.get_leap_seconds_array(np.array([time.timestamp(datetime.datetime(2017, 7, 1, tzinfo = utc))]))
+			time.get_leap_seconds(datetime.datetime(2020, 1, 1, tzinfo = utc))
+			self.assertEqual(1, len(caught))
+
+	def test_load_tables(self):
+		utc = datetime.timezone.utc
+		with tempfile.TemporaryDirectory() as tmp:
+			leap_dat = os.path.join(tmp, "Leap_Second.dat")
+			with open(leap_dat, "w") as f:
+				f.write("#  File expires on 28 June 2026\n#    MJD        Date        TAI-UTC (s)\n")
+				f.write("    41317.0    1  1 1972       10\n    41499.0    1  7 1972       11\n    57754.0    1  1 2017       37\n")
+			leap_list = os.path.join(tmp, "leap-seconds.list")
+			with open(leap_list, "w") as f:
+				f.write("#@\t3991593600\n2272060800\t10\t# 1 Jan 1972\n2287785600\t11\t# 1 Jul 1972\n3692217600\t37\t# 1 Jan 2017\n")
+			delta_t_data = os.path.join(tmp, "deltat.data")
+			with open(delta_t_data, "w") as f:
+				f.writelines(" %d %2d  1  %.4f\n" % (2020 + m // 12, m % 12 + 1, 69.0 + 0.01 * m) for m in range(24))
+			try:
+				for filename in (leap_dat, leap_list):
+					time.load_leap_seconds(filename)
+					self.assertEqual(10, time.get_leap_seconds(datetime.datetime(1972, 3, 1, tzinfo = utc)))
+					self.assertEqual(11, time.get_leap_seconds(datetime.datetime(2016, 12, 31, tzinfo = utc)))
+					self.assertEqual(37, time.get_leap_seconds(datetime.datetime(2017, 1, 1, tzinfo = utc)))
+					with warnings.catch_warnings(record = True) as caught:
+						warnings.simplefilter("always")
+						time.get_leap_seconds(datetime.datetime(2026, 6, 30, tzinfo = utc))
+						self.assertEqual(0, len(caught))
+						for i in range(3):
+							self.assertEqual(37, time.get_leap_seconds(datetime.datetime(2026, 7, 1, tzinfo = utc)))
+						self.assertEqual(1, len(caught))
+				time.load_delta_t(delta_t_data)
+				self.assertEqual(69.0, time.get_delta_t(datetime.datetime(2019, 1, 1, tzinfo = utc)))
+				self.assertAlmostEqual(69.05, time.get_delta_t(datetime.datetime(2020, 6, 15, tzinfo = utc)), 12)
+				self.assertEqual(69.23, time.get_delta_t(datetime.datetime(2030, 1, 1, tzinfo = utc)))
+				time.load_delta_t(delta_t_data, extrapolate = True)
+				self.assertAlmostEqual(69.36, time.get_delta_t(datetime.datetime(2023, 1, 1, tzinfo = utc)), 12)
+				timestamps = time.get_timestamps([datetime.datetime(y, 1, 1, tzinfo = utc) for y in (2019, 2021, 2023)])
+				np.testing.assert_allclose(time.get_delta_t_array(timestamps), [69.0, 69.12, 69.36], rtol = 0, atol = 1e-12)
+			finally:
+				time.load_leap_seconds()
+				time.load_delta_t()
+		self.assertEqual(37, time.get_leap_seconds(datetime.datetime(2016, 12, 31, tzinfo = utc)))
+		self.assertEqual(67.3890, time.get_delta_t(datetime.datetime(2030, 1, 1, tzinfo = utc)))
 
 	def test_get_julian_solar_day(self):
 		self.assertAlmostEqual(2452930.312847, self.jd, 6) # value from Reda and Andreas (2005)
@@ -101,6 +183,21 @@ class testSolar(unittest.TestCase):
 		self.assertAlmostEqual(0.00166657, self.nutation['obliquity'], 8) # value from Reda and Andreas (2005)
 		self.assertAlmostEqual(-0.00399840, self.nutation['longitude'], 8) # value from Reda and Andreas (2005)
 
+	def test_get_nutation_array(self):
+		jces = np.array([self.jce, -0.5, 0.25])
+		nutation = solar.get_nutation(jces)
+		for i, jce in enumerate(jces):
+			self.assertAlmostEqual(solar.get_nutation(jce).longitude, nutation.longitude[i], 15)
+			self.assertAlmostEqual(solar.get_nutation(jce).obliquity, nutation.obliquity[i], 15)
+
+	def test_get_vsop87_series(self):
+		jmes = np.array([self.jme, -0.3, 0.2])
+		series = solar.get_vsop87_series(jmes)
+		for i, table in enumerate((constants.heliocentric_longitude_coeffs, constants.heliocentric_latitude_coeffs, constants.sun_earth_distance_coeffs)):
+			for j, jme in enumerate(jmes):
+				self.assertAlmostEqual(solar.get_coeff(jme, table), series[i][j], delta = 1e-14 * abs(series[i][j]))
+		self.assertIsInstance(solar.get_coeff(self.jme, constants.sun_earth_distance_coeffs), float)
+
 	def test_get_sun_earth_distance(self):
 		self.assertAlmostEqual(0.9965421031, self.sun_earth_distance, 7) # value from Reda and Andreas (2005)
 
@@ -151,6 +248,52 @@ class testSolar(unittest.TestCase):
 	def test_get_incidence_angle(self):
 		self.assertAlmostEqual(25.18700, self.incidence_angle, 3) # value from Reda and Andreas (2005)
 
+	def test_get_position(self):
+		position = solar.get_position(self.latitude, self.longitude, self.d, self.elevation, self.temperature, self.pressure)
+		self.assertEqual(solar.get_altitude(self.latitude, self.longitude, self.d, self.elevation, self.temperature, self.pressure), position.altitude)
+		self.assertEqual(solar.get_azimuth(self.latitude, self.longitude, self.d, self.elevation), position.azimuth)
+		self.assertAlmostEqual(50.11162, position.zenith, 2) # value from Reda and Andreas (2005); sidereal time not overridden here
+		self.assertAlmostEqual(-9.316179, position.declination, 3) # value from Reda and Andreas (2005)
+		self.assertAlmostEqual(202.22741, position.right_ascension, 3) # value from Reda and Andreas (2005)
+		self.assertAlmostEqual(0.9965421031, position.sun_earth_distance, 7) # value from Reda and Andreas (2005)
+
+	def test_solar_ephemeris(self):
+		ephemeris = solar.SolarEphemeris(self.d)
+		self.assertEqual(self.jd, ephemeris.jd)
+		self.assertEqual(self.jme, ephemeris.jme)
+		self.assertEqual(self.nutation, ephemeris.nutation)
+		self.assertEqual(self.true_ecliptic_obliquity, ephemeris.true_ecliptic_obliquity)
+		for latitude, longitude in ((self.latitude, self.longitude), (-33.9, 18.4), (64.1, -21.9)):
+			self.assertEqual(solar.get_position(latitude, longitude, self.d, self.elevation, self.temperature, self.pressure),
+				ephemeris.topocentric(latitude, longitude, self.elevation, self.temperature, self.pressure))
+
+	def test_ephemeris_cache(self):
+		self.assertIsNone(solar.get_ephemeris_cache_info())
+		solar.enable_ephemeris_cache(maxsize = 2)
+		try:
+			expected = solar.get_position(self.latitude, self.longitude, self.d)
+			self.assertEqual(expected, solar.get_position(self.latitude, self.longitude, self.d))
+			solar.get_position(-33.9, 18.4, self.d)
+			info = solar.get_ephemeris_cache_info()
+			self.assertEqual((2, 1, 1), (info.hits, info.misses, info.currsize))
+			solar.get_position(self.latitude, self.longitude, self.d + datetime.timedelta(hours = 1))
+			solar.get_position(self.latitude, self.longitude, self.d + datetime.timedelta(hours = 2))
+			self.assertEqual(2, solar.get_ephemeris_cache_info().currsize)
+			solar.clear_ephemeris_cache()
+			self.assertEqual((0, 0, 0), solar.get_ephemeris_cache_info()[:2] + (solar.get_ephemeris_cache_info().currsize,))
+		finally:
+			solar.disable_ephemeris_cache()
+
+	def test_cache_eviction(self):
+		for eviction, survivor in (("lru", "a"), ("fifo", "b")):
+			c = cache.Cache(2, eviction)
+			c.get("a", lambda : 1)
+			c.get("b", lambda : 2)
+			c.get("a", lambda : 1)
+			c.get("c", lambda : 3)
+			self.assertEqual(1 if survivor == "a" else 2, c.get(survivor, lambda : None), eviction)
+		self.assertRaises(ValueError, cache.Cache, 10, "random")
+
 	def testPressureWithElevation(self):
 		self.assertAlmostEqual(83855.90228, self.pressure_with_elevation, 4)
 
@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	tracking, \
+	transposition, \
+	vectorized
+import datetime
+import unittest
+import numpy as np
+
+class testTracking(unittest.TestCase):
+
+	def setUp(self):
+		self.times = np.datetime64("2015-06-21T04:00") + np.arange(72) * np.timedelta64(15, "m")
+		self.axis_tilts = np.array([0.0, 0.0, 10.0, 5.0])
+		self.axis_azimuths = np.array([0.0, 20.0, 0.0, -90.0])
+
+	def test_ideal_rotation(self):
+		# sun due east, horizontal north-south axis: turn 60 degrees to face it
+		result = tracking.get_single_axis_angles(30.0, 90.0)
+		self.assertAlmostEqual(-60, result.rotation, 9)
+		self.assertAlmostEqual(90, result.surface_azimuth, 9)
+		self.assertAlmostEqual(0, result.incidence, 6)
+		self.assertAlmostEqual(0, tracking.get_single_axis_angles(50.0, 0.0).rotation, 9)
+		result = tracking.get_single_axis_tracker_angles(35.1, -106.6, self.times, self.axis_tilts, self.axis_azimuths)
+		self.assertEqual((4, 72), result.rotation.shape)
+		position = vectorized.get_position(35.1, -106.6, self.times)
+		up = position.altitude > 0
+		self.assertTrue(np.isnan(result.rotation[:, ~up]).all())
+		self.assertFalse(np.isnan(result.rotation[:, up]).any())
+		np.testing.assert_allclose \
+		  (
+			result.incidence[:, up],
+			transposition.get_incidence_angle(position.altitude[up], position.azimuth[up], result.surface_tilt[:, up], result.surface_azimuth[:, up]),
+			atol = 1e-6
+		  )
+		# turning either way from the ideal rotation only increases the angle of incidence
+		# (where the rotation is not limited, with the sun behind a tilted or east-west axis)
+		free = up & (np.abs(result.ideal_rotation) < 90)
+		axis, normal, turn = tracking.get_axis_frame(self.axis_tilts[:, np.newaxis], self.axis_azimuths[:, np.newaxis])
+		sun = transposition.get_direction(position.altitude, position.azimuth)
+		for offset in (-1.0, 1.0) :
+			rotation_rad = np.radians(result.rotation + offset)[..., np.newaxis]
+			cos_incidence = np.sum((np.cos(rotation_rad) * normal + np.sin(rotation_rad) * turn) * sun, axis = -1)
+			self.assertTrue((np.degrees(np.arccos(cos_incidence[free])) > result.incidence[free]).all())
+
+	def test_backtracking(self):
+		gcr = 0.45
+		result = tracking.get_single_axis_tracker_angles(35.1, -106.6, self.times, self.axis_tilts, self.axis_azimuths, max_rotation_deg = 55, gcr = gcr)
+		up = ~np.isnan(result.ideal_rotation)
+		ideal, rotation = result.ideal_rotation[up], result.rotation[up]
+		self.assertTrue((np.abs(rotation) <= 55).all())
+		cos_ideal = np.abs(np.cos(np.radians(ideal)))
+		shading = cos_ideal < gcr
+		self.assertTrue(shading.any())
+		backtracked = tracking.get_backtracking_rotation(ideal, gcr)
+		np.testing.assert_allclose(rotation, np.clip(backtracked, -55, 55))
+		# backtracking turns towards flat just far enough that the rows meet the sun's rays edge to edge
+		np.testing.assert_allclose(gcr * np.cos(np.radians(ideal - backtracked))[shading], cos_ideal[shading], atol = 1e-9)
+		self.assertTrue((np.abs(backtracked[shading]) < np.abs(ideal[shading])).all())
+		np.testing.assert_array_equal(backtracked[~shading], ideal[~shading])
+		self.assertAlmostEqual(0, tracking.get_backtracking_rotation(90.0, gcr), 9)
+
+	def test_dual_axis(self):
+		when = datetime.datetime(2015, 6, 21, 15, tzinfo = datetime.timezone.utc)
+		result = tracking.get_dual_axis_tracker_angles(np.array([35.1, 35.1]), np.array([-106.6, -106.6]), when, np.array([90.0, 30.0]))
+		self.assertEqual((2, 1), result.incidence.shape)
+		position = vectorized.get_position(35.1, -106.6, [when])
+		self.assertAlmostEqual(0, result.incidence[0, 0], 9)
+		self.assertAlmostEqual(90 - position.altitude[0], result.surface_tilt[0, 0], 9)
+		self.assertAlmostEqual(30, result.surface_tilt[1, 0], 9)
+		self.assertAlmostEqual(transposition.get_incidence_angle(position.altitude[0], position.azimuth[0], 30.0, result.surface_azimuth[1, 0]), result.incidence[1, 0], 6)
+		self.assertTrue(np.isnan(tracking.get_dual_axis_angles(-5.0, 0.0).surface_tilt))
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testTracking)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	rest, \
+	solar, \
+	transposition, \
+	vectorized
+import unittest
+import numpy as np
+
+class testTransposition(unittest.TestCase):
+
+	def setUp(self):
+		self.times = np.datetime64("2015-06-21T04:00") + np.arange(72) * np.timedelta64(15, "m")
+		self.position = vectorized.get_position(42.4, -71.1, self.times)
+		self.irradiance = rest.sum_bands(rest.get_clear_sky_irradiance(self.position.altitude, rest.AtmosphereState(precipitable_water_cm = 1.5, turbidity_beta = 0.08)))
+		self.tilts = np.array([0.0, 20.0, 42.0, 90.0, 90.0])
+		self.surface_azimuths = np.array([0.0, 0.0, 15.0, 90.0, -90.0])
+
+	def test_incidence_angle(self):
+		for altitude, azimuth in zip(self.position.altitude[::7], self.position.azimuth[::7]) :
+			for tilt, surface_azimuth in zip(self.tilts, self.surface_azimuths) :
+				expected = solar.get_incidence_angle(90 - altitude, tilt, -surface_azimuth, 180 - azimuth)
+				self.assertAlmostEqual(expected, transposition.get_incidence_angle(altitude, azimuth, tilt, surface_azimuth), 9)
+		matrix = transposition.get_cos_incidence_matrix(self.position.altitude, self.position.azimuth, self.tilts, self.surface_azimuths)
+		self.assertEqual((5, 72), matrix.shape)
+		np.testing.assert_allclose(matrix, transposition.get_cos_incidence(self.position.altitude, self.position.azimuth, self.tilts[:, np.newaxis], self.surface_azimuths[:, np.newaxis]), atol = 1e-12)
+		# a surface facing the sun
+		self.assertAlmostEqual(0, transposition.get_incidence_angle(30.0, -50.0, 60.0, -50.0), 6)
+
+	def test_plane_of_array_irradiance(self):
+		for sky_model in transposition.sky_models :
+			result = transposition.get_plane_of_array_irradiance_matrix \
+			  (
+				self.position.altitude, self.position.azimuth, self.tilts, self.surface_azimuths,
+				self.irradiance.direct_normal, self.irradiance.diffuse_horizontal, self.irradiance.global_horizontal,
+				albedo = 0.25, sky_model = sky_model
+			  )
+			self.assertEqual((5, 72), result.total.shape)
+			expected = transposition.get_plane_of_array_irradiance \
+			  (
+				self.position.altitude, self.position.azimuth, self.tilts[:, np.newaxis], self.surface_azimuths[:, np.newaxis],
+				self.irradiance.direct_normal, self.irradiance.diffuse_horizontal, self.irradiance.global_horizontal,
+				albedo = 0.25, sky_model = sky_model
+			  )
+			for name in transposition.PlaneOfArrayIrradiance._fields :
+				np.testing.assert_allclose(getattr(result, name), getattr(expected, name), rtol = 1e-9, atol = 1e-9)
+			np.testing.assert_allclose(result.total, result.beam + result.sky_diffuse + result.ground_reflected)
+			# a horizontal surface sees just the global horizontal irradiance (apart from where
+			# hay-davies limits the beam ratio, within a degree of the horizon)
+			clear = self.position.altitude > 1
+			np.testing.assert_allclose(result.total[0, clear], self.irradiance.global_horizontal[clear], atol = 1e-9)
+			np.testing.assert_array_equal(result.total[:, self.position.altitude <= 0], 0)
+			# east and west walls: morning and afternoon sun
+			morning = np.sin(np.radians(self.position.azimuth)) > 0 # sun east of the meridian
+			self.assertTrue((result.beam[4, morning] == 0).all())
+			self.assertTrue((result.beam[3, ~morning] == 0).all())
+		np.testing.assert_allclose(result.ground_reflected[3], self.irradiance.global_horizontal * 0.25 / 2)
+		self.assertRaises(ValueError, transposition.get_plane_of_array_irradiance, 30.0, 0.0, 20.0, 0.0, 800.0, 100.0, sky_model = "perez")
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testTransposition)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if
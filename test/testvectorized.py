@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+
+#    Copyright Brandon Stafford
+#
+#    This file is part of Pysolar.
+#
+#    Pysolar is free software; you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation; either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    Pysolar is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License along
+#    with Pysolar. If not, see <http://www.gnu.org/licenses/>.
+
+from pysolar import \
+	solar, \
+	simulate, \
+	time, \
+	vectorized
+import datetime
+import os
+import unittest
+import numpy as np
+
+def read_usno_data(count):
+	"returns latitudes, longitudes and UTC datetimes from the first count lines of the USNO data file."
+	latitudes, longitudes, whens = [], [], []
+	with open(os.path.join(os.path.dirname(__file__), "usno_data_6259.txt")) as log:
+		for line in log.readlines()[:count]:
+			args = line.split(" ")
+			whens.append(datetime.datetime.strptime(args[0] + " " + args[1], "%Y-%m-%d %H:%M:%S").replace(tzinfo = datetime.timezone.utc))
+			latitudes.append(float(args[2]))
+			longitudes.append(float(args[3]))
+	return np.array(latitudes), np.array(longitudes), whens
+
+class testVectorized(unittest.TestCase):
+
+	def setUp(self):
+		self.latitudes, self.longitudes, self.whens = read_usno_data(200)
+		self.times = np.array([np.datetime64(w.replace(tzinfo = None)) for w in self.whens])
+		self.scalar = [solar.get_position(lat, lon, w) for lat, lon, w in zip(self.latitudes, self.longitudes, self.whens)]
+
+	def test_get_position_matches_scalar(self):
+		position = vectorized.get_position(self.latitudes, self.longitudes, self.times)
+		for field in solar.SolarPosition._fields:
+			expected = np.array([getattr(p, field) for p in self.scalar])
+			np.testing.assert_allclose(getattr(position, field), expected, rtol = 0, atol = 1e-9, err_msg = field)
+
+	def test_datetime_input(self):
+		position = vectorized.get_position(self.latitudes, self.longitudes, self.whens)
+		np.testing.assert_allclose(position.altitude, [p.altitude for p in self.scalar], rtol = 0, atol = 1e-9)
+
+	def test_table_edges(self):
+		whens = [datetime.datetime(y, m, 15, tzinfo = datetime.timezone.utc) for y in (1960, 1973, 2014, 2016, 2030) for m in (1, 2, 6, 7, 12)]
+		position = vectorized.get_position(42.364908, -71.112828, whens)
+		np.testing.assert_allclose(position.azimuth, [solar.get_azimuth(42.364908, -71.112828, w) for w in whens], rtol = 0, atol = 1e-9)
+
+	def test_time_inputs(self):
+		expected = vectorized.get_position(self.latitudes, self.longitudes, self.times)
+		nanoseconds = self.times.astype("datetime64[ns]")
+		instants = time.Instants.from_timestamps(nanoseconds.astype(np.int64), unit = "ns")
+		for when in (nanoseconds, time.get_timestamps(self.times), instants, time.Instants.from_julian_days(instants.jd, instants.jde)):
+			position = vectorized.get_position(self.latitudes, self.longitudes, when)
+			np.testing.assert_allclose(position.altitude, expected.altitude, rtol = 0, atol = 1e-9)
+			np.testing.assert_allclose(position.azimuth, expected.azimuth, rtol = 0, atol = 1e-9)
+		from_jd = time.Instants.from_julian_days(instants.jd)
+		np.testing.assert_allclose(from_jd.jde, instants.jde, rtol = 0, atol = 1e-9)
+		np.testing.assert_allclose(from_jd.timestamps, instants.timestamps, rtol = 0, atol = 1e-4)
+		self.assertEqual([w.timetuple().tm_yday for w in self.whens], instants.day_of_year.tolist())
+		self.assertRaises(ValueError, time.Instants.from_timestamps, [0], unit = "h")
+		for when in (self.times[3], time.timestamp(self.whens[3])):
+			self.assertAlmostEqual(self.scalar[3].altitude, solar.get_position(self.latitudes[3], self.longitudes[3], when).altitude, 9)
+
+	def test_solar_ephemeris(self):
+		ephemeris = vectorized.SolarEphemeris(self.times)
+		for i in (0, 17, 199):
+			expected = solar.SolarEphemeris(self.whens[i])
+			for name in ("jd", "jde", "jme", "geocentric_longitude", "sun_earth_distance", "apparent_sidereal_time", "right_ascension", "declination"):
+				self.assertAlmostEqual(getattr(expected, name), getattr(ephemeris, name)[i], 9, msg = name)
+			self.assertAlmostEqual(expected.nutation["longitude"], ephemeris.nutation["longitude"][i], 12)
+
+	def test_precision(self):
+		# bounds documented in solar.get_position()
+		latitudes, longitudes, whens = read_usno_data(None)
+		times = np.array([np.datetime64(w.replace(tzinfo = None)) for w in whens])
+		full = vectorized.get_position(latitudes, longitudes, times)
+		away_from_zenith = np.abs(full.altitude) < 80
+		for precision, altitude_bound, azimuth_bound in (("reduced", 0.0004, 0.0015), ("fast", 1.9, 6.6)):
+			position = vectorized.get_position(latitudes, longitudes, times, precision = precision)
+			azimuth_error = np.abs((position.azimuth - full.azimuth + 180) % 360 - 180)
+			self.assertLess(np.abs(position.altitude - full.altitude).max(), altitude_bound, precision)
+			self.assertLess(azimuth_error[away_from_zenith].max(), azimuth_bound, precision)
+			for i in (0, 5, 99):
+				expected = solar.get_position(latitudes[i], longitudes[i], whens[i], precision = precision)
+				self.assertAlmostEqual(expected.altitude, position.altitude[i], 9)
+				self.assertAlmostEqual(expected.azimuth, position.azimuth[i], 9)
+		self.assertRaises(ValueError, vectorized.get_position, 0, 0, times, precision = "coarse")
+
+	def test_get_position_matrix(self):
+		latitudes, longitudes, elevations = self.latitudes[:7], self.longitudes[:7], np.arange(7) * 100.0
+		times = self.times[:11]
+		matrix = vectorized.get_position_matrix(latitudes, longitudes, times, elevations)
+		self.assertEqual((7, 11), matrix.altitude.shape)
+		self.assertEqual((7, 11), matrix.sun_earth_distance.shape)
+		for i in range(7):
+			row = vectorized.get_position(latitudes[i], longitudes[i], times, elevations[i])
+			for field in solar.SolarPosition._fields:
+				np.testing.assert_allclose(getattr(matrix, field)[i], getattr(row, field), rtol = 0, atol = 1e-12, err_msg = field)
+
+	def test_simulate_span(self):
+		horizon = [0] * 360
+		start = datetime.datetime(2008, 6, 21, tzinfo = datetime.timezone.utc)
+		end = start + datetime.timedelta(days = 1)
+		expected = list(simulate.simulate_span(42.0, -70.0, horizon, start, end, 30))
+		result = list(vectorized.simulate_span(42.0, -70.0, horizon, start, end, 30))
+		self.assertEqual(len(expected), len(result))
+		for e, r in zip(expected, result):
+			self.assertEqual(e[0], r[0])
+			self.assertAlmostEqual(e[1], r[1], 9)
+			self.assertAlmostEqual(e[2], r[2], 9)
+			self.assertAlmostEqual(e[3], r[3], 6)
+			self.assertEqual(e[4], r[4])
+
+	def test_simulate_span_array(self):
+		horizon = [(i * 7) % 380 for i in range(360)]
+		start = datetime.datetime(2008, 6, 21, tzinfo = datetime.timezone(datetime.timedelta(hours = -5)))
+		end = start + datetime.timedelta(days = 2, seconds = 59)
+		expected = list(simulate.simulate_span(42.0, -70.0, horizon, start, end, 15))
+		result = vectorized.simulate_span_array(42.0, -70.0, horizon, start, end, 15)
+		self.assertEqual(len(expected), len(result))
+		self.assertEqual(vectorized.simulation_fields, result.dtype.names)
+		self.assertEqual([np.datetime64(e[0].replace(tzinfo = None) - e[0].utcoffset()) for e in expected], result["time"].tolist())
+		np.testing.assert_allclose(result["altitude"], [e[1] for e in expected], rtol = 0, atol = 1e-9)
+		np.testing.assert_allclose(result["azimuth"], [e[2] for e in expected], rtol = 0, atol = 1e-9)
+		np.testing.assert_allclose(result["radiation"], [e[3] for e in expected], rtol = 1e-12, atol = 0)
+		self.assertEqual([e[4] for e in expected], result["shade"].tolist())
+		self.assertTrue(0 < np.count_nonzero(result["radiation"]) < len(result))
+		latitudes, longitudes = np.array([42.0, -33.9, 64.1]), np.array([-70.0, 151.2, -21.9])
+		horizons = np.array([horizon, [0] * 360, horizon[::-1]])
+		sites = vectorized.simulate_span_array(latitudes, longitudes, horizons, start, end, 15)
+		self.assertEqual((3, len(result)), sites.shape)
+		for i in range(3):
+			row = vectorized.simulate_span_array(latitudes[i], longitudes[i], horizons[i], start, end, 15)
+			for field in vectorized.simulation_fields:
+				np.testing.assert_array_equal(sites[field][i], row[field], err_msg = field)
+		shared = vectorized.simulate_span_array(latitudes, longitudes, horizon, start, end, 15)
+		np.testing.assert_array_equal(shared[0], sites[0])
+
+	def test_simulate_span_chunks(self):
+		horizon = [(i * 7) % 380 for i in range(360)]
+		start = datetime.datetime(2008, 6, 21, tzinfo = datetime.timezone.utc)
+		end = start + datetime.timedelta(days = 3)
+		expected = vectorized.simulate_span_array(42.0, -70.0, horizon, start, end, 5)
+		chunks = list(vectorized.simulate_span_chunks(42.0, -70.0, horizon, start, end, 5, chunk_size = 100))
+		self.assertEqual([100] * 8 + [64], [len(c) for c in chunks])
+		np.testing.assert_array_equal(expected, np.concatenate(chunks))
+		sites = list(vectorized.simulate_span_chunks([42.0, 10.0], [-70.0, 20.0], horizon, start, end, 5, chunk_size = 500))
+		self.assertEqual([(2, 500), (2, 364)], [c.shape for c in sites])
+		np.testing.assert_array_equal(expected, np.concatenate(sites, axis = -1)[0])
+		self.assertEqual([], list(vectorized.simulate_span_chunks(42.0, -70.0, horizon, start, start, 5)))
+		self.assertRaises(ValueError, list, vectorized.get_time_range_chunks(start, end, 5, chunk_size = 0))
+
+
+if __name__ == "__main__":
+	suite = unittest.defaultTestLoader.loadTestsFromTestCase(testVectorized)
+	unittest.TextTestRunner(verbosity=2).run(suite)
+#end if